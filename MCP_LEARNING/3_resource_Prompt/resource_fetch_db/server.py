@@ -65,9 +65,10 @@ def get_all_employees() -> str:
     if not rows:
         return "No employees found"
     
-    result = "All Employees:\n\n"
-    for row in rows:
-        result += f"ID: {row[0]}, Name: {row[1]}, Dept: {row[2]}, Salary: ${row[3]:,.2f}, Hired: {row[4]}\n"
+    result = "All Employees:\n\n" + "".join(
+        f"ID: {row[0]}, Name: {row[1]}, Dept: {row[2]}, Salary: ${row[3]:,.2f}, Hired: {row[4]}\n"
+        for row in rows
+    )
     
     return result
 
@@ -85,9 +86,10 @@ def get_employees_by_department(dept: str) -> str:
     if not rows:
         return f"No employees found in {dept} department"
     
-    result = f"Employees in {dept} Department:\n\n"
-    for row in rows:
-        result += f"ID: {row[0]}, Name: {row[1]}, Salary: ${row[3]:,.2f}, Hired: {row[4]}\n"
+    result = f"Employees in {dept} Department:\n\n" + "".join(
+        f"ID: {row[0]}, Name: {row[1]}, Salary: ${row[3]:,.2f}, Hired: {row[4]}\n"
+        for row in rows
+    )
     
     return result
 
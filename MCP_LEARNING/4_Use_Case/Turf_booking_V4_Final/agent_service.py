@@ -0,0 +1,417 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from conversation_memory import build_conversation_store_from_env
+from run_budget import build_run_budget_from_env
+from usage_tracker import build_usage_tracker_from_env
+import metrics
+import tracing
+from turf_logging import configure as configure_logging, get_logger
+from scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    PriorityScheduler,
+    SchedulerBusy,
+    classify_request,
+)
+
+log = get_logger(__name__)
+
+BUSY_MESSAGE = "⏳ The booking assistant is busy right now. Please try again in a moment."
+
+
+def _chunk_text(content) -> str:
+    """Extract plain text from a message chunk's content (str or content blocks)"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content or []
+    )
+
+
+class _Job:
+    """A queued request: the coroutine to run and the future its caller awaits"""
+
+    def __init__(self, factory: Callable[[], Awaitable], deadline: float):
+        self.factory = factory
+        self.deadline = deadline
+        self.future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+        self.priority = PRIORITY_INTERACTIVE
+        self.enqueued_at = 0.0
+
+
+class TurfAgentService:
+    """Async-native turf agent service
+
+    Requests go through a priority scheduler (see scheduler.py) served by a
+    fixed number of workers. Each request has a deadline that covers queueing
+    and execution; when it passes, the running coroutine is cancelled so it
+    stops consuming LLM and MCP capacity. Callers that give up (cancel their
+    await) cancel the job too.
+    """
+
+    def __init__(self, workers: int = 4, request_timeout: float = 120, max_queue: int = 100,
+                 batch_in_flight: Optional[int] = None):
+        self.workers = workers
+        self.request_timeout = request_timeout
+        self.max_queue = max_queue
+        # Batch work (booking summaries) may use at most half the workers by default
+        self.batch_in_flight = batch_in_flight or max(1, workers // 2)
+        self.agent = None
+        self.client = None
+        self.conversations = build_conversation_store_from_env()
+        self.usage = build_usage_tracker_from_env()
+        # LangChain callback handlers attached to every run (e.g. benchmark timers)
+        self.callbacks = []
+        self._scheduler: Optional[PriorityScheduler] = None
+        self._worker_tasks = []
+        self._ready: Optional[asyncio.Future] = None
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "cancelled": 0,
+            "busy_rejected": 0,
+            "in_flight": 0,
+        }
+
+    # ----- lifecycle -----
+
+    async def start(self):
+        """Connect to the MCP server, build the graph and start the workers"""
+        if self._ready is not None:
+            return await asyncio.shield(self._ready)
+
+        self._ready = asyncio.get_running_loop().create_future()
+        configure_logging(service_name="turf-agent")
+        tracing.configure(service_name="turf-agent")
+        metrics.REGISTRY.register_collector("agent_service", self._metric_families)
+        if os.getenv("TURF_AGENT_METRICS_PORT"):
+            metrics.start_http_server(int(os.getenv("TURF_AGENT_METRICS_PORT")))
+        try:
+            from turf_agent import setup_turf_agent
+            log.info("connecting to mcp server")
+            self.agent, self.client = await setup_turf_agent()
+            log.info("mcp client connected", workers=self.workers)
+
+            self._scheduler = PriorityScheduler(
+                max_queue=self.max_queue,
+                max_in_flight={PRIORITY_BATCH: self.batch_in_flight},
+            )
+            self._worker_tasks = [
+                asyncio.create_task(self._worker(), name=f"turf-agent-worker-{i}")
+                for i in range(self.workers)
+            ]
+            self._ready.set_result(True)
+        except Exception as e:
+            log.exception("agent service setup error")
+            self._ready.set_result(False)
+            self._ready = None
+            return False
+        return True
+
+    @property
+    def ready(self) -> bool:
+        return self._ready is not None and self._ready.done() and self._ready.result()
+
+    async def aclose(self):
+        """Cancel the workers and any queued jobs, then close the MCP client"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        if self._scheduler is not None:
+            for job in self._scheduler.drain():
+                if not job.future.done():
+                    job.future.cancel()
+
+        if self.client is not None and hasattr(self.client, "aclose"):
+            await self.client.aclose()
+        self._ready = None
+
+    # ----- request queue -----
+
+    async def _worker(self):
+        """Take jobs from the scheduler and run them until their deadline"""
+        while True:
+            job = await self._scheduler.get()
+            try:
+                if job.future.done():
+                    # The caller already gave up while the job was queued
+                    continue
+                remaining = job.deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timed_out"] += 1
+                    job.future.set_exception(asyncio.TimeoutError())
+                    continue
+
+                self.stats["in_flight"] += 1
+                job.task = asyncio.ensure_future(job.factory())
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(job.task), timeout=remaining)
+                except asyncio.TimeoutError:
+                    job.task.cancel()
+                    self.stats["timed_out"] += 1
+                    if not job.future.done():
+                        job.future.set_exception(asyncio.TimeoutError())
+                except asyncio.CancelledError:
+                    if job.future.cancelled():
+                        # Only the job was cancelled by its caller; keep serving
+                        self.stats["cancelled"] += 1
+                        continue
+                    job.task.cancel()
+                    raise
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    self.stats["completed"] += 1
+                    if not job.future.done():
+                        job.future.set_result(result)
+            finally:
+                if job.task is not None:
+                    self.stats["in_flight"] -= 1
+                await self._scheduler.release(job)
+
+    async def submit(self, factory: Callable[[], Awaitable], timeout: Optional[float] = None,
+                     priority: int = PRIORITY_INTERACTIVE):
+        """Queue a coroutine factory and wait for its result
+
+        Raises SchedulerBusy right away when the request is shed,
+        asyncio.TimeoutError when the deadline passes (the work is cancelled),
+        and cancels the work if the caller itself is cancelled.
+        """
+        if not self.ready:
+            raise RuntimeError("Agent service is not started")
+
+        job = _Job(factory, time.monotonic() + (timeout or self.request_timeout))
+
+        def cancel_task(future):
+            # Propagate caller cancellation to the running coroutine
+            if future.cancelled() and job.task is not None:
+                job.task.cancel()
+
+        job.future.add_done_callback(cancel_task)
+        try:
+            await self._scheduler.put(job, priority)
+        except SchedulerBusy:
+            self.stats["busy_rejected"] += 1
+            raise
+        self.stats["submitted"] += 1
+        return await job.future
+
+    # ----- agent operations -----
+
+    def _graph_input(self, message: str, session_id: Optional[str] = None, kind: str = "chat",
+                     prompt_name: Optional[str] = None):
+        """Build the graph input and config (step budget, usage scope, and the session's memory if any)"""
+        config = {
+            "configurable": {
+                "budget": build_run_budget_from_env(),
+                "usage": self.usage.scope(kind, session_id, prompt_name),
+            },
+            "callbacks": list(self.callbacks),
+        }
+        if session_id is None:
+            return {"messages": [{"role": "user", "content": message}]}, config
+
+        memory = self.conversations.get(session_id)
+        config["configurable"]["conversation_summary"] = memory.summary
+        # Lets the LLM response cache keep bypassing a session that already booked
+        config["configurable"]["session_has_written"] = memory.has_written
+        return {"messages": memory.build_messages(message)}, config
+
+    def _remember(self, session_id: Optional[str], message: str, new_messages: list):
+        """Store a finished turn (final answer and tools used, not tool outputs)"""
+        if session_id is None or not new_messages:
+            return
+        tool_calls = [tc for m in new_messages for tc in (getattr(m, "tool_calls", None) or [])]
+        answer = _chunk_text(new_messages[-1].content)
+        self.conversations.get(session_id).add_turn(message, answer, tool_calls)
+
+    async def _run_chat(self, message: str, session_id: Optional[str] = None,
+                        prompt_name: Optional[str] = None) -> str:
+        graph_input, config = self._graph_input(message, session_id, "chat", prompt_name)
+        try:
+            with tracing.request(kind="chat", session=session_id):
+                response = await self.agent.ainvoke(graph_input, config)
+        finally:
+            config["configurable"]["usage"].finish()
+
+        # Get the last assistant message
+        last_message = response["messages"][-1]
+        log.debug("response received", session=session_id, response_chars=len(last_message.content))
+        self._remember(session_id, message, response["messages"][len(graph_input["messages"]):])
+        return last_message.content
+
+    async def chat(self, message: str, session_id: Optional[str] = None,
+                   timeout: Optional[float] = None, prompt_name: Optional[str] = None) -> str:
+        """Process a chat message; messages with the same session_id share memory
+
+        prompt_name marks messages produced from a prompt template, which
+        decides their scheduling priority.
+        """
+        try:
+            return await self.submit(
+                lambda: self._run_chat(message, session_id, prompt_name), timeout,
+                classify_request(message, prompt_name)
+            )
+        except SchedulerBusy:
+            return BUSY_MESSAGE
+        except asyncio.TimeoutError:
+            return "❌ Request timed out. Please try again with a simpler query."
+        except Exception as e:
+            log.exception("chat processing error", session=session_id)
+            return f"❌ Processing error: {str(e)}"
+
+    async def _run_chat_stream(self, message: str, chunks: asyncio.Queue,
+                               session_id: Optional[str] = None):
+        """Run the agent and push text chunks and tool notices onto the queue"""
+        graph_input, config = self._graph_input(message, session_id, "chat_stream")
+        try:
+            with tracing.request(kind="chat_stream", session=session_id):
+                await self._forward_events(message, graph_input, config, chunks, session_id)
+        finally:
+            config["configurable"]["usage"].finish()
+
+    async def _forward_events(self, message: str, graph_input: dict, config: dict,
+                              chunks: asyncio.Queue, session_id: Optional[str]):
+        """Translate graph events into text chunks and tool notices"""
+        streamed_this_step = False
+        async for event in self.agent.astream_events(graph_input, config, version="v2"):
+            kind = event["event"]
+            if kind == "on_chain_end" and not event.get("parent_ids"):
+                # Root run finished: keep the turn in the session's memory
+                final_messages = event["data"]["output"]["messages"]
+                self._remember(session_id, message, final_messages[len(graph_input["messages"]):])
+            elif kind == "on_chain_start" and event["name"] == "call_model":
+                streamed_this_step = False
+            elif kind == "on_chat_model_stream":
+                text = _chunk_text(event["data"]["chunk"].content)
+                if text:
+                    streamed_this_step = True
+                    chunks.put_nowait(text)
+            elif kind == "on_chain_end" and event["name"] == "call_model" and not streamed_this_step:
+                # Responses that were not token-streamed (e.g. cache hits) arrive whole
+                output = event["data"].get("output") or {}
+                for response in output.get("messages", []):
+                    text = _chunk_text(response.content)
+                    if text:
+                        chunks.put_nowait(text)
+            elif kind == "on_tool_start":
+                chunks.put_nowait(f"\n\n🔧 Calling `{event['name']}`...\n\n")
+
+    async def chat_stream(self, message: str, session_id: Optional[str] = None,
+                          timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Process a chat message and yield text chunks as they are generated"""
+        chunks = asyncio.Queue()
+        done = object()
+
+        async def run_and_close():
+            try:
+                await self.submit(
+                    lambda: self._run_chat_stream(message, chunks, session_id), timeout,
+                    classify_request(message)
+                )
+            except SchedulerBusy:
+                chunks.put_nowait(BUSY_MESSAGE)
+            except asyncio.TimeoutError:
+                chunks.put_nowait("\n\n❌ Request timed out. Please try again with a simpler query.")
+            except Exception as e:
+                log.exception("chat streaming error", session=session_id)
+                chunks.put_nowait(f"\n\n❌ Processing error: {str(e)}")
+            finally:
+                chunks.put_nowait(done)
+
+        runner = asyncio.create_task(run_and_close())
+        try:
+            while True:
+                item = await chunks.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            # Closing the generator early cancels the queued or running request
+            if not runner.done():
+                runner.cancel()
+
+    async def _run_prompt(self, prompt_name: str, arguments: dict = None) -> str:
+        from prompt_server import get_prompt
+
+        log.debug("getting prompt template", prompt=prompt_name)
+        prompt_result = await get_prompt(prompt_name, arguments)
+        formatted_prompt = prompt_result.messages[0].content.text
+
+        log.debug("sending formatted prompt to agent", prompt=prompt_name, prompt_chars=len(formatted_prompt))
+        graph_input, config = self._graph_input(formatted_prompt, kind="prompt", prompt_name=prompt_name)
+        try:
+            with tracing.request(kind="prompt", prompt=prompt_name):
+                response = await self.agent.ainvoke(graph_input, config)
+        finally:
+            config["configurable"]["usage"].finish()
+        return response["messages"][-1].content
+
+    async def process_prompt(self, prompt_name: str, arguments: dict = None,
+                             timeout: Optional[float] = None) -> str:
+        """Format a prompt template and send it to the agent"""
+        try:
+            return await self.submit(
+                lambda: self._run_prompt(prompt_name, arguments), timeout,
+                classify_request(prompt_name=prompt_name)
+            )
+        except SchedulerBusy:
+            return BUSY_MESSAGE
+        except asyncio.TimeoutError:
+            return "❌ Prompt processing timed out. Please try again."
+        except Exception as e:
+            log.exception("prompt processing error", prompt=prompt_name)
+            return f"❌ Prompt processing error: {str(e)}"
+
+    def get_status(self) -> dict:
+        """Service readiness, queue depth and request counters"""
+        return {
+            "ready": self.ready,
+            "workers": len(self._worker_tasks),
+            "queue_depth": self._scheduler.depth() if self._scheduler is not None else 0,
+            **self.stats,
+            "scheduler": self._scheduler.get_metrics() if self._scheduler is not None else {},
+            "conversations": self.conversations.get_metrics(),
+            "usage": self.usage.get_metrics(),
+        }
+
+    def _metric_families(self) -> list:
+        """Request counters and queue state for the agent's /metrics endpoint"""
+        scheduler = self._scheduler.get_metrics() if self._scheduler is not None else {}
+        return [
+            ("turf_agent_requests_total", "counter", "Agent requests by outcome",
+             [({"outcome": k}, v) for k, v in self.stats.items() if k != "in_flight"]),
+            ("turf_agent_tokens_total", "counter", "Model tokens spent, by direction",
+             [({"direction": "input"}, self.usage.totals["input_tokens"]),
+              ({"direction": "output"}, self.usage.totals["output_tokens"])]),
+            ("turf_agent_in_flight", "gauge", "Agent requests currently running",
+             [({}, self.stats.get("in_flight", 0))]),
+            ("turf_agent_queued", "gauge", "Agent requests waiting for a worker, by priority",
+             [({"priority": name}, m["queued"]) for name, m in scheduler.items()]),
+            ("turf_agent_shed_total", "counter", "Agent requests rejected by load shedding, by priority",
+             [({"priority": name}, m["shed"]) for name, m in scheduler.items()]),
+            ("turf_agent_queue_wait_p95_ms", "gauge", "95th percentile queue wait, by priority",
+             [({"priority": name}, m["wait_p95_ms"]) for name, m in scheduler.items()]),
+        ]
+
+
+def build_agent_service_from_env() -> TurfAgentService:
+    """Create a service configured by the TURF_AGENT_* environment variables"""
+    batch_in_flight = os.getenv("TURF_AGENT_BATCH_IN_FLIGHT")
+    return TurfAgentService(
+        workers=int(os.getenv("TURF_AGENT_WORKERS", "4")),
+        request_timeout=float(os.getenv("TURF_AGENT_TIMEOUT", "120")),
+        max_queue=int(os.getenv("TURF_AGENT_MAX_QUEUE", "100")),
+        batch_in_flight=int(batch_in_flight) if batch_in_flight else None,
+    )
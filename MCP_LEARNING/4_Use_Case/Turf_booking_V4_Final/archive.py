@@ -0,0 +1,119 @@
+"""Move old bookings from the hot bookings table to bookings_archive.
+
+Bookings dated more than TURF_ARCHIVE_AFTER_DAYS days ago are moved in
+batches of TURF_ARCHIVE_BATCH rows, one short write transaction per batch
+with a pause in between, so bookings made meanwhile only wait for one
+batch. With several shards (TURF_DB_SHARDS) each shard file is archived
+in turn and only that file is locked. Availability checks, conflict checks
+and get_all_bookings then read a table holding only recent and upcoming
+bookings, while analytics read both tables through the bookings_all view.
+The rollup and change-log triggers ignore these moves (see database.py).
+
+The newest booking of each shard is never moved: insert_booking (see
+database.py) allocates the next id above the shard's highest id in
+bookings, so keeping that row guarantees archived ids are not reused.
+Run from cron, or let turf_server.py run it in the background:
+
+    python archive.py --days 180
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import BOOKING_COLUMNS, TurfDatabase
+from turf_logging import get_logger
+
+log = get_logger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("TURF_ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH = int(os.getenv("TURF_ARCHIVE_BATCH", "500"))
+ARCHIVE_PAUSE_SECONDS = float(os.getenv("TURF_ARCHIVE_PAUSE_MS", "50")) / 1000
+
+
+def archive_batch(conn: sqlite3.Connection, cutoff: str, batch_size: int) -> int:
+    """Move up to batch_size bookings dated before cutoff; returns how many were moved"""
+    cursor = conn.cursor()
+    # Take the write lock up front so the batch cannot fail halfway on a busy database
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("""
+            SELECT id FROM bookings
+            -- Keep the highest id: insert_booking allocates new ids above it
+            WHERE booking_date < ? AND id < (SELECT MAX(id) FROM bookings)
+            ORDER BY booking_date, id
+            LIMIT ?
+        """, (cutoff, batch_size))
+        ids = [(row[0],) for row in cursor.fetchall()]
+        if ids:
+            cursor.executemany(
+                f"INSERT INTO bookings_archive ({BOOKING_COLUMNS}) SELECT {BOOKING_COLUMNS} FROM bookings WHERE id = ?",
+                ids)
+            cursor.executemany("DELETE FROM bookings WHERE id = ?", ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(ids)
+
+
+def archive_bookings(db: TurfDatabase, after_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH,
+                     pause: float = ARCHIVE_PAUSE_SECONDS, today=None) -> int:
+    """Archive every booking older than after_days, batch by batch; returns the total moved"""
+    today = today or datetime.now().date()
+    cutoff = (today - timedelta(days=max(1, after_days))).isoformat()
+    moved = 0
+    for shard in range(db.shard_count):
+        conn = db.get_shard_connection(shard, catalog=False)
+        # Explicit transactions (BEGIN IMMEDIATE) instead of the module's implicit ones
+        conn.isolation_level = None
+        try:
+            while True:
+                count = archive_batch(conn, cutoff, batch_size)
+                moved += count
+                if count < batch_size:
+                    break
+                time.sleep(pause)
+        finally:
+            conn.close()
+    log.info("bookings archived", moved=moved, cutoff=cutoff)
+    return moved
+
+
+class ArchiveWorker(threading.Thread):
+    """Runs archive_bookings every interval_hours in the background"""
+
+    def __init__(self, db: TurfDatabase, after_days: int, interval_hours: float):
+        super().__init__(name="turf-archive", daemon=True)
+        self.db = db
+        self.after_days = after_days
+        self.interval = interval_hours * 3600
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while True:
+            try:
+                archive_bookings(self.db, self.after_days)
+            except sqlite3.Error:
+                log.exception("archiving failed")
+            if self._stop_event.wait(self.interval):
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old bookings to bookings_archive")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive bookings dated more than this many days ago")
+    parser.add_argument("--batch", type=int, default=ARCHIVE_BATCH, help="rows per transaction")
+    args = parser.parse_args()
+    moved = archive_bookings(TurfDatabase(), args.days, args.batch)
+    print(f"Archived {moved} bookings older than {args.days} days")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Token cost of each turf tool's output in text, json and table format.
+
+Renders the same data for every tool in all three formats (see
+resources/render.py) against a scratch copy of the database, optionally
+padded with extra bookings, and reports the token reduction versus the
+text output. Tokens are counted with tiktoken when it is installed and
+estimated at ~4 characters per token otherwise. Run from the
+Turf_booking_V4_Final folder:
+
+    python benchmarks/bench_output_formats.py
+    python benchmarks/bench_output_formats.py --bookings 500
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_memory import estimate_tokens
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODING = None
+
+FORMATS = ("text", "json", "table")
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return estimate_tokens(text)
+
+
+def add_bookings(db_path: str, count: int):
+    """Pad the scratch database with random confirmed bookings"""
+    conn = sqlite3.connect(db_path)
+    start = datetime.now() + timedelta(days=1)
+    rows = []
+    for i in range(count):
+        hour = random.randint(6, 21)
+        rows.append((
+            random.randint(1, 5), f"Bench Customer {i}", "9000000000",
+            (start + timedelta(days=random.randint(0, 60))).strftime("%Y-%m-%d"),
+            f"{hour:02d}:00", f"{hour + 1:02d}:00", 1000.0,
+        ))
+    conn.executemany(
+        "INSERT INTO bookings (turf_id, customer_name, customer_phone, booking_date, start_time, end_time, "
+        "total_cost, status) VALUES (?, ?, ?, ?, ?, ?, ?, 'confirmed')",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(bookings: int) -> dict:
+    scratch_dir = tempfile.mkdtemp(prefix="turf_formats_")
+    scratch_db = os.path.join(scratch_dir, "turf_booking.db")
+    shutil.copy("turf_booking.db", scratch_db)
+    os.environ["TURF_DB_PATH"] = scratch_db
+    add_bookings(scratch_db, bookings)
+
+    from resources.server_all import fetch_turfs, fetch_bookings, fetch_availability, create_booking
+    from resources.render import render
+
+    # Availability of the busiest turf/day, where the slot lists are longest
+    conn = sqlite3.connect(scratch_db)
+    busy_turf, busy_date = conn.execute(
+        "SELECT turf_id, booking_date FROM bookings GROUP BY turf_id, booking_date "
+        "ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()
+    conn.close()
+    booking_date = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
+    cases = {
+        "get_all_turfs": ("turfs", fetch_turfs()),
+        "get_all_bookings": ("bookings", fetch_bookings()),
+        "check_turf_availability": ("availability", fetch_availability(str(busy_turf), busy_date)),
+        "make_booking": ("booking", create_booking(
+            2, "Bench Customer", "9000000000", booking_date, "07:00", "08:00")),
+    }
+
+    results = {}
+    for tool, (kind, data) in cases.items():
+        results[tool] = {fmt: count_tokens(render(kind, data, fmt)) for fmt in FORMATS}
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=100, help="extra random bookings to add")
+    args = parser.parse_args()
+
+    results = measure(args.bookings)
+    counter = "tiktoken cl100k_base" if _ENCODING is not None else "estimate (chars/4)"
+    print(f"\n📏 Tool output tokens ({counter}, +{args.bookings} bookings)")
+    print(f"{'tool':<26} {'text':>8} {'json':>8} {'table':>8} {'json Δ':>8} {'table Δ':>8}")
+    for tool, tokens in results.items():
+        text = tokens["text"]
+        print(f"{tool:<26} {text:>8} {tokens['json']:>8} {tokens['table']:>8} "
+              f"{(tokens['json'] - text) / text:>8.0%} {(tokens['table'] - text) / text:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Wall-clock benchmark for multi-call tool turns.
+
+Simulates one model turn that asks for availability of several turfs and
+times it with the tool node running calls one at a time versus concurrently.
+Run from the Turf_booking_V4_Final folder:
+
+    python benchmarks/bench_parallel_tools.py            # simulated tool latency
+    python benchmarks/bench_parallel_tools.py --mcp      # real turf_server.py over stdio
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+
+from parallel_tools import ParallelToolNode
+
+
+def simulated_tools(latency: float):
+    """Stand-in for the MCP tools with a fixed per-call latency"""
+    async def check_turf_availability(turf_id: int, date: str) -> str:
+        await asyncio.sleep(latency)
+        return f"Turf {turf_id} on {date}: fully available"
+
+    return [StructuredTool.from_function(
+        coroutine=check_turf_availability,
+        name="check_turf_availability",
+        description="Check availability for a specific turf on a specific date",
+    )]
+
+
+async def mcp_tools():
+    """Load the real tools from turf_server.py"""
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+
+    client = MultiServerMCPClient({
+        "turf": {"command": "python", "args": ["turf_server.py"], "transport": "stdio"}
+    })
+    return await client.get_tools()
+
+
+def multi_call_turn(calls: int) -> AIMessage:
+    """A model message asking for availability of `calls` turfs"""
+    date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    return AIMessage(content="", tool_calls=[
+        {"name": "check_turf_availability", "args": {"turf_id": i % 5 + 1, "date": date}, "id": f"call_{i}"}
+        for i in range(calls)
+    ])
+
+
+async def time_turn(tools, concurrency: int, calls: int, repeats: int) -> float:
+    """Average wall-clock seconds for one multi-call turn"""
+    node = ParallelToolNode(tools, max_concurrency=concurrency)
+    state = {"messages": [multi_call_turn(calls)]}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        await node.ainvoke(state)
+    return (time.perf_counter() - start) / repeats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mcp", action="store_true", help="use the real MCP server instead of simulated tools")
+    parser.add_argument("--calls", type=int, default=5, help="tool calls per turn")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated latency per call (seconds)")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    tools = await mcp_tools() if args.mcp else simulated_tools(args.latency)
+
+    print(f"⏱️ {args.calls} tool calls per turn, {args.repeats} repeats ({'MCP stdio' if args.mcp else 'simulated'})")
+    print(f"{'concurrency':>12} {'seconds/turn':>14} {'speedup':>9}")
+    baseline = None
+    for concurrency in (1, 2, 4, 8):
+        seconds = await time_turn(tools, concurrency, args.calls, args.repeats)
+        baseline = baseline or seconds
+        print(f"{concurrency:>12} {seconds:>14.3f} {baseline / seconds:>8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
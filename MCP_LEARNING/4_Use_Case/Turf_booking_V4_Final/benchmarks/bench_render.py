@@ -0,0 +1,109 @@
+"""Time and memory of rendering large tool results (resources/render.py).
+
+Builds synthetic turf and booking listings (100k rows by default), renders
+them with the old `result +=` loop and with the buffered renderers, with and
+without the TURF_TOOL_MAX_OUTPUT_CHARS cap, and reports wall time and
+tracemalloc peak for each. CPython resizes a `+=` string in place while it
+has a single reference, which hides the quadratic copy of the legacy loop
+here; the cap is what bounds time and memory. Run from the
+Turf_booking_V4_Final folder:
+
+    python benchmarks/bench_render.py
+    python benchmarks/bench_render.py --rows 200000 --max-chars 50000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resources.render import render
+
+
+def make_data(rows: int) -> dict:
+    return {
+        "turfs": {"turfs": [
+            {"id": i, "name": f"Bench Turf {i}", "location": f"Sector {i % 97}", "hourly_rate": 1000.0,
+             "capacity": 22, "facilities": "Floodlights, Parking, Changing Room"}
+            for i in range(rows)
+        ]},
+        "bookings": {"bookings": [
+            {"id": i, "turf": f"Bench Turf {i % 50}", "date": f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+             "start": f"{6 + i % 16:02d}:00", "end": f"{7 + i % 16:02d}:00", "cost": 1000.0,
+             "status": "confirmed"}
+            for i in range(rows)
+        ]},
+    }
+
+
+def legacy_turfs(data: dict) -> str:
+    result = "🏟️ Available Turfs:\n\n"
+    for turf in data["turfs"]:
+        result += f"ID: {turf['id']}\n"
+        result += f"Name: {turf['name']}\n"
+        result += f"Location: {turf['location']}\n"
+        result += f"Rate: ₹{turf['hourly_rate']}/hour\n"
+        result += f"Capacity: {turf['capacity']} players\n"
+        result += f"Facilities: {turf['facilities']}\n"
+        result += "-" * 40 + "\n"
+    return result
+
+
+def legacy_bookings(data: dict) -> str:
+    result = "📅 All Bookings:\n\n"
+    for booking in data["bookings"]:
+        result += f"Booking ID: {booking['id']}\n"
+        result += f"Turf: {booking['turf']}\n"
+        result += f"Date: {booking['date']}\n"
+        result += f"Time: {booking['start']} - {booking['end']}\n"
+        result += f"Cost: ₹{booking['cost']}\n"
+        result += f"Status: {booking['status']}\n"
+        result += "-" * 40 + "\n"
+    return result
+
+
+LEGACY = {"turfs": legacy_turfs, "bookings": legacy_bookings}
+
+
+def measure(fn) -> tuple:
+    """(seconds, peak MiB, output chars) of one call; timed without tracemalloc"""
+    started = time.perf_counter()
+    output = fn()
+    elapsed = time.perf_counter() - started
+    del output
+    tracemalloc.start()
+    output = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, len(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="rows per listing")
+    parser.add_argument("--max-chars", type=int, default=200_000, help="output cap for the capped runs")
+    args = parser.parse_args()
+
+    data = make_data(args.rows)
+    print(f"\n🧵 Rendering {args.rows:,} rows")
+    print(f"{'kind':<9} {'renderer':<22} {'seconds':>8} {'peak MiB':>9} {'chars':>12}")
+    for kind, payload in data.items():
+        runs = {
+            "legacy += text": lambda: LEGACY[kind](payload),
+            "text": lambda: render(kind, payload, "text", max_chars=0),
+            "json": lambda: render(kind, payload, "json", max_chars=0),
+            "table": lambda: render(kind, payload, "table", max_chars=0),
+            f"text ≤{args.max_chars}": lambda: render(kind, payload, "text", max_chars=args.max_chars),
+            f"table ≤{args.max_chars}": lambda: render(kind, payload, "table", max_chars=args.max_chars),
+        }
+        if render(kind, payload, "text", max_chars=0) != LEGACY[kind](payload):
+            raise SystemExit(f"{kind}: text output differs from the legacy renderer")
+        for name, fn in runs.items():
+            seconds, peak, chars = measure(fn)
+            print(f"{kind:<9} {name:<22} {seconds:>8.3f} {peak:>9.1f} {chars:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""End-to-end load test for the turf booking stack.
+
+Drives N concurrent simulated users through the whole path
+(SyncTurfAgent -> TurfAgentService -> LangGraph -> MCP stdio -> turf_server.py
+-> SQLite) with a mix of list / bookings / availability / booking requests.
+The offline scripted model (fake_model.py) stands in for the LLM and the
+server works on a scratch copy of the database. Run from the
+Turf_booking_V4_Final folder:
+
+    python benchmarks/load_test.py --users 8 --requests 20
+    python benchmarks/load_test.py --compare results/a.json results/b.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Latency histogram bucket upper bounds in milliseconds
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")]
+
+# Share of each request type in the traffic mix
+DEFAULT_MIX = {"list": 0.3, "bookings": 0.2, "availability": 0.35, "booking": 0.15}
+
+
+def make_request(kind: str) -> str:
+    """A chat message of the given kind, matching the scripted model's patterns"""
+    turf_id = random.randint(1, 5)
+    date = (datetime.now() + timedelta(days=random.randint(1, 60))).strftime("%Y-%m-%d")
+    if kind == "list":
+        return "Show me all turfs"
+    if kind == "bookings":
+        return "What are the current bookings?"
+    if kind == "availability":
+        return f"Check availability for turf {turf_id} on {date}"
+    hour = random.randint(6, 21)
+    return f"Book turf {turf_id} on {date} from {hour:02d}:00 to {hour + 1:02d}:00"
+
+
+class StageRecorder:
+    """Thread-safe collection of latency samples per stage"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds * 1000)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {stage: summarize(values) for stage, values in sorted(self.samples.items())}
+
+
+class StageTimer(BaseCallbackHandler):
+    """LangChain callbacks timing the graph run, model calls and tool calls"""
+
+    def __init__(self, recorder: StageRecorder):
+        self.recorder = recorder
+        self._started = {}
+
+    def _start(self, run_id):
+        self._started[run_id] = time.perf_counter()
+
+    def _end(self, run_id, stage: str):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.recorder.add(stage, time.perf_counter() - started)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self._start(run_id)
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self._end(run_id, "graph")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, "model")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        # Tool time covers the MCP round trip, turf_server.py and SQLite
+        self._end(run_id, "tool")
+
+
+def summarize(values_ms) -> dict:
+    """Count, mean, percentiles and a bucketed histogram of latency samples"""
+    if not values_ms:
+        return {"count": 0}
+    ordered = sorted(values_ms)
+
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 2)
+
+    histogram = {}
+    for bound in BUCKETS_MS:
+        label = "+Inf" if bound == float("inf") else f"<={bound}"
+        histogram[label] = sum(1 for v in ordered if v <= bound)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1], 2),
+        "histogram_cumulative": histogram,
+    }
+
+
+def simulated_user(agent, user_id: int, requests: int, mix: dict, think_time: float,
+                   recorder: StageRecorder, errors: list):
+    """One user sending a sequence of chat requests through the sync facade"""
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    for _ in range(requests):
+        kind = random.choices(kinds, weights)[0]
+        message = make_request(kind)
+        start = time.perf_counter()
+        response = agent.chat(message, session_id=f"load-user-{user_id}")
+        elapsed = time.perf_counter() - start
+        recorder.add("end_to_end", elapsed)
+        recorder.add(f"end_to_end:{kind}", elapsed)
+        if response.startswith(("❌", "⏳")):
+            errors.append({"kind": kind, "response": response[:200]})
+        if think_time:
+            time.sleep(random.uniform(0, think_time))
+
+
+def run_load_test(users: int, requests: int, mix: dict, think_time: float) -> dict:
+    """Run the load test against a scratch database and return the results"""
+    os.environ.setdefault("TURF_AGENT_MODEL", "fake")
+    scratch_dir = tempfile.mkdtemp(prefix="turf_load_")
+    scratch_db = os.path.join(scratch_dir, "turf_booking.db")
+    shutil.copy("turf_booking.db", scratch_db)
+    os.environ["TURF_DB_PATH"] = scratch_db
+
+    from sync_agent import SyncTurfAgent
+
+    recorder = StageRecorder()
+    agent = SyncTurfAgent()
+    agent.service.callbacks.append(StageTimer(recorder))
+    if not agent.setup():
+        raise RuntimeError("Agent setup failed")
+
+    errors = []
+    threads = [
+        threading.Thread(target=simulated_user, args=(agent, i, requests, mix, think_time, recorder, errors))
+        for i in range(users)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - start
+
+    status = agent.get_status()
+    agent.cleanup()
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    total = users * requests
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "users": users,
+            "requests_per_user": requests,
+            "mix": mix,
+            "think_time": think_time,
+            "model": os.getenv("TURF_AGENT_MODEL"),
+            "fake_model_latency": os.getenv("TURF_FAKE_MODEL_LATENCY", "0.05"),
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(total / wall_seconds, 3) if wall_seconds else 0.0,
+        "errors": len(errors),
+        "error_samples": errors[:10],
+        "stages": recorder.summary(),
+        "scheduler": status.get("scheduler", {}),
+    }
+
+
+def print_report(result: dict):
+    print(f"\n📊 {result['config']['users']} users × {result['config']['requests_per_user']} requests "
+          f"in {result['wall_seconds']}s → {result['throughput_rps']} req/s, {result['errors']} errors")
+    print(f"{'stage':<28} {'count':>6} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for stage, stats in result["stages"].items():
+        if not stats.get("count"):
+            continue
+        print(f"{stage:<28} {stats['count']:>6} {stats['mean_ms']:>9} {stats['p50_ms']:>9} "
+              f"{stats['p90_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+
+
+def compare(old_path: str, new_path: str):
+    """Print p50/p99 changes per stage between two saved runs"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"throughput: {old['throughput_rps']} → {new['throughput_rps']} req/s")
+    print(f"{'stage':<28} {'p50 old':>9} {'p50 new':>9} {'p99 old':>9} {'p99 new':>9}")
+    for stage in sorted(set(old["stages"]) | set(new["stages"])):
+        o, n = old["stages"].get(stage, {}), new["stages"].get(stage, {})
+        print(f"{stage:<28} {o.get('p50_ms', '-'):>9} {n.get('p50_ms', '-'):>9} "
+              f"{o.get('p99_ms', '-'):>9} {n.get('p99_ms', '-'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=10, help="requests per user")
+    parser.add_argument("--think-time", type=float, default=0.0, help="max random pause between requests (s)")
+    parser.add_argument("--mix", type=json.loads, default=DEFAULT_MIX, help="JSON traffic mix, e.g. '{\"list\": 1}'")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/load_<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = run_load_test(args.users, args.requests, args.mix, args.think_time)
+    print_report(result)
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results",
+        f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
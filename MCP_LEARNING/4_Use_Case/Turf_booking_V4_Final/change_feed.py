@@ -0,0 +1,150 @@
+"""Change log of booking writes, used for MCP resource-update notifications.
+
+CHANGES records every booking committed by this process (create_booking in
+resources/server_all.py) with its turf and date, and calls its listeners;
+turf_server.py turns each change into a resources/updated notification for
+the matching turf://availability/{turf_id}/{date} subscribers.
+
+Writes from other processes (another server, a script, the sqlite3 shell)
+are picked up by DataVersionWatcher, which polls PRAGMA data_version on its
+own connection. The value changes whenever another connection commits; the
+watcher then reads the new entries of the booking_changes table (filled by
+triggers, see database.py); with several shards (TURF_DB_SHARDS) one watcher
+runs per shard file. A deleted booking no longer has a turf or date,
+so it is recorded with turf_id=None, meaning "any turf/date may have
+changed".
+
+Bookings this process inserted are skipped by the watcher: CHANGES keeps
+their ids apart from the bounded history until a watcher has seen them.
+"""
+import sqlite3
+import threading
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional, Set
+
+from turf_logging import get_logger
+
+log = get_logger(__name__)
+
+
+class Change(NamedTuple):
+    seq: int
+    turf_id: Optional[int]
+    date: Optional[str]
+    booking_id: Optional[int]
+    source: str
+
+
+class ChangeLog:
+    """Bounded, thread-safe log of booking changes with listener callbacks"""
+
+    def __init__(self, keep: int = 1000):
+        self._changes = deque(maxlen=keep)
+        self._seq = 0
+        self._listeners: List[Callable[[Change], None]] = []
+        # Local inserts not yet seen by a DataVersionWatcher (tracked only while one runs)
+        self._local_bookings: Set[int] = set()
+        self._watchers = 0
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[Change], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def record(self, turf_id: Optional[int], date: Optional[str], booking_id: Optional[int] = None,
+               source: str = "local") -> Change:
+        with self._lock:
+            self._seq += 1
+            change = Change(self._seq, turf_id, date, booking_id, source)
+            self._changes.append(change)
+            if source == "local" and booking_id is not None and self._watchers:
+                self._local_bookings.add(booking_id)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(change)
+            except Exception:
+                log.exception("change listener failed", seq=change.seq)
+        return change
+
+    def since(self, seq: int) -> List[Change]:
+        """Changes after seq that are still in the log"""
+        with self._lock:
+            return [change for change in self._changes if change.seq > seq]
+
+    def add_watcher(self):
+        """Start tracking local inserts for a DataVersionWatcher to skip"""
+        with self._lock:
+            self._watchers += 1
+
+    def consume_local(self, booking_id: int) -> bool:
+        """True (once) if booking_id was inserted by this process"""
+        with self._lock:
+            if booking_id in self._local_bookings:
+                self._local_bookings.discard(booking_id)
+                return True
+            return False
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+
+CHANGES = ChangeLog()
+
+
+class DataVersionWatcher(threading.Thread):
+    """Records bookings written by other processes, detected through PRAGMA data_version"""
+
+    def __init__(self, db_path: str, change_log: ChangeLog = CHANGES, interval: float = 1.0):
+        super().__init__(name="turf-data-version", daemon=True)
+        self.db_path = db_path
+        self.change_log = change_log
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _scan(self, conn, last_seq: int) -> int:
+        rows = conn.execute("""
+            SELECT c.seq, c.booking_id, c.op, b.turf_id, b.booking_date
+            FROM booking_changes c
+            LEFT JOIN bookings_all b ON b.id = c.booking_id
+            WHERE c.seq > ?
+            ORDER BY c.seq
+        """, (last_seq,)).fetchall()
+        for seq, booking_id, op, turf_id, date in rows:
+            # Bookings created by this process are already in the log
+            if op == "insert" and self.change_log.consume_local(booking_id):
+                continue
+            self.change_log.record(turf_id, date, booking_id, source="external")
+        return rows[-1][0] if rows else last_seq
+
+    def run(self):
+        # A connection of its own: data_version ignores this connection's commits
+        conn = sqlite3.connect(self.db_path)
+        self.change_log.add_watcher()
+        try:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM booking_changes").fetchone()[0]
+            while not self._stop_event.wait(self.interval):
+                try:
+                    current = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current != version:
+                        version = current
+                        last_seq = self._scan(conn, last_seq)
+                except sqlite3.Error:
+                    log.exception("data_version poll failed", path=self.db_path)
+        finally:
+            conn.close()
+
+
+def start_watcher(db_path: str, interval: float) -> Optional[DataVersionWatcher]:
+    """Start watching db_path for writes from other processes (interval <= 0 disables it)"""
+    if interval <= 0:
+        return None
+    watcher = DataVersionWatcher(db_path, CHANGES, interval)
+    watcher.start()
+    log.info("watching for external booking writes", path=db_path, interval=interval)
+    return watcher
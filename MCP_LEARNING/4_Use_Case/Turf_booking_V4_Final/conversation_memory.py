@@ -0,0 +1,176 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from tool_policy import is_write_tool
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)"""
+    return len(text or "") // 4 + 1
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    """Keep the head and tail of a long text and elide the middle"""
+    text = text or ""
+    if len(text) <= max_chars:
+        return text
+    keep = max_chars // 2
+    return f"{text[:keep]}\n…[{len(text) - 2 * keep} characters elided]…\n{text[-keep:]}"
+
+
+def _describe_tool_calls(tool_calls: List[dict]) -> str:
+    """One-line note of the tools used in a turn, e.g. check_turf_availability(turf_id=1)"""
+    calls = []
+    for tool_call in tool_calls:
+        args = ", ".join(f"{k}={v}" for k, v in (tool_call.get("args") or {}).items())
+        calls.append(f"{tool_call.get('name')}({args})")
+    return "[Used tools: " + "; ".join(calls) + "]"
+
+
+class ConversationMemory:
+    """Token-budgeted memory for one chat session
+
+    Recent turns are replayed verbatim (tool outputs are never stored; long
+    answers from older turns are elided). When the verbatim turns exceed the
+    token budget, the oldest ones are folded into a rolling summary that is
+    handed to the model alongside the system prompt. has_written records
+    that an earlier turn used a write tool, which the replayed text no
+    longer shows.
+    """
+
+    def __init__(self, token_budget: int = 1500, summary_token_budget: int = 300,
+                 max_answer_chars: int = 1200, summarizer: Optional[Callable] = None):
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.max_answer_chars = max_answer_chars
+        self.summarizer = summarizer
+        self.turns: List[Dict] = []
+        self.summary = ""
+        self.has_written = False
+        self.metrics: List[Dict] = []
+
+    def _render_turn(self, turn: Dict, latest: bool) -> List[Dict]:
+        """Messages replayed for a stored turn"""
+        # The latest answer is kept (nearly) whole, older ones are elided harder
+        max_chars = self.max_answer_chars * 4 if latest else self.max_answer_chars
+        answer = _shorten(turn["assistant"], max_chars)
+        if turn["tool_calls"]:
+            answer = _describe_tool_calls(turn["tool_calls"]) + "\n" + answer
+        return [
+            {"role": "user", "content": turn["user"]},
+            {"role": "assistant", "content": answer},
+        ]
+
+    def _turn_tokens(self, turn: Dict, latest: bool) -> int:
+        return sum(estimate_tokens(m["content"]) for m in self._render_turn(turn, latest))
+
+    def _summarize(self, turn: Dict) -> str:
+        """Fold one turn into the rolling summary"""
+        if self.summarizer is not None:
+            return self.summarizer(self.summary, turn)
+
+        line = f"- User: {_shorten(turn['user'], 160)} → Assistant: {_shorten(turn['assistant'], 160)}"
+        lines = [l for l in self.summary.splitlines() if l] + [line.replace("\n", " ")]
+        # Drop the oldest summary lines once the summary itself is over budget
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_token_budget:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def _trim(self):
+        """Move the oldest turns into the summary until the history fits the budget"""
+        while self.turns:
+            history_tokens = sum(
+                self._turn_tokens(turn, latest=(i == len(self.turns) - 1))
+                for i, turn in enumerate(self.turns)
+            )
+            if history_tokens <= self.token_budget or len(self.turns) == 1:
+                break
+            self.summary = self._summarize(self.turns.pop(0))
+
+    def build_messages(self, user_message: str) -> List[Dict]:
+        """History to send with a new user message, and record its size"""
+        messages = []
+        for i, turn in enumerate(self.turns):
+            messages.extend(self._render_turn(turn, latest=(i == len(self.turns) - 1)))
+        messages.append({"role": "user", "content": user_message})
+
+        history_tokens = sum(estimate_tokens(m["content"]) for m in messages[:-1])
+        summary_tokens = estimate_tokens(self.summary) if self.summary else 0
+        message_tokens = estimate_tokens(user_message)
+        self.metrics.append({
+            "history_tokens": history_tokens,
+            "summary_tokens": summary_tokens,
+            "message_tokens": message_tokens,
+            "total_tokens": history_tokens + summary_tokens + message_tokens,
+        })
+        del self.metrics[:-100]
+        return messages
+
+    def add_turn(self, user_message: str, assistant_message: str, tool_calls: Optional[List[dict]] = None):
+        """Store a finished turn and trim the history back into budget"""
+        self.turns.append({
+            "user": user_message,
+            "assistant": assistant_message or "",
+            "tool_calls": [
+                {"name": tc.get("name"), "args": tc.get("args", {})} for tc in tool_calls or []
+            ],
+        })
+        if any(is_write_tool(tc.get("name") or "") for tc in tool_calls or []):
+            self.has_written = True
+        self._trim()
+
+    def get_metrics(self) -> Dict:
+        """Token usage of the context sent per turn"""
+        if not self.metrics:
+            return {"turns": 0}
+        totals = [m["total_tokens"] for m in self.metrics]
+        return {
+            "turns": len(self.metrics),
+            "stored_turns": len(self.turns),
+            "summary_tokens": estimate_tokens(self.summary) if self.summary else 0,
+            "last_turn_tokens": totals[-1],
+            "avg_turn_tokens": round(sum(totals) / len(totals), 1),
+            "max_turn_tokens": max(totals),
+        }
+
+
+class ConversationStore:
+    """Per-session conversation memories, bounded by the number of sessions"""
+
+    def __init__(self, max_sessions: int = 500, **memory_kwargs):
+        self.max_sessions = max_sessions
+        self.memory_kwargs = memory_kwargs
+        self._sessions: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ConversationMemory:
+        """Memory for a session, created on first use"""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = ConversationMemory(**self.memory_kwargs)
+                self._sessions[session_id] = memory
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return memory
+
+    def reset(self, session_id: str):
+        """Forget a session's history"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def get_metrics(self) -> Dict:
+        """Per-session token metrics"""
+        with self._lock:
+            return {session_id: memory.get_metrics() for session_id, memory in self._sessions.items()}
+
+
+def build_conversation_store_from_env() -> ConversationStore:
+    """Create a store configured by TURF_MEMORY_TOKEN_BUDGET and TURF_MEMORY_SUMMARY_TOKENS"""
+    return ConversationStore(
+        token_budget=int(os.getenv("TURF_MEMORY_TOKEN_BUDGET", "1500")),
+        summary_token_budget=int(os.getenv("TURF_MEMORY_SUMMARY_TOKENS", "300")),
+    )
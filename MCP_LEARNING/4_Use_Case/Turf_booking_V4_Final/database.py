@@ -1,15 +1,191 @@
 import sqlite3
 import os
+import time
 from datetime import datetime, timedelta
+import metrics
+import sql_profiler
+import tracing
+from turf_logging import get_logger
+
+
+log = get_logger(__name__)
+
+_CONNECTIONS_OPENED = metrics.REGISTRY.counter(
+    "turf_db_connections_opened_total", "SQLite connections opened")
+_CONNECTIONS_CLOSED = metrics.REGISTRY.counter(
+    "turf_db_connections_closed_total", "SQLite connections closed")
+_CONNECT_SECONDS = metrics.REGISTRY.histogram(
+    "turf_db_connect_duration_seconds", "Time to open a SQLite connection")
+_STATEMENT_SECONDS = metrics.REGISTRY.histogram(
+    "turf_db_statement_duration_seconds", "SQLite statement execution time by statement type")
+
+
+def _statement_kind(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor recording statement latency (metrics), spans inside a request (tracing)
+    and, when the SQL profiler is on, rows and execute+fetch time per statement"""
+    
+    _profile = None
+    
+    def _run(self, method, sql, parameters, many=False):
+        self._finish_profile()
+        start = time.perf_counter()
+        try:
+            if tracing.current_request_id() is None:
+                result = method(self, sql, parameters)
+            else:
+                with tracing.span("sql", statement=" ".join(sql.split())[:500], many=many or None):
+                    result = method(self, sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            _STATEMENT_SECONDS.observe(elapsed, kind=_statement_kind(sql))
+        if sql_profiler.enabled():
+            self._profile = sql_profiler.PROFILER.start(self, sql, parameters, elapsed, many)
+            if self.description is None:
+                self._finish_profile()
+        return result
+    
+    def execute(self, sql, parameters=()):
+        return self._run(sqlite3.Cursor.execute, sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(sqlite3.Cursor.executemany, sql, seq_of_parameters, many=True)
+    
+    def _finish_profile(self):
+        if self._profile is not None:
+            sql_profiler.PROFILER.finish(self._profile)
+            self._profile = None
+    
+    def _fetched(self, start, rows, exhausted):
+        if self._profile is not None:
+            self._profile.add_fetch(time.perf_counter() - start, rows)
+            if exhausted:
+                self._finish_profile()
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+    
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), len(rows) < (self.arraysize if size is None else size))
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+    
+    def close(self):
+        self._finish_profile()
+        super().close()
+    
+    def __del__(self):
+        # Single-row lookups are rarely fetched to exhaustion
+        self._finish_profile()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors are InstrumentedCursors"""
+    
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    
+    # The built-in shortcuts bypass Python-level cursor overrides
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+    
+    def close(self):
+        _CONNECTIONS_CLOSED.inc()
+        super().close()
+
+
+BOOKING_COLUMNS = ("id, turf_id, customer_name, customer_phone, booking_date, start_time, end_time, "
+                   "total_cost, status, created_at")
+
 
 class TurfDatabase:
-    def __init__(self, db_name="turf_booking.db"):
-        self.db_name = db_name
+    """Turf catalog in db_name, bookings in one or more shard files
+    
+    With TURF_DB_SHARDS=N > 1 each turf's bookings (with their archive, change
+    log and rollups) live in turf_booking.shard{turf_id % N}.db, so bookings for
+    different shards are written in parallel instead of queueing on one write
+    lock. The main file keeps turfs, slot_forecast and shard_config. N=1 (the
+    default) keeps everything in db_name as before.
+    """
+    
+    def __init__(self, db_name=None, shards=None):
+        # TURF_DB_PATH lets benchmarks point the server at a scratch copy
+        self.db_name = db_name or os.getenv("TURF_DB_PATH", "turf_booking.db")
+        self.shard_count = max(1, int(shards or os.getenv("TURF_DB_SHARDS", "1")))
+        root, ext = os.path.splitext(self.db_name)
+        self.shard_paths = ([self.db_name] if self.shard_count == 1 else
+                            [f"{root}.shard{shard}{ext}" for shard in range(self.shard_count)])
         self.init_database()
     
+    def _connect(self, path):
+        if not (tracing.enabled() or metrics.enabled() or sql_profiler.enabled()):
+            return sqlite3.connect(path)
+        start = time.perf_counter()
+        conn = sqlite3.connect(path, factory=InstrumentedConnection)
+        _CONNECT_SECONDS.observe(time.perf_counter() - start)
+        _CONNECTIONS_OPENED.inc()
+        return conn
+    
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_name)
+        """Get database connection (instrumented when tracing, metrics or the SQL profiler are on)
+        
+        This is the main file: turfs and the forecast, and the bookings only when
+        there is a single shard. Booking queries use get_shard_connection().
+        """
+        return self._connect(self.db_name)
+    
+    def shard_for(self, turf_id) -> int:
+        """Index of the shard holding a turf's bookings"""
+        return int(turf_id) % self.shard_count
+    
+    def get_shard_connection(self, shard: int, catalog: bool = True):
+        """Connection to one bookings shard
+        
+        With several shards the main file is attached as "catalog", so queries
+        joining turfs or slot_forecast run unchanged. Writers that only touch
+        the shard (archive.py) pass catalog=False, so BEGIN IMMEDIATE does not
+        lock the main file as well.
+        """
+        conn = self._connect(self.shard_paths[shard])
+        if catalog and self.shard_count > 1:
+            conn.execute("ATTACH DATABASE ? AS catalog", (self.db_name,))
+        return conn
+    
+    def insert_booking(self, cursor, turf_id, customer_name, customer_phone, booking_date, start_time, end_time,
+                       total_cost, status="confirmed") -> int:
+        """Insert a booking through a cursor of its turf's shard and return its id
+        
+        Booking ids stay unique across shards: shard i takes the next id equal to
+        i modulo the shard count above both its own highest id and
+        shard_config.id_floor (the highest id when the bookings were split). With
+        one shard that is simply the highest id plus one.
+        """
+        shards, shard = self.shard_count, self.shard_for(turf_id)
+        cursor.execute(f"""
+            INSERT INTO bookings (id, turf_id, customer_name, customer_phone, booking_date,
+                                  start_time, end_time, total_cost, status)
+            SELECT (max(COALESCE(MAX(id), 0), (SELECT id_floor FROM shard_config)) / {shards} + 1) * {shards} + {shard},
+                   ?, ?, ?, ?, ?, ?, ?, ?
+            FROM bookings
+        """, (turf_id, customer_name, customer_phone, booking_date, start_time, end_time, total_cost, status))
+        return cursor.lastrowid
     
     def init_database(self):
         """Initialize the turf booking database with tables and sample data"""
@@ -28,23 +204,6 @@ class TurfDatabase:
             )
         """)
         
-        # Create bookings table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS bookings (
-                id INTEGER PRIMARY KEY,
-                turf_id INTEGER NOT NULL,
-                customer_name TEXT NOT NULL,
-                customer_phone TEXT NOT NULL,
-                booking_date TEXT NOT NULL,
-                start_time TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                total_cost REAL NOT NULL,
-                status TEXT DEFAULT 'confirmed',
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (turf_id) REFERENCES turfs (id)
-            )
-        """)
-        
         # Insert sample turfs if table is empty
         cursor.execute("SELECT COUNT(*) FROM turfs")
         if cursor.fetchone()[0] == 0:
@@ -61,30 +220,321 @@ class TurfDatabase:
                 sample_turfs
             )
         
+        # Expected occupancy per turf/weekday/hour, refreshed by resources/forecast.py
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS slot_forecast (
+                turf_id INTEGER NOT NULL,
+                weekday INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                expected_occupancy REAL NOT NULL,
+                computed_at TEXT NOT NULL,
+                PRIMARY KEY (turf_id, weekday, hour)
+            )
+        """)
+        
+        unsplit = self._configure_shards(cursor)
+        conn.commit()
+        conn.close()
+        
+        booking_count = 0
+        for shard in range(self.shard_count):
+            conn = self.get_shard_connection(shard)
+            cursor = conn.cursor()
+            self._create_bookings(cursor, shard, unsplit)
+            cursor.execute("SELECT COUNT(*) FROM bookings_all")
+            booking_count += cursor.fetchone()[0]
+            conn.commit()
+            conn.close()
+        
+        if unsplit:
+            self._drop_unsplit_bookings()
+        
         # Insert sample bookings if table is empty
-        cursor.execute("SELECT COUNT(*) FROM bookings")
-        if cursor.fetchone()[0] == 0:
+        if booking_count == 0:
             # Get today's date and create some sample bookings
             today = datetime.now()
             tomorrow = today + timedelta(days=1)
             day_after = today + timedelta(days=2)
             
             sample_bookings = [
-                (1, 1, "Rajesh Kumar", "9876543210", today.strftime("%Y-%m-%d"), "06:00", "08:00", 1600.0, "confirmed"),
-                (2, 1, "Priya Sharma", "8765432109", today.strftime("%Y-%m-%d"), "18:00", "20:00", 1600.0, "confirmed"),
-                (3, 2, "Team Alpha", "7654321098", tomorrow.strftime("%Y-%m-%d"), "09:00", "11:00", 2400.0, "confirmed"),
-                (4, 3, "Mumbai Warriors", "6543210987", tomorrow.strftime("%Y-%m-%d"), "16:00", "18:00", 2000.0, "confirmed"),
-                (5, 4, "Chennai FC", "5432109876", day_after.strftime("%Y-%m-%d"), "10:00", "12:00", 3000.0, "confirmed")
+                (1, "Rajesh Kumar", "9876543210", today.strftime("%Y-%m-%d"), "06:00", "08:00", 1600.0),
+                (1, "Priya Sharma", "8765432109", today.strftime("%Y-%m-%d"), "18:00", "20:00", 1600.0),
+                (2, "Team Alpha", "7654321098", tomorrow.strftime("%Y-%m-%d"), "09:00", "11:00", 2400.0),
+                (3, "Mumbai Warriors", "6543210987", tomorrow.strftime("%Y-%m-%d"), "16:00", "18:00", 2000.0),
+                (4, "Chennai FC", "5432109876", day_after.strftime("%Y-%m-%d"), "10:00", "12:00", 3000.0)
             ]
             
-            cursor.executemany(
-                "INSERT INTO bookings (id, turf_id, customer_name, customer_phone, booking_date, start_time, end_time, total_cost, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                sample_bookings
+            for booking in sample_bookings:
+                conn = self.get_shard_connection(self.shard_for(booking[0]))
+                self.insert_booking(conn.cursor(), *booking)
+                conn.commit()
+                conn.close()
+        
+        log.info("turf booking database initialized", path=self.db_name, shards=self.shard_count)
+    
+    def _configure_shards(self, cursor) -> bool:
+        """Record the shard count in the main file
+        
+        Returns True when the main file still holds the bookings of a single-file
+        database and they have to move to the shards (TURF_DB_SHARDS raised from 1).
+        Other changes of the shard count would misroute turfs and are refused.
+        """
+        cursor.execute("CREATE TABLE IF NOT EXISTS shard_config (shards INTEGER NOT NULL, id_floor INTEGER NOT NULL)")
+        cursor.execute("SELECT shards FROM shard_config")
+        row = cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'bookings'")
+        unsplit = self.shard_count > 1 and cursor.fetchone()[0] > 0
+        
+        if row is None or (row[0] == 1 and unsplit):
+            id_floor = 0
+            if unsplit:
+                # The newest booking is never archived, so this is the highest id ever handed out
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM bookings")
+                id_floor = cursor.fetchone()[0]
+            cursor.execute("DELETE FROM shard_config")
+            cursor.execute("INSERT INTO shard_config (shards, id_floor) VALUES (?, ?)", (self.shard_count, id_floor))
+        elif row[0] != self.shard_count:
+            raise ValueError(f"{self.db_name} keeps its bookings in {row[0]} shard(s); "
+                             f"set TURF_DB_SHARDS={row[0]}")
+        return unsplit
+    
+    def _create_bookings(self, cursor, shard: int, unsplit: bool):
+        """Bookings, archive, change log and rollup tables of one shard"""
+        # Create bookings table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bookings (
+                id INTEGER PRIMARY KEY,
+                turf_id INTEGER NOT NULL,
+                customer_name TEXT NOT NULL,
+                customer_phone TEXT NOT NULL,
+                booking_date TEXT NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                total_cost REAL NOT NULL,
+                status TEXT DEFAULT 'confirmed',
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (turf_id) REFERENCES turfs (id)
             )
+        """)
         
+        self._create_archive(cursor)
+        if unsplit:
+            # First start with several shards: move this shard's turfs out of the main file.
+            # OR IGNORE lets an interrupted split run again.
+            for table in ("bookings", "bookings_archive"):
+                cursor.execute("SELECT COUNT(*) FROM catalog.sqlite_master WHERE type = 'table' AND name = ?",
+                               (table,))
+                if cursor.fetchone()[0]:
+                    cursor.execute(f"""
+                        INSERT OR IGNORE INTO main.{table} ({BOOKING_COLUMNS})
+                        SELECT {BOOKING_COLUMNS} FROM catalog.{table} WHERE turf_id % ? = ?
+                    """, (self.shard_count, shard))
+        # Created after the copy, so the change log and rollups start from the moved bookings
+        self._create_change_log(cursor)
+        self._create_rollups(cursor)
+    
+    def _drop_unsplit_bookings(self):
+        """Drop the booking tables left in the main file once every shard holds its copy"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("DROP VIEW IF EXISTS bookings_all")
+        for table in ("bookings", "bookings_archive", "booking_changes", "booking_stats_daily",
+                      "booking_stats_hourly", "hours"):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
         conn.commit()
         conn.close()
-        print("Turf booking database initialized successfully!")
+        log.info("bookings moved to shards", path=self.db_name, shards=self.shard_count)
+    
+    def _create_archive(self, cursor):
+        """Cold storage for old bookings (see archive.py) and the bookings_all view over both tables"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS bookings_archive (
+                id INTEGER PRIMARY KEY,
+                turf_id INTEGER NOT NULL,
+                customer_name TEXT NOT NULL,
+                customer_phone TEXT NOT NULL,
+                booking_date TEXT NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                total_cost REAL NOT NULL,
+                status TEXT DEFAULT 'confirmed',
+                created_at TEXT,
+                archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_archive_date ON bookings_archive (booking_date)")
+        cursor.execute("""
+            CREATE VIEW IF NOT EXISTS bookings_all AS
+            SELECT id, turf_id, customer_name, customer_phone, booking_date, start_time, end_time,
+                   total_cost, status, created_at
+            FROM bookings
+            UNION ALL
+            SELECT id, turf_id, customer_name, customer_phone, booking_date, start_time, end_time,
+                   total_cost, status, created_at
+            FROM bookings_archive
+        """)
+    
+    def _create_change_log(self, cursor):
+        """Sequence of booking changes (insert/update/cancel/delete), filled by triggers
+        
+        seq only ever grows (AUTOINCREMENT never reuses values), so clients can ask
+        for everything after the last seq they saw (get_bookings_since).
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS booking_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                booking_id INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                changed_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS booking_changes_insert AFTER INSERT ON bookings
+            BEGIN
+                INSERT INTO booking_changes (booking_id, op) VALUES (NEW.id, 'insert');
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS booking_changes_update AFTER UPDATE ON bookings
+            BEGIN
+                INSERT INTO booking_changes (booking_id, op) VALUES (
+                    NEW.id,
+                    CASE WHEN NEW.status = 'cancelled' AND OLD.status IS NOT 'cancelled'
+                         THEN 'cancel' ELSE 'update' END
+                );
+            END
+        """)
+        # Rows moved to bookings_archive are not deleted bookings
+        cursor.execute("DROP TRIGGER IF EXISTS booking_changes_delete")
+        cursor.execute("""
+            CREATE TRIGGER booking_changes_delete AFTER DELETE ON bookings
+            WHEN NOT EXISTS (SELECT 1 FROM bookings_archive WHERE id = OLD.id)
+            BEGIN
+                INSERT INTO booking_changes (booking_id, op) VALUES (OLD.id, 'delete');
+            END
+        """)
+        
+        # Databases created before the change log start it with their existing bookings
+        cursor.execute("SELECT COUNT(*) FROM booking_changes")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("INSERT INTO booking_changes (booking_id, op) SELECT id, 'insert' FROM bookings_all ORDER BY id")
+    
+    def _create_rollups(self, cursor):
+        """Per turf/day and per turf/day/hour-of-day totals of confirmed bookings, kept by triggers
+        
+        Each booking adds 1 booking, its minutes and its cost to its day, and to
+        every hour it overlaps the minutes and share of the cost in that hour.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS booking_stats_daily (
+                turf_id INTEGER NOT NULL,
+                booking_date TEXT NOT NULL,
+                bookings INTEGER NOT NULL DEFAULT 0,
+                booked_minutes INTEGER NOT NULL DEFAULT 0,
+                revenue REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (turf_id, booking_date)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS booking_stats_hourly (
+                turf_id INTEGER NOT NULL,
+                booking_date TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                bookings INTEGER NOT NULL DEFAULT 0,
+                booked_minutes INTEGER NOT NULL DEFAULT 0,
+                revenue REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (turf_id, booking_date, hour)
+            )
+        """)
+        # Hours of the day to join against: CTEs are not allowed inside triggers
+        cursor.execute("CREATE TABLE IF NOT EXISTS hours (hour INTEGER PRIMARY KEY)")
+        cursor.executemany("INSERT OR IGNORE INTO hours (hour) VALUES (?)", [(h,) for h in range(24)])
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS booking_stats_insert AFTER INSERT ON bookings
+            BEGIN
+                {_rollup_statements("NEW", 1)}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS booking_stats_update
+            AFTER UPDATE OF turf_id, booking_date, start_time, end_time, total_cost, status ON bookings
+            BEGIN
+                {_rollup_statements("OLD", -1)}
+                {_rollup_statements("NEW", 1)}
+            END
+        """)
+        # Archived bookings stay counted
+        cursor.execute("DROP TRIGGER IF EXISTS booking_stats_delete")
+        cursor.execute(f"""
+            CREATE TRIGGER booking_stats_delete AFTER DELETE ON bookings
+            WHEN NOT EXISTS (SELECT 1 FROM bookings_archive WHERE id = OLD.id)
+            BEGIN
+                {_rollup_statements("OLD", -1)}
+            END
+        """)
+        
+        # Fill the rollups once for databases that already hold bookings
+        cursor.execute("SELECT COUNT(*) FROM booking_stats_daily")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"""
+                INSERT INTO booking_stats_daily (turf_id, booking_date, bookings, booked_minutes, revenue)
+                SELECT turf_id, booking_date, COUNT(*), SUM({_minutes("end_time")} - {_minutes("start_time")}),
+                       SUM(total_cost)
+                FROM bookings_all
+                WHERE status = 'confirmed'
+                GROUP BY turf_id, booking_date
+            """)
+            cursor.execute(f"""
+                INSERT INTO booking_stats_hourly (turf_id, booking_date, hour, bookings, booked_minutes, revenue)
+                SELECT turf_id, booking_date, hour, COUNT(*), SUM(overlap), SUM(total_cost * overlap / minutes)
+                FROM (
+                    SELECT b.turf_id, b.booking_date, h.hour, b.total_cost,
+                           {_minutes("b.end_time")} - {_minutes("b.start_time")} AS minutes,
+                           {_overlap("b", "h.hour")} AS overlap
+                    FROM bookings_all b, hours h
+                    WHERE b.status = 'confirmed'
+                )
+                WHERE overlap > 0
+                GROUP BY turf_id, booking_date, hour
+            """)
+
+
+def _minutes(column: str) -> str:
+    """SQL for minutes since midnight of an HH:MM column"""
+    return f"(CAST(substr({column}, 1, 2) AS INTEGER) * 60 + CAST(substr({column}, 4, 2) AS INTEGER))"
+
+
+def _overlap(row: str, hour: str) -> str:
+    """SQL for the minutes of a booking row that fall inside an hour of the day"""
+    return (f"max(0, min({_minutes(row + '.end_time')}, ({hour} + 1) * 60) - "
+            f"max({_minutes(row + '.start_time')}, {hour} * 60))")
+
+
+def _rollup_statements(row: str, sign: int) -> str:
+    """Trigger statements adding (sign=1) or removing (sign=-1) a confirmed booking row from the rollups
+    
+    "WHERE true" keeps SQLite from reading ON CONFLICT as part of a join.
+    """
+    minutes = f"({_minutes(row + '.end_time')} - {_minutes(row + '.start_time')})"
+    return f"""
+                INSERT INTO booking_stats_daily (turf_id, booking_date, bookings, booked_minutes, revenue)
+                SELECT {row}.turf_id, {row}.booking_date, {sign}, {sign} * {minutes}, {sign} * {row}.total_cost
+                WHERE {row}.status = 'confirmed'
+                ON CONFLICT (turf_id, booking_date) DO UPDATE SET
+                    bookings = bookings + excluded.bookings,
+                    booked_minutes = booked_minutes + excluded.booked_minutes,
+                    revenue = revenue + excluded.revenue;
+                INSERT INTO booking_stats_hourly (turf_id, booking_date, hour, bookings, booked_minutes, revenue)
+                SELECT {row}.turf_id, {row}.booking_date, hour, {sign}, {sign} * {_overlap(row, "hour")},
+                       {sign} * {row}.total_cost * {_overlap(row, "hour")} / {minutes}
+                FROM hours
+                WHERE true AND {row}.status = 'confirmed' AND {_overlap(row, "hour")} > 0
+                ON CONFLICT (turf_id, booking_date, hour) DO UPDATE SET
+                    bookings = bookings + excluded.bookings,
+                    booked_minutes = booked_minutes + excluded.booked_minutes,
+                    revenue = revenue + excluded.revenue;"""
+
 
 def setup_database():
     """Setup function to initialize database"""
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+
+def default_scripts() -> List[Dict[str, Any]]:
+    """Scripts covering the turf tools; the first matching pattern wins
+
+    Each step is a list of tool calls made in one model turn. Arguments may use
+    {placeholders} filled from the pattern's named groups, plus {tomorrow}.
+    """
+    date = r"(?P<date>\d{4}-\d{2}-\d{2})"
+    return [
+        {
+            "pattern": rf"book turf (?P<turf_id>\d+).*?{date}.*?(?P<start>\d{{2}}:\d{{2}}).*?(?P<end>\d{{2}}:\d{{2}})",
+            "steps": [
+                [{"name": "check_turf_availability", "args": {"turf_id": "{turf_id}", "date": "{date}"}}],
+                [{"name": "make_booking", "args": {
+                    "turf_id": "{turf_id}", "customer_name": "Load Test", "customer_phone": "9999999999",
+                    "booking_date": "{date}", "start_time": "{start}", "end_time": "{end}",
+                }}],
+            ],
+        },
+        {
+            "pattern": rf"availability.*?turf (?P<turf_id>\d+).*?{date}",
+            "steps": [
+                [{"name": "check_turf_availability", "args": {"turf_id": "{turf_id}", "date": "{date}"}}],
+            ],
+        },
+        {
+            "pattern": r"summary.*?turf (?P<turf_id>\d+)",
+            "steps": [
+                [
+                    {"name": "get_booking_stats", "args": {"turf_id": "{turf_id}"}},
+                    {"name": "recommend_slots", "args": {"turf_id": "{turf_id}"}},
+                    {"name": "check_turf_availability", "args": {"turf_id": "{turf_id}", "date": "{tomorrow}"}},
+                ],
+            ],
+        },
+        {"pattern": r"bookings", "steps": [[{"name": "get_all_bookings", "args": {}}]]},
+        {"pattern": r"turfs?", "steps": [[{"name": "get_all_turfs", "args": {}}]]},
+    ]
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text or "") // 4 + 1
+
+
+def _fill(value, groups: Dict[str, str]):
+    """Substitute {placeholders}; whole-number results become ints"""
+    if not isinstance(value, str):
+        return value
+    filled = value.format(**groups)
+    return int(filled) if filled.isdigit() and value != filled else filled
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Offline stand-in for the chat model, for deterministic benchmarks
+
+    Picks a script by matching the latest user message, then replays one
+    scripted turn of tool calls per model call. When the script runs out it
+    answers with the tool results it received. Every call sleeps for the
+    configured latency so graph overhead and MCP latency can be measured
+    without network access or API keys.
+    """
+
+    latency: float = 0.05
+    latency_jitter: float = 0.0
+    scripts: List[Dict[str, Any]] = Field(default_factory=default_scripts)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-turf"
+
+    def bind_tools(self, tools, **kwargs):
+        """Tool calls come from the scripts, so binding is a no-op"""
+        return self
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.latency_jitter, self.latency_jitter))
+
+    def _respond(self, messages) -> AIMessage:
+        # Split the conversation into the latest user message and what followed it
+        user_text, run = "", []
+        for message in messages:
+            role = message.get("role") if isinstance(message, dict) else message.type
+            if role in ("user", "human"):
+                user_text = message["content"] if isinstance(message, dict) else message.content
+                run = []
+            else:
+                run.append(message)
+
+        step = sum(1 for m in run if isinstance(m, AIMessage))
+        groups = {"tomorrow": (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")}
+
+        for script in self.scripts:
+            match = re.search(script["pattern"], user_text, re.IGNORECASE | re.DOTALL)
+            if not match:
+                continue
+            groups.update({k: v for k, v in match.groupdict().items() if v is not None})
+            if step < len(script["steps"]):
+                tool_calls = [
+                    {
+                        "name": call["name"],
+                        "args": {k: _fill(v, groups) for k, v in call["args"].items()},
+                        "id": f"call_{uuid.uuid4().hex[:24]}",
+                        "type": "tool_call",
+                    }
+                    for call in script["steps"][step]
+                ]
+                return AIMessage(content="", tool_calls=tool_calls)
+            break
+
+        results = [m.content for m in run if isinstance(m, ToolMessage)]
+        if results:
+            return AIMessage(content="Here is what I found:\n\n" + "\n\n".join(str(r) for r in results))
+        return AIMessage(content="I can list turfs, show bookings, check availability or make a booking.")
+
+    def _result(self, messages) -> ChatResult:
+        response = self._respond(messages)
+        prompt_tokens = sum(
+            _estimate_tokens(str(m.get("content") if isinstance(m, dict) else m.content)) for m in messages
+        )
+        completion_tokens = _estimate_tokens(response.content) + 20 * len(response.tool_calls)
+        response.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay())
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._result(messages)
+
+
+def build_fake_model_from_env() -> ScriptedChatModel:
+    """Create a scripted model configured by TURF_FAKE_MODEL_* environment variables
+
+    TURF_FAKE_MODEL_SCRIPTS may point to a JSON file with a list of
+    {"pattern": ..., "steps": [[{"name": ..., "args": {...}}, ...], ...]} entries.
+    """
+    kwargs = {
+        "latency": float(os.getenv("TURF_FAKE_MODEL_LATENCY", "0.05")),
+        "latency_jitter": float(os.getenv("TURF_FAKE_MODEL_JITTER", "0")),
+    }
+    scripts_path = os.getenv("TURF_FAKE_MODEL_SCRIPTS")
+    if scripts_path:
+        with open(scripts_path) as f:
+            kwargs["scripts"] = json.load(f)
+    return ScriptedChatModel(**kwargs)
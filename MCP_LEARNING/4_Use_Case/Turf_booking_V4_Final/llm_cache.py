@@ -0,0 +1,313 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import messages_from_dict, messages_to_dict
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from tool_policy import conversation_has_write
+
+
+def _message_parts(message) -> Dict[str, Any]:
+    """Reduce a message (dict or BaseMessage) to the fields that affect the model output"""
+    if isinstance(message, dict):
+        role = message.get("role", "user")
+        content = message.get("content", "")
+        tool_calls = message.get("tool_calls") or []
+        name = message.get("name")
+    else:
+        role = message.type
+        content = message.content
+        tool_calls = getattr(message, "tool_calls", None) or []
+        name = getattr(message, "name", None)
+
+    if role == "human":
+        role = "user"
+    if role == "ai":
+        role = "assistant"
+
+    return {
+        "role": role,
+        "content": content,
+        # Tool call IDs differ on every run, so only name and arguments count
+        "tool_calls": [{"name": tc.get("name"), "args": tc.get("args", {})} for tc in tool_calls],
+        "name": name if role == "tool" else None,
+    }
+
+
+def _normalize_text(text: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation"""
+    text = re.sub(r"\s+", " ", text.strip().casefold())
+    return text.rstrip("?!. ")
+
+
+def tools_schema_hash(tools) -> str:
+    """Hash the schemas of the tools bound to the model"""
+    schemas = sorted(
+        (convert_to_openai_tool(tool) for tool in tools),
+        key=lambda schema: schema["function"]["name"],
+    )
+    return hashlib.sha256(json.dumps(schemas, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def make_cache_keys(messages, schema_hash: str):
+    """Return the (exact, normalized) cache keys for a message list"""
+    exact_parts = [_message_parts(m) for m in messages]
+
+    normalized_parts = []
+    for part in exact_parts:
+        part = dict(part)
+        if part["role"] == "user" and isinstance(part["content"], str):
+            part["content"] = _normalize_text(part["content"])
+        normalized_parts.append(part)
+
+    def digest(parts) -> str:
+        payload = json.dumps({"tools": schema_hash, "messages": parts}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    return "exact:" + digest(exact_parts), "norm:" + digest(normalized_parts)
+
+
+class InMemoryLLMCache:
+    """Size-bounded LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str, created_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (created_at or time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteLLMCache:
+    """Persistent cache tier stored in a local SQLite file"""
+
+    def __init__(self, db_name: str = "llm_cache.db", ttl_seconds: float = 300, max_entries: int = 10000):
+        self.db_name = db_name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self._lock:
+            conn = sqlite3.connect(self.db_name)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+            conn.close()
+
+    def get_entry(self, key: str):
+        """Return (created_at, value) for a live entry, or None"""
+        with self._lock:
+            conn = sqlite3.connect(self.db_name)
+            row = conn.execute(
+                "SELECT created_at, response FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and time.time() - row[0] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+            conn.close()
+            return row
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[1] if entry else None
+
+    def put(self, key: str, value: str, created_at: Optional[float] = None):
+        with self._lock:
+            conn = sqlite3.connect(self.db_name)
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, value, created_at or time.time()),
+            )
+            # Keep the file bounded: drop expired rows, then the oldest overflow
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            conn.commit()
+            conn.close()
+
+    def clear(self):
+        with self._lock:
+            conn = sqlite3.connect(self.db_name)
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+            conn.close()
+
+
+class TieredLLMCache:
+    """In-memory LRU in front of an optional persistent SQLite tier"""
+
+    def __init__(self, memory: InMemoryLLMCache, persistent: Optional[SQLiteLLMCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+        entry = self.persistent.get_entry(key)
+        if entry is None:
+            return None
+        # Promote into memory keeping the original timestamp so the TTL still holds
+        self.memory.put(key, entry[1], created_at=entry[0])
+        return entry[1]
+
+    def put(self, key: str, value: str):
+        self.memory.put(key, value)
+        if self.persistent is not None:
+            self.persistent.put(key, value)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Like get, but reads the SQLite tier in a worker thread so the event loop keeps running"""
+        value = self.memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+        entry = await asyncio.to_thread(self.persistent.get_entry, key)
+        if entry is None:
+            return None
+        self.memory.put(key, entry[1], created_at=entry[0])
+        return entry[1]
+
+    async def aput(self, key: str, value: str):
+        """Like put, but writes the SQLite tier in a worker thread"""
+        self.memory.put(key, value)
+        if self.persistent is not None:
+            await asyncio.to_thread(self.persistent.put, key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+
+class CachedChatModel:
+    """Wraps a tool-bound chat model and answers repeated requests from a cache
+
+    Lookups try the exact key first and then the normalized key. Conversations
+    that involve a write tool (e.g. make_booking) bypass the cache entirely,
+    as do sessions that used one in an earlier turn (session_has_written in
+    the run config's configurable).
+    """
+
+    def __init__(self, model, cache, tools):
+        self.model = model
+        self.cache = cache
+        self.schema_hash = tools_schema_hash(tools)
+        self.stats = {
+            "exact_hits": 0,
+            "normalized_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stored": 0,
+        }
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        session_has_written = ((config or {}).get("configurable") or {}).get("session_has_written")
+        if session_has_written or conversation_has_write(messages):
+            self.stats["bypassed"] += 1
+            return await self.model.ainvoke(messages, config, **kwargs)
+
+        exact_key, normalized_key = make_cache_keys(messages, self.schema_hash)
+
+        cached = await self.cache.aget(exact_key)
+        if cached is not None:
+            self.stats["exact_hits"] += 1
+            return self._load(cached)
+
+        cached = await self.cache.aget(normalized_key)
+        if cached is not None:
+            self.stats["normalized_hits"] += 1
+            return self._load(cached)
+
+        self.stats["misses"] += 1
+        response = await self.model.ainvoke(messages, config, **kwargs)
+
+        # Never replay a response that would trigger a write
+        if not conversation_has_write([response]):
+            serialized = json.dumps(messages_to_dict([response]))
+            await self.cache.aput(exact_key, serialized)
+            await self.cache.aput(normalized_key, serialized)
+            self.stats["stored"] += 1
+
+        return response
+
+    def _load(self, serialized: str):
+        """Rebuild a cached message with fresh tool call IDs"""
+        response = messages_from_dict(json.loads(serialized))[0]
+        # Lets usage accounting tell replayed responses from paid ones
+        response.response_metadata = {**(response.response_metadata or {}), "turf_cache": "hit"}
+        if getattr(response, "tool_calls", None):
+            response.tool_calls = [
+                {**tc, "id": f"call_{uuid.uuid4().hex[:24]}"} for tc in response.tool_calls
+            ]
+        return response
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters plus the overall hit ratio"""
+        hits = self.stats["exact_hits"] + self.stats["normalized_hits"]
+        lookups = hits + self.stats["misses"]
+        stats = dict(self.stats)
+        stats["hit_ratio"] = round(hits / lookups, 3) if lookups else 0.0
+        return stats
+
+
+def build_llm_cache_from_env():
+    """Create the cache configured by TURF_LLM_CACHE ('off', 'memory' or 'sqlite')"""
+    mode = os.getenv("TURF_LLM_CACHE", "off").lower()
+    if mode in ("", "off", "0", "false", "none"):
+        return None
+
+    ttl = float(os.getenv("TURF_LLM_CACHE_TTL", "300"))
+    max_entries = int(os.getenv("TURF_LLM_CACHE_MAX_ENTRIES", "256"))
+    memory = InMemoryLLMCache(max_entries=max_entries, ttl_seconds=ttl)
+
+    persistent = None
+    if mode == "sqlite":
+        persistent = SQLiteLLMCache(os.getenv("TURF_LLM_CACHE_DB", "llm_cache.db"), ttl_seconds=ttl)
+    elif mode != "memory":
+        raise ValueError(f"Unknown TURF_LLM_CACHE mode: {mode}")
+
+    return TieredLLMCache(memory, persistent)
@@ -0,0 +1,103 @@
+import asyncio
+import os
+from typing import List
+
+from langchain_core.messages import ToolMessage
+
+import tracing
+from tool_policy import is_write_tool
+
+
+class ParallelToolNode:
+    """Executes the tool calls of one model turn concurrently
+
+    Read-only calls fan out under a concurrency limit, each with its own
+    timeout. Write calls act as barriers: everything before them finishes
+    first and they run alone, so a booking never races an availability check
+    that the model asked for in the same turn. Results come back in the order
+    the model requested them.
+    """
+
+    def __init__(self, tools, max_concurrency: int = 4, timeout_seconds: float = 30):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_seconds = timeout_seconds
+
+    async def _run_call(self, tool_call: dict, semaphore: asyncio.Semaphore, config) -> ToolMessage:
+        """Run one tool call, turning errors and timeouts into error ToolMessages"""
+        tool = self.tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return ToolMessage(
+                content=f"Error: unknown tool {tool_call['name']}",
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
+                status="error",
+            )
+
+        async with semaphore:
+            with tracing.span("tool.call", tool=tool_call["name"]):
+                args = tool_call["args"]
+                if tracing.enabled() and "trace_parent" in (tool.args or {}):
+                    # Let turf_server.py attach its spans to this request's trace
+                    args = {**args, "trace_parent": tracing.trace_parent()}
+                try:
+                    result = await asyncio.wait_for(
+                        tool.ainvoke({**tool_call, "args": args, "type": "tool_call"}, config),
+                        timeout=self.timeout_seconds,
+                    )
+                except asyncio.TimeoutError:
+                    return ToolMessage(
+                        content=f"Error: {tool_call['name']} timed out after {self.timeout_seconds}s",
+                        name=tool_call["name"],
+                        tool_call_id=tool_call["id"],
+                        status="error",
+                    )
+                except Exception as e:
+                    return ToolMessage(
+                        content=f"Error: {e}",
+                        name=tool_call["name"],
+                        tool_call_id=tool_call["id"],
+                        status="error",
+                    )
+
+        if isinstance(result, ToolMessage):
+            return result
+        return ToolMessage(content=str(result), name=tool_call["name"], tool_call_id=tool_call["id"])
+
+    def _batches(self, tool_calls: List[dict]) -> List[List[dict]]:
+        """Split calls into concurrent read batches separated by single write calls"""
+        batches = []
+        current = []
+        for tool_call in tool_calls:
+            if is_write_tool(tool_call["name"]):
+                if current:
+                    batches.append(current)
+                    current = []
+                batches.append([tool_call])
+            else:
+                current.append(tool_call)
+        if current:
+            batches.append(current)
+        return batches
+
+    async def ainvoke(self, state, config=None):
+        """ToolNode-compatible entry point returning {"messages": [...]}"""
+        tool_calls = state["messages"][-1].tool_calls
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        tool_messages = []
+        for batch in self._batches(tool_calls):
+            # gather keeps the results in request order
+            tool_messages.extend(
+                await asyncio.gather(*(self._run_call(tc, semaphore, config) for tc in batch))
+            )
+        return {"messages": tool_messages}
+
+
+def build_parallel_tool_node(tools) -> ParallelToolNode:
+    """Create a ParallelToolNode configured by TURF_TOOL_CONCURRENCY and TURF_TOOL_TIMEOUT"""
+    return ParallelToolNode(
+        tools,
+        max_concurrency=int(os.getenv("TURF_TOOL_CONCURRENCY", "4")),
+        timeout_seconds=float(os.getenv("TURF_TOOL_TIMEOUT", "30")),
+    )
@@ -1,10 +1,13 @@
 from mcp.server import Server
 import mcp.types as types
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import asyncio
 from langchain_google_genai import ChatGoogleGenerativeAI
+from turf_logging import get_logger
+
+log = get_logger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -113,6 +116,27 @@ PROMPTS = {
     )
 }
 
+def date_range_bounds(date_range: str, today=None):
+    """(start_date, end_date) for a named range such as 'this_week'; empty strings when unknown"""
+    today = today or datetime.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    ranges = {
+        "today": (today, today),
+        "this_week": (week_start, week_start + timedelta(days=6)),
+        "next_week": (week_start + timedelta(days=7), week_start + timedelta(days=13)),
+        "last_week": (week_start - timedelta(days=7), week_start - timedelta(days=1)),
+        "this_month": (month_start, next_month - timedelta(days=1)),
+        "next_month": (next_month, (next_month + timedelta(days=32)).replace(day=1) - timedelta(days=1)),
+        "last_month": ((month_start - timedelta(days=1)).replace(day=1), month_start - timedelta(days=1)),
+        "last_30_days": (today - timedelta(days=29), today),
+    }
+    if date_range not in ranges:
+        return "", ""
+    start, end = ranges[date_range]
+    return start.isoformat(), end.isoformat()
+
 # Initialize server
 app = Server("turf-booking-prompts-server")
 
@@ -227,6 +251,13 @@ async def get_prompt(
     elif name == "booking-summary":
         turf_id = args.get("turf_id", "")
         date_range = args.get("date_range", "current")
+        start_date, end_date = date_range_bounds(date_range)
+        if start_date:
+            stats_call = f'get_booking_stats(turf_id={turf_id}, start_date="{start_date}", end_date="{end_date}")'
+        elif date_range in ("", "current", "all"):
+            stats_call = f"get_booking_stats(turf_id={turf_id})"
+        else:
+            stats_call = f"get_booking_stats(turf_id={turf_id}) with start_date/end_date covering '{date_range}'"
         
         return types.GetPromptResult(
             messages=[
@@ -236,11 +267,13 @@ async def get_prompt(
                         type="text",
                         text=f"Generate a comprehensive summary for turf {turf_id} ({date_range}). "
                         f"Please:\n"
-                        f"1. Use get_all_turfs to get turf details\n"
-                        f"2. Use get_all_bookings to get booking information\n"
-                        f"3. Use check_turf_availability to check upcoming availability\n\n"
-                        f"Provide insights on booking patterns, popular time slots, revenue information, "
-                        f"and recommendations for optimal booking times."
+                        f"1. Use {stats_call} for bookings, booked hours, revenue, occupancy, "
+                        f"and the per-hour and per-day breakdowns\n"
+                        f"2. Use check_turf_availability to check upcoming availability\n"
+                        f"3. Use recommend_slots(turf_id={turf_id}) for the forecast quiet and peak booking times\n\n"
+                        f"Base every number on the get_booking_stats figures rather than counting bookings "
+                        f"yourself, and base the recommendations for optimal booking times on recommend_slots. "
+                        f"Provide insights on booking patterns, popular time slots and revenue information."
                     )
                 )
             ]
@@ -286,9 +319,9 @@ async def initialize_processor():
     global prompt_processor
     try:
         prompt_processor = PromptLLMProcessor()
-        print("✅ Prompt LLM Processor initialized successfully")
+        log.info("prompt llm processor initialized")
     except Exception as e:
-        print(f"❌ Failed to initialize processor: {e}")
+        log.exception("prompt llm processor initialization failed")
 
 async def process_prompt_request(prompt_name: str, arguments: dict = None) -> str:
     """Public function to process prompt requests"""
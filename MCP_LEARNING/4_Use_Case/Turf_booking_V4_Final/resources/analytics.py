@@ -0,0 +1,160 @@
+"""Occupancy heatmaps, utilization percentiles and peak windows with NumPy.
+
+Confirmed bookings, archived ones included (the bookings_all view), are
+loaded once as a columnar array (turf, day, start and end minute, cost)
+and every figure is computed with vectorized operations over it:
+
+- heatmap: turf × weekday × hour-of-day occupancy, the booked minutes of
+  each cell over the minutes that cell had in the date range
+- percentiles: per turf, percentiles of the daily utilization over every
+  day of the range (days without bookings count as 0)
+- peak windows: the busiest runs of consecutive opening hours per weekday
+"""
+import itertools
+from datetime import datetime
+
+import numpy as np
+
+from resources.server_all import CLOSING_HOUR, OPENING_HOUR, db
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+PERCENTILES = (50, 75, 90, 95)
+
+# Columns of the array returned by load_bookings
+TURF, DAY, START, END, COST = range(5)
+
+
+def load_bookings(turf_id: int = 0, start_date: str = "", end_date: str = "") -> np.ndarray:
+    """Confirmed bookings as an (n, 5) float array: turf_id, day number, start/end minute, cost
+
+    The day number is the Julian day, so day % 7 is the weekday with Monday = 0.
+    Rows are gathered from the turf's shard, or from every shard for turf 0.
+    """
+    rows = []
+    for shard in [db.shard_for(turf_id)] if turf_id else range(db.shard_count):
+        conn = db.get_shard_connection(shard, catalog=False)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT turf_id,
+                   CAST(julianday(booking_date) + 0.5 AS INTEGER),
+                   CAST(substr(start_time, 1, 2) AS INTEGER) * 60 + CAST(substr(start_time, 4, 2) AS INTEGER),
+                   CAST(substr(end_time, 1, 2) AS INTEGER) * 60 + CAST(substr(end_time, 4, 2) AS INTEGER),
+                   total_cost
+            FROM bookings_all
+            WHERE status = 'confirmed'
+              AND (? = 0 OR turf_id = ?)
+              AND (? = '' OR booking_date >= ?)
+              AND (? = '' OR booking_date <= ?)
+        """, (turf_id, turf_id, start_date, start_date, end_date, end_date))
+        rows.extend(cursor.fetchall())
+        conn.close()
+    # One pass from the row tuples straight into a flat float buffer
+    flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64, count=len(rows) * 5)
+    return flat.reshape(len(rows), 5)
+
+
+def day_number(date: str) -> int:
+    # Same numbering as load_bookings: Julian day number, 0 = Monday modulo 7
+    return datetime.strptime(date, "%Y-%m-%d").toordinal() + 1721425
+
+
+def hourly_minutes(bookings: np.ndarray) -> np.ndarray:
+    """(n, 24) booked minutes of each booking inside each hour of the day"""
+    starts = np.arange(24) * 60
+    return np.clip(
+        np.minimum(bookings[:, END, None], starts + 60) - np.maximum(bookings[:, START, None], starts),
+        0, 60,
+    )
+
+
+def occupancy_heatmap(bookings: np.ndarray, turf_ids: np.ndarray, first_day: int, last_day: int) -> np.ndarray:
+    """(turfs, 7, 24) share of each weekday/hour cell that was booked between first_day and last_day"""
+    turf_index = np.searchsorted(turf_ids, bookings[:, TURF].astype(np.int64))
+    weekday = bookings[:, DAY].astype(np.int64) % 7
+    booked = np.zeros((len(turf_ids), 7, 24))
+    np.add.at(booked, (turf_index[:, None], weekday[:, None], np.arange(24)[None, :]), hourly_minutes(bookings))
+    # How often each weekday occurs in the range
+    weekday_count = np.bincount(np.arange(first_day, last_day + 1) % 7, minlength=7)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nan_to_num(booked / (weekday_count[None, :, None] * 60.0))
+
+
+def utilization_percentiles(bookings: np.ndarray, turf_ids: np.ndarray, first_day: int, last_day: int,
+                            open_minutes: int) -> np.ndarray:
+    """(turfs, len(PERCENTILES)) percentiles of daily utilization per turf"""
+    turf_index = np.searchsorted(turf_ids, bookings[:, TURF].astype(np.int64))
+    day_index = bookings[:, DAY].astype(np.int64) - first_day
+    daily = np.zeros((len(turf_ids), last_day - first_day + 1))
+    np.add.at(daily, (turf_index, day_index), bookings[:, END] - bookings[:, START])
+    return np.percentile(daily / open_minutes, PERCENTILES, axis=1).T
+
+
+def peak_windows(heatmap: np.ndarray, window_hours: int, top: int):
+    """(turf index, weekday, start hour, mean occupancy) of the busiest windows within opening hours"""
+    hours = heatmap[:, :, OPENING_HOUR:CLOSING_HOUR]
+    cumulative = np.concatenate([np.zeros(hours.shape[:2] + (1,)), np.cumsum(hours, axis=2)], axis=2)
+    means = (cumulative[:, :, window_hours:] - cumulative[:, :, :-window_hours]) / window_hours
+    flat = means.ravel()
+    top = min(top, flat.size)
+    best = np.argpartition(-flat, top - 1)[:top]
+    best = best[np.argsort(-flat[best], kind="stable")]
+    turf, weekday, start = np.unravel_index(best, means.shape)
+    return [(int(t), int(w), int(s) + OPENING_HOUR, float(flat[i]))
+            for t, w, s, i in zip(turf, weekday, start, best) if flat[i] > 0]
+
+
+def fetch_occupancy_heatmap(turf_id=0, start_date="", end_date="", window_hours=2, top=5):
+    """Heatmap, utilization percentiles and peak windows as compact nested lists
+
+    occupancy[t][w][h] is turf turf_ids[t], weekday WEEKDAYS[w] and hour
+    hours[h]; only opening hours are returned. Empty dates span the first to
+    the last booked day.
+    """
+    try:
+        turf_id = int(turf_id or 0)
+        window_hours = max(1, min(int(window_hours), CLOSING_HOUR - OPENING_HOUR))
+        top = max(1, min(int(top), 50))
+        for value in (start_date, end_date):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return {"error": "Invalid turf ID, window or date format. Use YYYY-MM-DD for dates."}
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, name FROM turfs WHERE (? = 0 OR id = ?) ORDER BY id", (turf_id, turf_id))
+    turfs = cursor.fetchall()
+    conn.close()
+    if not turfs:
+        return {"error": f"Turf with ID {turf_id} not found"}
+
+    bookings = load_bookings(turf_id, start_date, end_date)
+    if not len(bookings) and not (start_date and end_date):
+        return {"error": "No confirmed bookings in this period"}
+    first_day = day_number(start_date) if start_date else int(bookings[:, DAY].min())
+    last_day = day_number(end_date) if end_date else int(bookings[:, DAY].max())
+    if last_day < first_day:
+        return {"error": "end_date is before start_date"}
+
+    turf_ids = np.array([turf[0] for turf in turfs], dtype=np.int64)
+    heatmap = occupancy_heatmap(bookings, turf_ids, first_day, last_day)
+    open_minutes = (CLOSING_HOUR - OPENING_HOUR) * 60
+    percentiles = utilization_percentiles(bookings, turf_ids, first_day, last_day, open_minutes)
+
+    return {
+        "from": datetime.fromordinal(first_day - 1721425).strftime("%Y-%m-%d"),
+        "to": datetime.fromordinal(last_day - 1721425).strftime("%Y-%m-%d"),
+        "bookings": len(bookings),
+        "turf_ids": turf_ids.tolist(),
+        "turf_names": [turf[1] for turf in turfs],
+        "weekdays": list(WEEKDAYS),
+        "hours": list(range(OPENING_HOUR, CLOSING_HOUR)),
+        "occupancy": np.round(heatmap[:, :, OPENING_HOUR:CLOSING_HOUR], 3).tolist(),
+        "percentiles": list(PERCENTILES),
+        "utilization": np.round(percentiles, 3).tolist(),
+        "peak_windows": [
+            {"turf_id": int(turf_ids[t]), "weekday": WEEKDAYS[w], "start": f"{s:02d}:00",
+             "end": f"{s + window_hours:02d}:00", "occupancy": round(value, 3)}
+            for t, w, s, value in peak_windows(heatmap, window_hours, top)
+        ],
+    }
@@ -0,0 +1,192 @@
+"""Slot demand forecast: expected occupancy per turf, weekday and hour.
+
+Each turf/weekday/hour cell is an exponentially smoothed average of that
+cell's weekly occupancy over the last TURF_FORECAST_WEEKS weeks (oldest
+week first, smoothing factor TURF_FORECAST_ALPHA). The result is stored in
+the slot_forecast table, so recommendations are a table lookup; a forecast
+older than TURF_FORECAST_MAX_AGE_HOURS is still served, marked stale. The
+table is recomputed off the request path: by ForecastWorker, which
+turf_server.py starts to refresh a stale forecast every
+TURF_FORECAST_CHECK_MINUTES, or nightly from cron with
+
+    python -m resources.forecast
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from resources.analytics import DAY, TURF, WEEKDAYS, day_number, hourly_minutes, load_bookings
+from resources.server_all import CLOSING_HOUR, OPENING_HOUR, db
+from turf_logging import get_logger
+
+log = get_logger(__name__)
+
+FORECAST_WEEKS = int(os.getenv("TURF_FORECAST_WEEKS", "12"))
+FORECAST_ALPHA = float(os.getenv("TURF_FORECAST_ALPHA", "0.3"))
+FORECAST_MAX_AGE_HOURS = float(os.getenv("TURF_FORECAST_MAX_AGE_HOURS", "24"))
+FORECAST_CHECK_MINUTES = float(os.getenv("TURF_FORECAST_CHECK_MINUTES", "60"))
+
+
+def compute_forecast(turf_ids: np.ndarray, today=None, weeks: int = FORECAST_WEEKS,
+                     alpha: float = FORECAST_ALPHA) -> np.ndarray:
+    """(turfs, 7, 24) smoothed weekly occupancy of the `weeks` weeks before today"""
+    today = today or datetime.now().date()
+    end_day = day_number(today.isoformat())
+    start_day = end_day - weeks * 7
+    bookings = load_bookings(0, (today - timedelta(days=weeks * 7)).isoformat(),
+                             (today - timedelta(days=1)).isoformat())
+    bookings = bookings[np.isin(bookings[:, TURF].astype(np.int64), turf_ids)]
+
+    turf_index = np.searchsorted(turf_ids, bookings[:, TURF].astype(np.int64))
+    day = bookings[:, DAY].astype(np.int64)
+    weekly = np.zeros((len(turf_ids), weeks, 7, 24))
+    np.add.at(weekly, (turf_index[:, None], ((day - start_day) // 7)[:, None], (day % 7)[:, None],
+                       np.arange(24)[None, :]), hourly_minutes(bookings) / 60.0)
+
+    level = weekly[:, 0]
+    for week in range(1, weeks):
+        level = alpha * weekly[:, week] + (1 - alpha) * level
+    return level
+
+
+def refresh_forecast(force: bool = False, now=None) -> dict:
+    """Recompute slot_forecast when it is empty, stale or force is set"""
+    now = now or datetime.now()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MIN(computed_at) FROM slot_forecast")
+        computed_at = cursor.fetchone()[0]
+        if not force and computed_at and \
+                now - datetime.fromisoformat(computed_at) < timedelta(hours=FORECAST_MAX_AGE_HOURS):
+            return {"computed_at": computed_at, "refreshed": False}
+
+        cursor.execute("SELECT id FROM turfs ORDER BY id")
+        turf_ids = np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+        forecast = compute_forecast(turf_ids, now.date())
+        computed_at = now.isoformat(timespec="seconds")
+        turf, weekday, hour = np.meshgrid(np.arange(len(turf_ids)), np.arange(7), np.arange(24), indexing="ij")
+        rows = zip(turf_ids[turf.ravel()].tolist(), weekday.ravel().tolist(), hour.ravel().tolist(),
+                   np.round(forecast.ravel(), 4).tolist(), [computed_at] * forecast.size)
+        cursor.execute("DELETE FROM slot_forecast")
+        cursor.executemany(
+            "INSERT INTO slot_forecast (turf_id, weekday, hour, expected_occupancy, computed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    log.info("slot forecast refreshed", turfs=len(turf_ids), weeks=FORECAST_WEEKS, alpha=FORECAST_ALPHA)
+    return {"computed_at": computed_at, "refreshed": True}
+
+
+class ForecastWorker(threading.Thread):
+    """Refreshes slot_forecast in the background whenever it is empty or stale"""
+
+    def __init__(self, interval_minutes: float):
+        super().__init__(name="turf-forecast", daemon=True)
+        self.interval = interval_minutes * 60
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while True:
+            try:
+                refresh_forecast()
+            except sqlite3.Error:
+                log.exception("forecast refresh failed")
+            if self._stop_event.wait(self.interval):
+                break
+
+
+def _slot_key(row, busiest: bool):
+    # Same order as the ORDER BY of _slots
+    return -row[4] if busiest else row[4], row[0], row[2], row[3]
+
+
+def _slots(cursor, shard: int, turf_id: int, weekday: int, date: str, top: int, busiest: bool):
+    # Quiet slots skip hours already booked on the requested date; busy ones need some demand.
+    # Runs on one shard (slot_forecast and turfs attached) for the turfs whose bookings it holds.
+    cursor.execute(f"""
+        SELECT f.turf_id, t.name, f.weekday, f.hour, f.expected_occupancy
+        FROM slot_forecast f
+        JOIN turfs t ON t.id = f.turf_id
+        WHERE (? = 0 OR f.turf_id = ?)
+          AND f.turf_id % ? = ?
+          AND (? < 0 OR f.weekday = ?)
+          AND f.hour >= ? AND f.hour < ?
+          AND (NOT ? OR f.expected_occupancy > 0)
+          AND (? OR ? = '' OR NOT EXISTS (
+              SELECT 1 FROM bookings b
+              WHERE b.turf_id = f.turf_id AND b.booking_date = ? AND b.status = 'confirmed'
+                AND b.start_time < printf('%02d:00', f.hour + 1) AND b.end_time > printf('%02d:00', f.hour)
+          ))
+        ORDER BY f.expected_occupancy {"DESC" if busiest else "ASC"}, f.turf_id, f.weekday, f.hour
+        LIMIT ?
+    """, (turf_id, turf_id, db.shard_count, shard, weekday, weekday, OPENING_HOUR, CLOSING_HOUR, busiest, busiest,
+          date, date, top))
+    return cursor.fetchall()
+
+
+def _slot_record(row):
+    return {"turf_id": row[0], "turf": row[1], "weekday": WEEKDAYS[row[2]], "start": f"{row[3]:02d}:00",
+            "end": f"{row[3] + 1:02d}:00", "expected_occupancy": row[4]}
+
+
+def fetch_slot_recommendations(turf_id=0, date="", top=5):
+    """Quietest (best to book) and busiest forecast slots, optionally for one date
+
+    A read-only lookup: the forecast is never recomputed here (see ForecastWorker).
+    """
+    try:
+        turf_id = int(turf_id or 0)
+        top = max(1, min(int(top), 50))
+        weekday = datetime.strptime(date, "%Y-%m-%d").weekday() if date else -1
+    except ValueError:
+        return {"error": "Invalid turf ID or date format. Use YYYY-MM-DD for date."}
+
+    conn = db.get_connection()
+    computed_at = conn.execute("SELECT MIN(computed_at) FROM slot_forecast").fetchone()[0]
+    conn.close()
+    if computed_at is None:
+        return {"error": "No forecast computed yet; run python -m resources.forecast"}
+
+    quiet, busy = [], []
+    for shard in [db.shard_for(turf_id)] if turf_id else range(db.shard_count):
+        conn = db.get_shard_connection(shard)
+        cursor = conn.cursor()
+        quiet += _slots(cursor, shard, turf_id, weekday, date, top, busiest=False)
+        busy += _slots(cursor, shard, turf_id, weekday, date, top, busiest=True)
+        conn.close()
+    # Each shard returned its own top slots; keep the overall top
+    quiet = [_slot_record(row) for row in sorted(quiet, key=lambda row: _slot_key(row, False))[:top]]
+    busy = [_slot_record(row) for row in sorted(busy, key=lambda row: _slot_key(row, True))[:top]]
+    if not quiet and not busy:
+        return {"error": f"No forecast for turf {turf_id}" if turf_id else "No forecast available"}
+    return {
+        "computed_at": computed_at,
+        "stale": datetime.now() - datetime.fromisoformat(computed_at) >= timedelta(hours=FORECAST_MAX_AGE_HOURS),
+        "date": date or None,
+        "quiet": quiet,
+        "busy": busy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the slot demand forecast (run nightly)")
+    parser.add_argument("--if-stale", action="store_true",
+                        help="only recompute when older than TURF_FORECAST_MAX_AGE_HOURS")
+    args = parser.parse_args()
+    status = refresh_forecast(force=not args.if_stale)
+    print(f"Slot forecast {'refreshed' if status['refreshed'] else 'still fresh'} ({status['computed_at']})")
+
+
+if __name__ == "__main__":
+    main()
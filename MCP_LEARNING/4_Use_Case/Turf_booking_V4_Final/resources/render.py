@@ -0,0 +1,656 @@
+"""Renderers for the turf tools' data (see the data layer in server_all.py).
+
+Every tool result can be rendered in three formats:
+
+- "text":  the original emoji-decorated prose, for people (default)
+- "json":  compact JSON following OUTPUT_SCHEMAS, for programs
+- "table": terse pipe-separated rows, the cheapest form for an LLM
+
+The default comes from TURF_TOOL_OUTPUT_FORMAT. Errors are {"error": msg}
+in the data layer and are rendered per format as well. Rows are formatted
+lazily into one buffer (never by repeated string concatenation) and
+listings are capped at TURF_TOOL_MAX_OUTPUT_CHARS. A listing may carry a
+"total" row count when its records are only the first part of a longer,
+streamed listing (see render_chunk).
+"""
+import io
+import json
+import os
+from typing import Callable, Iterable, List
+
+OUTPUT_FORMATS = ("text", "json", "table")
+
+_ERROR_SCHEMA = {
+    "type": "object",
+    "properties": {"error": {"type": "string"}},
+    "required": ["error"],
+}
+
+# JSON Schemas of the "json" output, by data kind
+OUTPUT_SCHEMAS = {
+    "turfs": {
+        "type": "object",
+        "properties": {
+            "turfs": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "name": {"type": "string"},
+                        "location": {"type": "string"},
+                        "hourly_rate": {"type": "number"},
+                        "capacity": {"type": "integer"},
+                        "facilities": {"type": ["string", "null"]},
+                    },
+                    "required": ["id", "name", "location", "hourly_rate", "capacity"],
+                },
+            },
+            "truncated": {"type": "integer", "description": "rows left out by the output cap"},
+        },
+        "required": ["turfs"],
+    },
+    "bookings": {
+        "type": "object",
+        "properties": {
+            "bookings": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "turf": {"type": "string"},
+                        "date": {"type": "string", "format": "date"},
+                        "start": {"type": "string", "pattern": "^\\d{2}:\\d{2}$"},
+                        "end": {"type": "string", "pattern": "^\\d{2}:\\d{2}$"},
+                        "cost": {"type": "number"},
+                        "status": {"type": "string"},
+                    },
+                    "required": ["id", "turf", "date", "start", "end", "cost", "status"],
+                },
+            },
+            "truncated": {"type": "integer", "description": "rows left out by the output cap"},
+        },
+        "required": ["bookings"],
+    },
+    "availability": {
+        "oneOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "turf": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "name": {"type": "string"},
+                            "location": {"type": "string"},
+                            "hourly_rate": {"type": "number"},
+                        },
+                    },
+                    "date": {"type": "string", "format": "date"},
+                    "booked": {
+                        "description": "[start, end] pairs of confirmed bookings",
+                        "type": "array",
+                        "items": {"type": "array", "items": {"type": "string"}, "minItems": 2, "maxItems": 2},
+                    },
+                    "available": {
+                        "description": "[start, end] free ranges, bookable in one-hour slots",
+                        "type": "array",
+                        "items": {"type": "array", "items": {"type": "string"}, "minItems": 2, "maxItems": 2},
+                    },
+                },
+                "required": ["turf", "date", "booked", "available"],
+            },
+            _ERROR_SCHEMA,
+        ],
+    },
+    "changes": {
+        "oneOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "cursor": {"type": ["integer", "string"],
+                               "description": "pass to the next call (\"seq0.seq1...\" with several shards)"},
+                    "has_more": {"type": "boolean"},
+                    "changes": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "seq": {"type": ["integer", "string"],
+                                        "description": "\"shard.seq\" with several shards"},
+                                "op": {"enum": ["insert", "update", "cancel", "delete"]},
+                                "id": {"type": "integer"},
+                                "turf": {"type": ["string", "null"]},
+                                "date": {"type": ["string", "null"]},
+                                "start": {"type": ["string", "null"]},
+                                "end": {"type": ["string", "null"]},
+                                "cost": {"type": ["number", "null"]},
+                                "status": {"type": ["string", "null"]},
+                            },
+                            "required": ["seq", "op", "id"],
+                        },
+                    },
+                },
+                "required": ["cursor", "has_more", "changes"],
+            },
+            _ERROR_SCHEMA,
+        ],
+    },
+    "stats": {
+        "oneOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "turf_id": {"type": ["integer", "null"], "description": "null for all turfs"},
+                    "from": {"type": "string"},
+                    "to": {"type": "string"},
+                    "totals": {"$ref": "#/$defs/figures"},
+                    "per_turf": {
+                        "type": "array",
+                        "items": {
+                            "allOf": [
+                                {"$ref": "#/$defs/figures"},
+                                {"properties": {"id": {"type": "integer"}, "name": {"type": "string"}}},
+                            ],
+                        },
+                    },
+                    "per_hour": {
+                        "type": "array",
+                        "items": {
+                            "allOf": [
+                                {"$ref": "#/$defs/figures"},
+                                {"properties": {"hour": {"type": "integer", "minimum": 0, "maximum": 23}}},
+                            ],
+                        },
+                    },
+                    "per_day": {
+                        "type": "array",
+                        "items": {
+                            "allOf": [
+                                {"$ref": "#/$defs/figures"},
+                                {"properties": {"date": {"type": "string", "format": "date"}}},
+                            ],
+                        },
+                    },
+                },
+                "required": ["from", "to", "totals", "per_turf", "per_hour", "per_day"],
+            },
+            _ERROR_SCHEMA,
+        ],
+        "$defs": {
+            "figures": {
+                "type": "object",
+                "properties": {
+                    "bookings": {"type": "integer"},
+                    "booked_minutes": {"type": "integer"},
+                    "revenue": {"type": "number"},
+                    "occupancy": {"type": "number",
+                                  "description": "share of bookable minutes booked; only with both dates set"},
+                },
+            },
+        },
+    },
+    "heatmap": {
+        "oneOf": [
+            {
+                "type": "object",
+                "description": "occupancy[t][w][h] belongs to turf_ids[t], weekdays[w] and hours[h]",
+                "properties": {
+                    "from": {"type": "string", "format": "date"},
+                    "to": {"type": "string", "format": "date"},
+                    "bookings": {"type": "integer"},
+                    "turf_ids": {"type": "array", "items": {"type": "integer"}},
+                    "turf_names": {"type": "array", "items": {"type": "string"}},
+                    "weekdays": {"type": "array", "items": {"type": "string"}},
+                    "hours": {"type": "array", "items": {"type": "integer"}},
+                    "occupancy": {
+                        "description": "share of each turf/weekday/hour cell that was booked",
+                        "type": "array",
+                        "items": {"type": "array", "items": {"type": "array", "items": {"type": "number"}}},
+                    },
+                    "percentiles": {"type": "array", "items": {"type": "integer"}},
+                    "utilization": {
+                        "description": "utilization[t][p]: percentiles[p] of turf t's daily utilization",
+                        "type": "array",
+                        "items": {"type": "array", "items": {"type": "number"}},
+                    },
+                    "peak_windows": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "turf_id": {"type": "integer"},
+                                "weekday": {"type": "string"},
+                                "start": {"type": "string"},
+                                "end": {"type": "string"},
+                                "occupancy": {"type": "number"},
+                            },
+                        },
+                    },
+                },
+                "required": ["from", "to", "turf_ids", "weekdays", "hours", "occupancy", "utilization",
+                             "peak_windows"],
+            },
+            _ERROR_SCHEMA,
+        ],
+    },
+    "forecast": {
+        "oneOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "computed_at": {"type": "string"},
+                    "stale": {"type": "boolean", "description": "older than TURF_FORECAST_MAX_AGE_HOURS"},
+                    "date": {"type": ["string", "null"]},
+                    "quiet": {
+                        "description": "lowest expected demand first; slots booked on date are left out",
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "turf_id": {"type": "integer"},
+                                "turf": {"type": "string"},
+                                "weekday": {"type": "string"},
+                                "start": {"type": "string"},
+                                "end": {"type": "string"},
+                                "expected_occupancy": {"type": "number"},
+                            },
+                        },
+                    },
+                    "busy": {
+                        "description": "highest expected demand first",
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "turf_id": {"type": "integer"},
+                                "turf": {"type": "string"},
+                                "weekday": {"type": "string"},
+                                "start": {"type": "string"},
+                                "end": {"type": "string"},
+                                "expected_occupancy": {"type": "number"},
+                            },
+                        },
+                    },
+                },
+                "required": ["computed_at", "stale", "quiet", "busy"],
+            },
+            _ERROR_SCHEMA,
+        ],
+    },
+    "booking": {
+        "oneOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "booking_id": {"type": "integer"},
+                    "turf": {"type": "string"},
+                    "customer": {"type": "string"},
+                    "phone": {"type": "string"},
+                    "date": {"type": "string", "format": "date"},
+                    "start": {"type": "string"},
+                    "end": {"type": "string"},
+                    "hours": {"type": "number"},
+                    "cost": {"type": "number"},
+                    "status": {"type": "string"},
+                },
+                "required": ["booking_id", "turf", "date", "start", "end", "cost", "status"],
+            },
+            _ERROR_SCHEMA,
+        ],
+    },
+}
+
+
+def default_format() -> str:
+    return os.getenv("TURF_TOOL_OUTPUT_FORMAT", "text").lower()
+
+
+def default_max_chars() -> int:
+    """Output cap in characters (TURF_TOOL_MAX_OUTPUT_CHARS, 0 = unlimited)"""
+    return int(os.getenv("TURF_TOOL_MAX_OUTPUT_CHARS", "200000"))
+
+
+def write_capped(header: str, rows: Iterable[str], total: int, max_chars: int,
+                 footer: Callable[[int], str]) -> str:
+    """Stream header, rows and footer into one buffer, stopping before max_chars
+
+    Rows are formatted lazily, so rows past the cap are never built.
+    footer(dropped) closes the output and says how many rows were left out
+    (0 when all of them fit); room for it is kept below the cap.
+    """
+    out = io.StringIO()
+    out.write(header)
+    size = len(header) + len(footer(total))
+    written = 0
+    for row in rows:
+        if max_chars and size + len(row) > max_chars:
+            break
+        out.write(row)
+        size += len(row)
+        written += 1
+    out.write(footer(total - written))
+    return out.getvalue()
+
+
+def _text_footer(max_chars: int) -> Callable[[int], str]:
+    return lambda dropped: (
+        f"… {dropped} more not shown (output capped at {max_chars} characters)\n" if dropped else ""
+    )
+
+
+# ----- text (human-readable) -----
+
+_DIVIDER = "-" * 40 + "\n"
+
+_TURF_TEXT = (
+    "ID: {id}\n"
+    "Name: {name}\n"
+    "Location: {location}\n"
+    "Rate: ₹{hourly_rate}/hour\n"
+    "Capacity: {capacity} players\n"
+    "Facilities: {facilities}\n"
+) + _DIVIDER
+
+_BOOKING_TEXT = (
+    "Booking ID: {id}\n"
+    "Turf: {turf}\n"
+    "Date: {date}\n"
+    "Time: {start} - {end}\n"
+    "Cost: ₹{cost}\n"
+    "Status: {status}\n"
+) + _DIVIDER
+
+
+_ROW_TEXT = {"turfs": _TURF_TEXT, "bookings": _BOOKING_TEXT}
+
+
+def _turfs_text(data: dict, max_chars: int) -> str:
+    turfs = data["turfs"]
+    if not turfs:
+        return "No turfs available"
+    return write_capped("🏟️ Available Turfs:\n\n", (_TURF_TEXT.format_map(t) for t in turfs),
+                        data.get("total", len(turfs)), max_chars, _text_footer(max_chars))
+
+
+def _bookings_text(data: dict, max_chars: int) -> str:
+    bookings = data["bookings"]
+    if not bookings:
+        return "No bookings found"
+    return write_capped("📅 All Bookings:\n\n", (_BOOKING_TEXT.format_map(b) for b in bookings),
+                        data.get("total", len(bookings)), max_chars, _text_footer(max_chars))
+
+
+def _availability_text(data: dict, max_chars: int) -> str:
+    if "error" in data:
+        return data["error"]
+
+    turf = data["turf"]
+    header = (
+        f"🏟️ {turf['name']} - {turf['location']}\n"
+        f"📅 Availability for {data['date']}\n"
+        f"💰 Rate: ₹{turf['hourly_rate']}/hour\n\n"
+    )
+    if not data["booked"]:
+        return header + "✅ Fully Available (6:00 AM - 11:00 PM)"
+
+    # ❌ No customer name shown
+    booked = "".join(f"• {start} - {end}\n" for start, end in data["booked"])
+    if data["available"]:
+        free = "".join(
+            f"• {hour:02d}:00 - {hour + 1:02d}:00\n"
+            for start, end in data["available"]
+            for hour in range(int(start[:2]), int(end[:2]))
+        )
+    else:
+        free = "No slots available"
+    return f"{header}🔴 Booked Slots:\n{booked}\n✅ Available Slots:\n{free}"
+
+
+def _change_text(change: dict) -> str:
+    if change["op"] == "delete":
+        return f"#{change['seq']} delete: Booking {change['id']}\n"
+    return (f"#{change['seq']} {change['op']}: Booking {change['id']} | {change['turf']} | {change['date']} "
+            f"{change['start']} - {change['end']} | ₹{change['cost']} | {change['status']}\n")
+
+
+def _changes_text(data: dict, max_chars: int) -> str:
+    if "error" in data:
+        return f"❌ {data['error']}"
+
+    changes = data["changes"]
+    if not changes:
+        return f"No booking changes (cursor: {data['cursor']})"
+    more = ", more available" if data["has_more"] else ""
+    return write_capped(f"🔄 Booking Changes (next cursor: {data['cursor']}{more}):\n\n",
+                        (_change_text(change) for change in changes), len(changes), max_chars,
+                        _text_footer(max_chars))
+
+
+def _figures_text(figures: dict) -> str:
+    text = f"{figures['bookings']} bookings, {figures['booked_minutes'] / 60:g} h, ₹{figures['revenue']}"
+    if "occupancy" in figures:
+        text += f", {figures['occupancy']:.0%} occupied"
+    return text
+
+
+def _stats_text(data: dict, max_chars: int) -> str:
+    if "error" in data:
+        return f"❌ {data['error']}"
+
+    if not data["totals"]["bookings"]:
+        return "No confirmed bookings in this period"
+    scope = data["per_turf"][0]["name"] if data["turf_id"] else "All Turfs"
+    parts = [
+        f"📊 Booking Summary: {scope} ({data['from']} to {data['to']})\n",
+        f"Total: {_figures_text(data['totals'])}\n",
+    ]
+    if not data["turf_id"]:
+        parts.append("\n🏟️ Per Turf:\n")
+        parts.extend(f"• {turf['name']}: {_figures_text(turf)}\n" for turf in data["per_turf"])
+    parts.append("\n🕒 Per Hour of Day:\n")
+    parts.extend(f"• {h['hour']:02d}:00 - {h['hour'] + 1:02d}:00: {_figures_text(h)}\n" for h in data["per_hour"])
+    header = "".join(parts) + "\n📅 Per Day:\n"
+    return write_capped(header, (f"• {day['date']}: {_figures_text(day)}\n" for day in data["per_day"]),
+                        len(data["per_day"]), max_chars, _text_footer(max_chars))
+
+
+def _percent(value: float) -> str:
+    return str(round(value * 100))
+
+
+def _heatmap_rows(data: dict):
+    """One string per grid row and per peak window, each section heading prefixed to its first row"""
+    names = dict(zip(data["turf_ids"], data["turf_names"]))
+    percentiles = ", ".join(f"p{p}" for p in data["percentiles"])
+    hours = "     " + " ".join(f"{hour:>3}" for hour in data["hours"]) + "\n"
+    for name, grid, utilization in zip(data["turf_names"], data["occupancy"], data["utilization"]):
+        heading = (f"\n🏟️ {name} - daily utilization {percentiles}: "
+                   f"{' / '.join(_percent(u) + '%' for u in utilization)}\n{hours}")
+        for day, row in zip(data["weekdays"], grid):
+            yield heading + f"{day:<4} " + " ".join(f"{_percent(v):>3}" for v in row) + "\n"
+            heading = ""
+    heading = "\n⏰ Peak Windows:\n"
+    for w in data["peak_windows"]:
+        yield heading + (f"• {names[w['turf_id']]}: {w['weekday']} {w['start']} - {w['end']} "
+                         f"({_percent(w['occupancy'])}%)\n")
+        heading = ""
+
+
+def _heatmap_text(data: dict, max_chars: int) -> str:
+    if "error" in data:
+        return f"❌ {data['error']}"
+
+    total = sum(len(grid) for grid in data["occupancy"]) + len(data["peak_windows"])
+    return write_capped(
+        f"🔥 Occupancy Heatmap ({data['from']} to {data['to']}, {data['bookings']} bookings, % of hour booked)\n",
+        _heatmap_rows(data), total, max_chars, _text_footer(max_chars))
+
+
+def _slot_text(slot: dict) -> str:
+    return (f"• {slot['turf']} - {slot['weekday']} {slot['start']} - {slot['end']} "
+            f"({_percent(slot['expected_occupancy'])}% expected)\n")
+
+
+def _forecast_text(data: dict, max_chars: int) -> str:
+    if "error" in data:
+        return f"❌ {data['error']}"
+
+    scope = f" for {data['date']}" if data["date"] else ""
+    stale = ", stale" if data["stale"] else ""
+    return "".join([
+        f"🔮 Slot Recommendations{scope} (forecast of {data['computed_at']}{stale})\n\n",
+        "✅ Best times to book (lowest expected demand):\n",
+        *(_slot_text(slot) for slot in data["quiet"]),
+        "\n🔥 Peak times (highest expected demand):\n",
+        *(_slot_text(slot) for slot in data["busy"]),
+        "" if data["busy"] else "No bookings in the forecast history\n",
+    ])
+
+
+def _booking_text(data: dict, max_chars: int) -> str:
+    if "error" in data:
+        return f"❌ {data['error']}"
+
+    return (
+        "✅ Booking Confirmed!\n\n"
+        f"Booking ID: {data['booking_id']}\n"
+        f"Turf: {data['turf']}\n"
+        f"Customer: {data['customer']} ({data['phone']})\n"
+        f"Date: {data['date']}\n"
+        f"Time: {data['start']} - {data['end']}\n"
+        f"Duration: {data['hours']} hours\n"
+        f"Total Cost: ₹{data['cost']}\n"
+    )
+
+
+# ----- json (compact) -----
+
+# One encoder for every row; json.dumps builds a new one per call for non-default options
+_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def _json(kind: str, data: dict, max_chars: int) -> str:
+    key = _LIST_KEYS.get(kind)
+    if key is None or key not in data:
+        return _dumps(data)
+    records = data[key]
+    rows = ((("," if i else "") + _dumps(record)) for i, record in enumerate(records))
+    # "truncated" is only present when rows were left out
+    return write_capped(f'{{"{key}":[', rows, data.get("total", len(records)), max_chars,
+                        lambda dropped: f'],"truncated":{dropped}}}' if dropped else "]}")
+
+
+# ----- table (terse) -----
+
+def _cell(value) -> str:
+    return "" if value is None else str(value).replace("|", "/").replace("\n", " ")
+
+
+def _rows(columns, records, max_chars: int, total: int = None) -> str:
+    rows = ("\n" + "|".join(_cell(record[c]) for c in columns) for record in records)
+    total = len(records) if total is None else total
+    return write_capped("|".join(columns), rows, total, max_chars,
+                        lambda dropped: f"\n… {dropped} more rows (output capped at {max_chars} characters)"
+                        if dropped else "")
+
+
+def _table(kind: str, data: dict, max_chars: int) -> str:
+    if "error" in data:
+        return f"error|{_cell(data['error'])}"
+    if kind in _TABLE_COLUMNS:
+        return _rows(_TABLE_COLUMNS[kind], data[kind], max_chars, data.get("total"))
+    if kind == "changes":
+        return f"cursor|{data['cursor']}\nhas_more|{int(data['has_more'])}\n" + _rows(
+            ["seq", "op", "id", "turf", "date", "start", "end", "cost", "status"], data["changes"], max_chars)
+    if kind == "stats":
+        figures = ["bookings", "booked_minutes", "revenue"]
+        occupancy = ["occupancy"] if "occupancy" in data["totals"] else []
+        return "\n\n".join([
+            f"range|{data['from']}|{data['to']}",
+            _rows(figures + occupancy, [data["totals"]], max_chars),
+            _rows(["id", "name"] + figures + occupancy, data["per_turf"], max_chars),
+            _rows(["hour"] + figures + occupancy, data["per_hour"], max_chars),
+            _rows(["date"] + figures, data["per_day"], max_chars),
+        ])
+    if kind == "heatmap":
+        lines = [f"range|{data['from']}|{data['to']}|bookings|{data['bookings']}"]
+        for turf_id, name, grid, utilization in zip(data["turf_ids"], data["turf_names"], data["occupancy"],
+                                                    data["utilization"]):
+            lines.append(f"turf|{turf_id}|{_cell(name)}|" + "|".join(
+                f"p{p}={_percent(u)}" for p, u in zip(data["percentiles"], utilization)))
+            lines.append("day|" + "|".join(str(hour) for hour in data["hours"]))
+            lines.extend(f"{day}|" + "|".join(_percent(v) for v in row) for day, row in zip(data["weekdays"], grid))
+        peaks = [{**w, "occupancy": _percent(w["occupancy"])} for w in data["peak_windows"]]
+        lines.append(_rows(["turf_id", "weekday", "start", "end", "occupancy"], peaks, max_chars))
+        return "\n".join(lines)
+    if kind == "forecast":
+        columns = ["turf_id", "turf", "weekday", "start", "end", "expected_occupancy"]
+        return "\n\n".join([
+            f"forecast|{data['computed_at']}|stale|{int(data['stale'])}|date|{data['date'] or ''}",
+            "quiet\n" + _rows(columns, data["quiet"], max_chars),
+            "busy\n" + _rows(columns, data["busy"], max_chars),
+        ])
+    if kind == "availability":
+        turf = data["turf"]
+        return "\n".join([
+            f"turf|{turf['id']}|{_cell(turf['name'])}|{_cell(turf['location'])}|{turf['hourly_rate']}/h",
+            f"date|{data['date']}",
+            "booked|" + ",".join(f"{start}-{end}" for start, end in data["booked"]),
+            "free|" + ",".join(f"{start}-{end}" for start, end in data["available"]),
+        ])
+    return _rows(["booking_id", "turf", "date", "start", "end", "hours", "cost", "status"], [data], max_chars)
+
+
+_TABLE_COLUMNS = {
+    "turfs": ["id", "name", "location", "hourly_rate", "capacity", "facilities"],
+    "bookings": ["id", "turf", "date", "start", "end", "cost", "status"],
+}
+
+# Kinds whose data is one list of records, and the list's key
+_LIST_KEYS = {"turfs": "turfs", "bookings": "bookings"}
+
+_TEXT_RENDERERS = {
+    "turfs": _turfs_text,
+    "bookings": _bookings_text,
+    "availability": _availability_text,
+    "changes": _changes_text,
+    "stats": _stats_text,
+    "heatmap": _heatmap_text,
+    "forecast": _forecast_text,
+    "booking": _booking_text,
+}
+
+
+def render(kind: str, data: dict, output_format: str = None, max_chars: int = None) -> str:
+    """Render a data-layer result of the given kind in text, json or table form
+
+    Listings stop before max_chars (default TURF_TOOL_MAX_OUTPUT_CHARS) and
+    say how many rows were left out.
+    """
+    output_format = (output_format or default_format()).lower()
+    max_chars = default_max_chars() if max_chars is None else max_chars
+    if output_format == "text":
+        return _TEXT_RENDERERS[kind](data, max_chars)
+    if output_format == "json":
+        return _json(kind, data, max_chars)
+    if output_format == "table":
+        return _table(kind, data, max_chars)
+    raise ValueError(f"Unknown output format '{output_format}'; use one of {', '.join(OUTPUT_FORMATS)}")
+
+
+def render_chunk(kind: str, records: List[dict], output_format: str = None) -> str:
+    """Rows of one part of a listing, without its header, footer or cap
+
+    Used for streamed partial results: text and table chunks are the rows as
+    they appear in the full listing, a json chunk is an array of records.
+    """
+    output_format = (output_format or default_format()).lower()
+    if output_format == "text":
+        return "".join(_ROW_TEXT[kind].format_map(record) for record in records)
+    if output_format == "json":
+        return _dumps(records)
+    if output_format == "table":
+        return "\n".join("|".join(_cell(record[c]) for c in _TABLE_COLUMNS[kind]) for record in records)
+    raise ValueError(f"Unknown output format '{output_format}'; use one of {', '.join(OUTPUT_FORMATS)}")
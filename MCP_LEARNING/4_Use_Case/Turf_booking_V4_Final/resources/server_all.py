@@ -1,194 +1,450 @@
+import heapq
+import itertools
 from datetime import datetime, timedelta
 from database import TurfDatabase
+from change_feed import CHANGES
+from resources.render import render
 
 db = TurfDatabase()
 
-def turf_all():
+# Bookable hours shown by the availability check
+OPENING_HOUR = 6
+CLOSING_HOUR = 23
+
+
+# ----- data layer: plain dicts, rendered by resources/render.py -----
+
+def fetch_turfs():
     conn = db.get_connection()
     cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM turfs ORDER BY name")
+
+    cursor.execute("SELECT id, name, location, hourly_rate, capacity, facilities FROM turfs ORDER BY name")
     rows = cursor.fetchall()
     conn.close()
-    
-    if not rows:
-        return "No turfs available"
-    
-    result = "🏟️ Available Turfs:\n\n"
-    for row in rows:
-        result += f"ID: {row[0]}\n"
-        result += f"Name: {row[1]}\n"
-        result += f"Location: {row[2]}\n"
-        result += f"Rate: ₹{row[3]}/hour\n"
-        result += f"Capacity: {row[4]} players\n"
-        result += f"Facilities: {row[5]}\n"
-        result += "-" * 40 + "\n"
-    
-    return result
-
-
-def all_booking():
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    
-    query = """
-        SELECT b.id, t.name, 
-               b.booking_date, b.start_time, b.end_time, 
-               b.total_cost, b.status
-        FROM bookings b
-        JOIN turfs t ON b.turf_id = t.id
-        ORDER BY b.booking_date DESC, b.start_time
+
+    return {"turfs": [
+        {"id": row[0], "name": row[1], "location": row[2], "hourly_rate": row[3],
+         "capacity": row[4], "facilities": row[5]}
+        for row in rows
+    ]}
+
+
+BOOKINGS_QUERY = """
+    SELECT b.id, t.name,
+           b.booking_date, b.start_time, b.end_time,
+           b.total_cost, b.status
+    FROM bookings b
+    JOIN turfs t ON b.turf_id = t.id
+    ORDER BY b.booking_date DESC, b.start_time
+"""
+
+
+def _booking_record(row):
+    return {"id": row[0], "turf": row[1], "date": row[2], "start": row[3], "end": row[4],
+            "cost": row[5], "status": row[6]}
+
+
+def _listing_key(row):
+    # BOOKINGS_QUERY order: latest date first, then start time
+    return -int(row[2].replace("-", "")), row[3]
+
+
+def fetch_bookings():
+    return {"bookings": [record for batch in iter_bookings() for record in batch]}
+
+
+def count_bookings():
+    total = 0
+    for shard in range(db.shard_count):
+        conn = db.get_shard_connection(shard)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT COUNT(*) FROM bookings b JOIN turfs t ON b.turf_id = t.id")
+        total += cursor.fetchone()[0]
+        conn.close()
+    return total
+
+
+def _shard_rows(shard: int, batch_size: int):
+    conn = db.get_shard_connection(shard)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(BOOKINGS_QUERY)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def iter_bookings(batch_size: int = 500):
+    """Yield the bookings listing in batches of records, stepping the cursor with fetchmany
+
+    With several shards their listings, each already in BOOKINGS_QUERY order,
+    are merged, so about one batch per shard is held in memory at a time; the
+    connections stay open until the generator is exhausted or closed.
     """
-    
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    conn.close()
-    
-    if not rows:
-        return "No bookings found"
-    
-    result = "📅 All Bookings:\n\n"
+    shards = [_shard_rows(shard, batch_size) for shard in range(db.shard_count)]
+    rows = shards[0] if len(shards) == 1 else heapq.merge(*shards, key=_listing_key)
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            yield [_booking_record(row) for row in batch]
+    finally:
+        for shard_rows in shards:
+            shard_rows.close()
+
+
+def _cursor_positions(cursor_seq):
+    """Per-shard change sequence positions of a get_bookings_since cursor
+
+    With one shard the cursor is the change sequence number itself; with
+    several it is "seq0.seq1...", one position per shard. 0 starts everywhere.
+    """
+    positions = [int(part) for part in str(cursor_seq).split(".")]
+    if positions == [0]:
+        return [0] * db.shard_count
+    if len(positions) != db.shard_count:
+        raise ValueError(f"cursor {cursor_seq} does not match {db.shard_count} shard(s)")
+    return positions
+
+
+def fetch_bookings_since(cursor_seq=0, limit=500):
+    """Bookings changed after change sequence cursor_seq, each once in its current state
+
+    Only a booking's latest change is returned; deleted bookings come back with
+    op "delete" and no details. Pass the returned cursor to the next call.
+    Each shard has its own change sequence: with several shards seq is
+    "shard.seq", unique across shards like the cursor, and the changes of
+    several shards are interleaved by change time.
+    """
+    try:
+        positions = _cursor_positions(cursor_seq)
+        limit = max(1, min(int(limit), 5000))
+    except (TypeError, ValueError):
+        return {"error": "cursor must come from a previous call and limit must be an integer"}
+
+    per_shard = []
+    for shard, position in enumerate(positions):
+        conn = db.get_shard_connection(shard)
+        cursor = conn.cursor()
+
+        # MAX(seq) makes SQLite take op from the latest change of each booking
+        cursor.execute("""
+            SELECT c.seq, c.op, c.booking_id, t.name,
+                   b.booking_date, b.start_time, b.end_time,
+                   b.total_cost, b.status, c.changed_at
+            FROM (
+                SELECT booking_id, op, changed_at, MAX(seq) AS seq
+                FROM booking_changes
+                WHERE seq > ?
+                GROUP BY booking_id
+            ) c
+            LEFT JOIN bookings_all b ON b.id = c.booking_id
+            LEFT JOIN turfs t ON t.id = b.turf_id
+            ORDER BY c.seq
+            LIMIT ?
+        """, (position, limit + 1))
+        per_shard.append([(shard,) + row for row in cursor.fetchall()])
+        conn.close()
+
+    # Merging keeps each shard's rows in seq order, so every position only moves forward
+    rows = list(itertools.islice(heapq.merge(*per_shard, key=lambda row: row[10]), limit))
     for row in rows:
-        result += f"Booking ID: {row[0]}\n"
-        result += f"Turf: {row[1]}\n"
-        result += f"Date: {row[2]}\n"
-        result += f"Time: {row[3]} - {row[4]}\n"
-        result += f"Cost: ₹{row[5]}\n"
-        result += f"Status: {row[6]}\n"
-        result += "-" * 40 + "\n"
-    
-    return result
-
-
-def check_availability(turf_id, date):
+        positions[row[0]] = row[1]
+    return {
+        "cursor": positions[0] if len(positions) == 1 else ".".join(map(str, positions)),
+        "has_more": sum(map(len, per_shard)) > limit,
+        "changes": [
+            {"seq": row[1] if len(positions) == 1 else f"{row[0]}.{row[1]}", "op": row[2], "id": row[3],
+             "turf": row[4], "date": row[5], "start": row[6], "end": row[7], "cost": row[8], "status": row[9]}
+            for row in rows
+        ],
+    }
+
+
+def fetch_availability(turf_id, date):
     try:
         turf_id_int = int(turf_id)
         # Validate date format
         datetime.strptime(date, "%Y-%m-%d")
     except ValueError:
-        return f"Invalid turf ID or date format. Use YYYY-MM-DD for date."
-    
-    conn = db.get_connection()
+        return {"error": "Invalid turf ID or date format. Use YYYY-MM-DD for date."}
+
+    # One shard holds the turf's bookings, with the turfs table attached
+    conn = db.get_shard_connection(db.shard_for(turf_id_int))
     cursor = conn.cursor()
-    
+
     # Get turf details
     cursor.execute("SELECT name, location, hourly_rate FROM turfs WHERE id = ?", (turf_id_int,))
     turf = cursor.fetchone()
-    
+
     if not turf:
         conn.close()
-        return f"Turf with ID {turf_id} not found"
-    
+        return {"error": f"Turf with ID {turf_id} not found"}
+
     # Get bookings for that date (⚠️ Removed customer_name)
     cursor.execute("""
-        SELECT start_time, end_time, status 
-        FROM bookings 
+        SELECT start_time, end_time, status
+        FROM bookings
         WHERE turf_id = ? AND booking_date = ? AND status = 'confirmed'
         ORDER BY start_time
     """, (turf_id_int, date))
-    
+
     bookings = cursor.fetchall()
     conn.close()
-    
-    result = f"🏟️ {turf[0]} - {turf[1]}\n"
-    result += f"📅 Availability for {date}\n"
-    result += f"💰 Rate: ₹{turf[2]}/hour\n\n"
-    
-    if not bookings:
-        result += "✅ Fully Available (6:00 AM - 11:00 PM)"
-    else:
-        result += "🔴 Booked Slots:\n"
-        for booking in bookings:
-            result += f"• {booking[0]} - {booking[1]}\n"   # ❌ No customer name shown
-        
-        result += "\n✅ Available Slots:\n"
-        # Simple logic to show available slots (6 AM to 11 PM)
-        all_hours = [f"{i:02d}:00" for i in range(6, 23)]
-        booked_hours = []
-        
-        for booking in bookings:
-            start_hour = int(booking[0].split(":")[0])
-            end_hour = int(booking[1].split(":")[0])
-            for h in range(start_hour, end_hour):
-                booked_hours.append(f"{h:02d}:00")
-        
-        available_hours = [h for h in all_hours if h not in booked_hours]
-        if available_hours:
-            for hour in available_hours:
-                result += f"• {hour} - {int(hour.split(':')[0])+1:02d}:00\n"
+
+    # Hourly slots (6 AM to 11 PM) not covered by a booking, merged into [start, end) ranges
+    booked_hours = set()
+    for booking in bookings:
+        start_hour = int(booking[0].split(":")[0])
+        end_hour = int(booking[1].split(":")[0])
+        booked_hours.update(range(start_hour, end_hour))
+    available = []
+    for h in range(OPENING_HOUR, CLOSING_HOUR):
+        if h in booked_hours:
+            continue
+        if available and available[-1][1] == f"{h:02d}:00":
+            available[-1][1] = f"{h + 1:02d}:00"
         else:
-            result += "No slots available"
-    
-    return result
+            available.append([f"{h:02d}:00", f"{h + 1:02d}:00"])
+
+    return {
+        "turf": {"id": turf_id_int, "name": turf[0], "location": turf[1], "hourly_rate": turf[2]},
+        "date": date,
+        "booked": [[booking[0], booking[1]] for booking in bookings],
+        "available": available,
+    }
+
+
+def _sum_rows(shard_rows):
+    """Add up (key, bookings, minutes, revenue) rows of several shards, in key order"""
+    if len(shard_rows) == 1:
+        return shard_rows[0]
+    totals = {}
+    for rows in shard_rows:
+        for key, bookings, minutes, revenue in rows:
+            total = totals.setdefault(key, [0, 0, 0.0])
+            total[0] += bookings
+            total[1] += minutes
+            total[2] += revenue
+    return [(key, *totals[key]) for key in sorted(totals)]
 
 
-def book_turf(turf_id: int, customer_name: str, customer_phone: str, 
-                booking_date: str, start_time: str, end_time: str) -> str:
+def fetch_booking_stats(turf_id=0, start_date="", end_date=""):
+    """Bookings, booked minutes, revenue and occupancy from the rollup tables
+
+    turf_id 0 means every turf; empty dates leave the range open. Occupancy is
+    booked minutes over the bookable minutes (OPENING_HOUR to CLOSING_HOUR) of
+    the days in the range, and is only given when both dates are set.
+    """
+    try:
+        turf_id = int(turf_id or 0)
+        for value in (start_date, end_date):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return {"error": "Invalid turf ID or date format. Use YYYY-MM-DD for dates."}
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    if turf_id:
+        cursor.execute("SELECT name FROM turfs WHERE id = ?", (turf_id,))
+        if cursor.fetchone() is None:
+            conn.close()
+            return {"error": f"Turf with ID {turf_id} not found"}
+
+    cursor.execute("SELECT COUNT(*) FROM turfs")
+    turf_count = 1 if turf_id else cursor.fetchone()[0]
+    conn.close()
+
+    # Empty bounds and turf 0 disable their filter
+    where = """
+        WHERE (? = 0 OR s.turf_id = ?)
+          AND (? = '' OR s.booking_date >= ?)
+          AND (? = '' OR s.booking_date <= ?)
+    """
+    params = (turf_id, turf_id, start_date, start_date, end_date, end_date)
+
+    # One turf is one shard; all turfs add up the rollups of every shard
+    per_turf, per_day, per_hour = [], [], []
+    for shard in [db.shard_for(turf_id)] if turf_id else range(db.shard_count):
+        conn = db.get_shard_connection(shard)
+        cursor = conn.cursor()
+
+        cursor.execute(f"""
+            SELECT s.turf_id, t.name, SUM(s.bookings), SUM(s.booked_minutes), SUM(s.revenue)
+            FROM booking_stats_daily s
+            JOIN turfs t ON t.id = s.turf_id
+            {where}
+            GROUP BY s.turf_id
+            HAVING SUM(s.bookings) > 0
+            ORDER BY t.name
+        """, params)
+        per_turf.extend(cursor.fetchall())
+
+        cursor.execute(f"""
+            SELECT s.booking_date, SUM(s.bookings), SUM(s.booked_minutes), SUM(s.revenue)
+            FROM booking_stats_daily s
+            {where}
+            GROUP BY s.booking_date
+            HAVING SUM(s.bookings) > 0
+            ORDER BY s.booking_date
+        """, params)
+        per_day.append(cursor.fetchall())
+
+        cursor.execute(f"""
+            SELECT s.hour, SUM(s.bookings), SUM(s.booked_minutes), SUM(s.revenue)
+            FROM booking_stats_hourly s
+            {where}
+            GROUP BY s.hour
+            HAVING SUM(s.bookings) > 0
+            ORDER BY s.hour
+        """, params)
+        per_hour.append(cursor.fetchall())
+        conn.close()
+
+    # Every turf lives in one shard, while days and hours appear in several
+    per_turf.sort(key=lambda row: row[1])
+    per_day = _sum_rows(per_day)
+    per_hour = _sum_rows(per_hour)
+
+    # Open ends of the range stop at the first/last booked day
+    first = start_date or (per_day[0][0] if per_day else "")
+    last = end_date or (per_day[-1][0] if per_day else "")
+
+    booked_minutes = sum(row[3] for row in per_turf)
+    data = {
+        "turf_id": turf_id or None,
+        "from": first,
+        "to": last,
+        "totals": {
+            "bookings": sum(row[2] for row in per_turf),
+            "booked_minutes": booked_minutes,
+            "revenue": round(sum(row[4] for row in per_turf), 2),
+        },
+        "per_turf": [
+            {"id": row[0], "name": row[1], "bookings": row[2], "booked_minutes": row[3],
+             "revenue": round(row[4], 2)}
+            for row in per_turf
+        ],
+        "per_hour": [
+            {"hour": row[0], "bookings": row[1], "booked_minutes": row[2], "revenue": round(row[3], 2)}
+            for row in per_hour
+        ],
+        "per_day": [
+            {"date": row[0], "bookings": row[1], "booked_minutes": row[2], "revenue": round(row[3], 2)}
+            for row in per_day
+        ],
+    }
+
+    # Only for an explicit range: spread over every day between the first and last
+    # booking (often more than a year) occupancy rounds to 0% and says nothing
+    if start_date and end_date:
+        days = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days + 1
+
+        def occupancy(minutes, turfs=1, slot_minutes=(CLOSING_HOUR - OPENING_HOUR) * 60):
+            capacity = turfs * days * slot_minutes
+            return round(minutes / capacity, 4) if capacity > 0 else 0.0
+
+        data["totals"]["occupancy"] = occupancy(booked_minutes, turf_count)
+        for figures, row in zip(data["per_turf"], per_turf):
+            figures["occupancy"] = occupancy(row[3])
+        for figures, row in zip(data["per_hour"], per_hour):
+            figures["occupancy"] = occupancy(row[2], turf_count, 60)
+    return data
+
+def create_booking(turf_id: int, customer_name: str, customer_phone: str,
+                   booking_date: str, start_time: str, end_time: str):
     try:
         # Validate date and time formats
         booking_date_obj = datetime.strptime(booking_date, "%Y-%m-%d")
         start_time_obj = datetime.strptime(start_time, "%H:%M")
         end_time_obj = datetime.strptime(end_time, "%H:%M")
-        
+
         # Check if booking is not in the past
         booking_datetime = datetime.combine(booking_date_obj.date(), start_time_obj.time())
         if booking_datetime < datetime.now():
-            return "❌ Cannot book slots in the past"
-        
+            return {"error": "Cannot book slots in the past"}
+
         # Check if end time is after start time
         if end_time_obj <= start_time_obj:
-            return "❌ End time must be after start time"
-        
+            return {"error": "End time must be after start time"}
+
     except ValueError:
-        return "❌ Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time"
-    
-    conn = db.get_connection()
+        return {"error": "Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time"}
+
+    # Single-shard write: only the turf's shard is locked
+    conn = db.get_shard_connection(db.shard_for(turf_id))
     cursor = conn.cursor()
-    
+
     # Check if turf exists and get rate
     cursor.execute("SELECT name, hourly_rate FROM turfs WHERE id = ?", (turf_id,))
     turf = cursor.fetchone()
-    
+
     if not turf:
         conn.close()
-        return f"❌ Turf with ID {turf_id} not found"
-    
+        return {"error": f"Turf with ID {turf_id} not found"}
+
     # Check for conflicting bookings
     cursor.execute("""
-        SELECT COUNT(*) FROM bookings 
-        WHERE turf_id = ? AND booking_date = ? 
+        SELECT COUNT(*) FROM bookings
+        WHERE turf_id = ? AND booking_date = ?
         AND status = 'confirmed'
         AND NOT (end_time <= ? OR start_time >= ?)
     """, (turf_id, booking_date, start_time, end_time))
-    
+
     conflicts = cursor.fetchone()[0]
-    
+
     if conflicts > 0:
         conn.close()
-        return f"❌ Time slot conflicts with existing booking. Check availability first."
-    
+        return {"error": "Time slot conflicts with existing booking. Check availability first."}
+
     # Calculate duration and total cost
     duration_hours = (end_time_obj - start_time_obj).seconds / 3600
     total_cost = duration_hours * turf[1]
-    
+
     # Insert booking
-    cursor.execute("""
-        INSERT INTO bookings (turf_id, customer_name, customer_phone, booking_date, 
-                            start_time, end_time, total_cost, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, 'confirmed')
-    """, (turf_id, customer_name, customer_phone, booking_date, start_time, end_time, total_cost))
-    
-    booking_id = cursor.lastrowid
+    booking_id = db.insert_booking(cursor, turf_id, customer_name, customer_phone, booking_date,
+                                   start_time, end_time, total_cost)
     conn.commit()
     conn.close()
-    
-    result = f"✅ Booking Confirmed!\n\n"
-    result += f"Booking ID: {booking_id}\n"
-    result += f"Turf: {turf[0]}\n"
-    result += f"Customer: {customer_name} ({customer_phone})\n"
-    result += f"Date: {booking_date}\n"
-    result += f"Time: {start_time} - {end_time}\n"
-    result += f"Duration: {duration_hours} hours\n"
-    result += f"Total Cost: ₹{total_cost}\n"
-    
-    return result
\ No newline at end of file
+    CHANGES.record(turf_id, booking_date, booking_id)
+
+    return {
+        "booking_id": booking_id,
+        "turf": turf[0],
+        "customer": customer_name,
+        "phone": customer_phone,
+        "date": booking_date,
+        "start": start_time,
+        "end": end_time,
+        "hours": duration_hours,
+        "cost": total_cost,
+        "status": "confirmed",
+    }
+
+
+# ----- tool entry points: data rendered as text (default), json or table -----
+
+def turf_all(output_format: str = None):
+    return render("turfs", fetch_turfs(), output_format)
+
+
+def all_booking(output_format: str = None):
+    return render("bookings", fetch_bookings(), output_format)
+
+
+def check_availability(turf_id, date, output_format: str = None):
+    return render("availability", fetch_availability(turf_id, date), output_format)
+
+
+def book_turf(turf_id: int, customer_name: str, customer_phone: str,
+                booking_date: str, start_time: str, end_time: str, output_format: str = None) -> str:
+    data = create_booking(turf_id, customer_name, customer_phone, booking_date, start_time, end_time)
+    return render("booking", data, output_format)
@@ -0,0 +1,96 @@
+import json
+import os
+import time
+from collections import Counter
+from typing import Optional
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+
+def current_run(messages):
+    """Messages belonging to the current run (everything after the last user message)"""
+    for index in range(len(messages) - 1, -1, -1):
+        if getattr(messages[index], "type", None) == "human":
+            return messages[index + 1:]
+    return messages
+
+
+def _call_signature(tool_call: dict) -> str:
+    return tool_call["name"] + json.dumps(tool_call.get("args") or {}, sort_keys=True, default=str)
+
+
+class RunBudget:
+    """Limits for one agent request: model calls, tool calls, wall-clock and repeats
+
+    Counts are derived from the run's own messages, so one budget object only
+    needs to carry the start time and the limits.
+    """
+
+    def __init__(self, max_model_calls: int = 6, max_tool_calls: int = 12,
+                 deadline_seconds: float = 90, max_repeats: int = 2):
+        self.max_model_calls = max_model_calls
+        self.max_tool_calls = max_tool_calls
+        self.deadline_seconds = deadline_seconds
+        self.max_repeats = max_repeats
+        self.started_at = time.monotonic()
+
+    def remaining_seconds(self) -> float:
+        return self.deadline_seconds - (time.monotonic() - self.started_at)
+
+    def exhausted(self, messages, pending_tool_calls: bool = False) -> Optional[str]:
+        """Return why the run must stop, or None if it may continue
+
+        With pending_tool_calls the last message's tool calls are about to run
+        and are checked for the tool-call limit and for repeats.
+        """
+        run = current_run(messages)
+        model_calls = sum(1 for m in run if isinstance(m, AIMessage))
+        tool_calls = sum(1 for m in run if isinstance(m, ToolMessage))
+
+        if self.remaining_seconds() <= 0:
+            return f"the {self.deadline_seconds:.0f}s time limit was reached"
+
+        if not pending_tool_calls:
+            if model_calls >= self.max_model_calls:
+                return f"the limit of {self.max_model_calls} model calls was reached"
+            return None
+
+        pending = run[-1].tool_calls
+        if tool_calls + len(pending) > self.max_tool_calls:
+            return f"the limit of {self.max_tool_calls} tool calls was reached"
+
+        seen = Counter(
+            _call_signature(tc)
+            for m in run[:-1] if isinstance(m, AIMessage)
+            for tc in m.tool_calls
+        )
+        for tool_call in pending:
+            if seen[_call_signature(tool_call)] >= self.max_repeats:
+                return f"{tool_call['name']} was requested repeatedly with the same arguments"
+        return None
+
+
+def partial_answer(messages, reason: str) -> AIMessage:
+    """Graceful answer built from the tool results gathered so far"""
+    results = []
+    for message in current_run(messages):
+        if isinstance(message, ToolMessage) and getattr(message, "status", "success") != "error":
+            if message.content not in results:
+                results.append(message.content)
+
+    text = f"⚠️ I stopped before finishing because {reason}."
+    if results:
+        text += " Here is what I found so far:\n\n" + "\n\n".join(str(r) for r in results[-3:])
+    else:
+        text += " Please try again with a more specific request."
+    return AIMessage(content=text)
+
+
+def build_run_budget_from_env() -> RunBudget:
+    """Create a budget configured by the TURF_RUN_* environment variables"""
+    return RunBudget(
+        max_model_calls=int(os.getenv("TURF_RUN_MAX_MODEL_CALLS", "6")),
+        max_tool_calls=int(os.getenv("TURF_RUN_MAX_TOOL_CALLS", "12")),
+        deadline_seconds=float(os.getenv("TURF_RUN_DEADLINE", "90")),
+        max_repeats=int(os.getenv("TURF_RUN_MAX_REPEATS", "2")),
+    )
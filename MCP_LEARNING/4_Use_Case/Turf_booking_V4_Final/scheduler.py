@@ -0,0 +1,133 @@
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# Lower number = served first
+PRIORITY_WRITE = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_WRITE: "write",
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BATCH: "batch",
+}
+
+# Priority of each prompt template from prompt_server.PROMPTS
+PROMPT_PRIORITIES = {
+    "make-booking": PRIORITY_WRITE,
+    "check-availability": PRIORITY_INTERACTIVE,
+    "list-turfs": PRIORITY_INTERACTIVE,
+    "view-bookings": PRIORITY_INTERACTIVE,
+    "booking-summary": PRIORITY_BATCH,
+}
+
+_BOOKING_INTENT = re.compile(r"\b(book|reserve|make a booking)\b", re.IGNORECASE)
+_SUMMARY_INTENT = re.compile(r"\b(summary|summarize|report|insights|recommendations?)\b", re.IGNORECASE)
+
+
+def classify_request(message: str = "", prompt_name: Optional[str] = None) -> int:
+    """Pick a priority from the prompt template, or from the wording of a chat message"""
+    if prompt_name in PROMPT_PRIORITIES:
+        return PROMPT_PRIORITIES[prompt_name]
+    if _SUMMARY_INTENT.search(message or ""):
+        return PRIORITY_BATCH
+    if _BOOKING_INTENT.search(message or ""):
+        return PRIORITY_WRITE
+    return PRIORITY_INTERACTIVE
+
+
+class SchedulerBusy(Exception):
+    """Raised when a request is shed because the queue is too deep"""
+
+
+class PriorityScheduler:
+    """Per-priority FIFO queues with in-flight limits and load shedding
+
+    Workers always take the most urgent job whose priority still has in-flight
+    capacity, so a burst of batch work (booking summaries) can never occupy
+    every worker. Requests are rejected immediately once the total queue depth
+    reaches the shedding threshold of their priority; batch work is shed first
+    and writes last.
+    """
+
+    def __init__(self, max_queue: int = 100, max_in_flight: Optional[Dict[int, int]] = None,
+                 shed_fractions: Optional[Dict[int, float]] = None):
+        self.max_queue = max_queue
+        self.max_in_flight = max_in_flight or {}
+        self.shed_fractions = shed_fractions or {
+            PRIORITY_WRITE: 1.0,
+            PRIORITY_INTERACTIVE: 0.8,
+            PRIORITY_BATCH: 0.5,
+        }
+        self._queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self._in_flight = {priority: 0 for priority in PRIORITY_NAMES}
+        self._wait_times = {priority: deque(maxlen=1000) for priority in PRIORITY_NAMES}
+        self._shed = {priority: 0 for priority in PRIORITY_NAMES}
+        self._cond = asyncio.Condition()
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def put(self, job, priority: int):
+        """Queue a job or raise SchedulerBusy if its priority is being shed"""
+        async with self._cond:
+            limit = int(self.max_queue * self.shed_fractions.get(priority, 1.0))
+            if self.depth() >= max(1, limit):
+                self._shed[priority] += 1
+                raise SchedulerBusy(f"queue depth {self.depth()} over limit for {PRIORITY_NAMES[priority]}")
+            job.priority = priority
+            job.enqueued_at = time.monotonic()
+            self._queues[priority].append(job)
+            self._cond.notify_all()
+
+    def _pick(self):
+        for priority in sorted(self._queues):
+            cap = self.max_in_flight.get(priority)
+            if self._queues[priority] and (cap is None or self._in_flight[priority] < cap):
+                job = self._queues[priority].popleft()
+                self._in_flight[priority] += 1
+                self._wait_times[priority].append(time.monotonic() - job.enqueued_at)
+                return job
+        return None
+
+    async def get(self):
+        """Wait for the most urgent runnable job"""
+        async with self._cond:
+            while True:
+                job = self._pick()
+                if job is not None:
+                    return job
+                await self._cond.wait()
+
+    async def release(self, job):
+        """Mark a job taken with get() as finished"""
+        async with self._cond:
+            self._in_flight[job.priority] -= 1
+            self._cond.notify_all()
+
+    def drain(self):
+        """Remove and return every queued job"""
+        jobs = []
+        for q in self._queues.values():
+            jobs.extend(q)
+            q.clear()
+        return jobs
+
+    def get_metrics(self) -> dict:
+        """Queue depth, in-flight counts, shed counts and queue wait times per priority"""
+        metrics = {}
+        for priority, name in PRIORITY_NAMES.items():
+            waits = sorted(self._wait_times[priority])
+            metrics[name] = {
+                "queued": len(self._queues[priority]),
+                "in_flight": self._in_flight[priority],
+                "shed": self._shed[priority],
+                "wait_count": len(waits),
+                "wait_avg_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                "wait_p95_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+                "wait_max_ms": round(1000 * waits[-1], 1) if waits else 0.0,
+            }
+        return metrics
@@ -3,6 +3,7 @@ import sys
 import os
 from datetime import datetime, date, timedelta
 import asyncio
+import uuid
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -72,6 +73,8 @@ st.markdown("""
 def initialize_session_state():
     if 'chat_messages' not in st.session_state:
         st.session_state.chat_messages = []
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     if 'prompt_messages' not in st.session_state:
         st.session_state.prompt_messages = []
     if 'agent_ready' not in st.session_state:
@@ -133,7 +136,7 @@ def execute_prompt_with_template(prompt_name: str, action_name: str, args: dict
         
         # Step 2: Send formatted prompt to agent
         agent = get_sync_agent()
-        result = agent.chat(formatted_prompt)
+        result = agent.chat(formatted_prompt, prompt_name=prompt_name)
         
         # Step 3: Store result with template info
         st.session_state.prompt_messages.append({
@@ -146,6 +149,42 @@ def execute_prompt_with_template(prompt_name: str, action_name: str, args: dict
         })
         st.rerun()
 
+def render_usage_panel():
+    """Sidebar panel with token, tool-output and cost accounting"""
+    if not st.session_state.agent_ready:
+        return
+    agent = get_sync_agent()
+    usage = agent.get_status().get("usage", {})
+    totals = usage.get("totals", {})
+    session = agent.get_conversation_usage(st.session_state.session_id)
+    
+    with st.sidebar.expander("💰 Token Usage", expanded=False):
+        col1, col2 = st.columns(2)
+        col1.metric("Input tokens", totals.get("input_tokens", 0))
+        col2.metric("Output tokens", totals.get("output_tokens", 0))
+        col1.metric("Requests", totals.get("requests", 0))
+        col2.metric("Cost (USD)", f"{totals.get('cost_usd', 0.0):.4f}")
+        st.caption(
+            f"This chat: {session['input_tokens'] + session['output_tokens']} tokens "
+            f"in {session['requests']} requests, {session['tool_result_chars']} chars of tool output"
+        )
+        
+        if usage.get("per_prompt"):
+            st.write("**Per prompt template**")
+            st.dataframe([
+                {"prompt": name, "requests": v["requests"], "tokens": v["input_tokens"] + v["output_tokens"],
+                 "tool chars": v["tool_result_chars"], "cost": round(v["cost_usd"], 4)}
+                for name, v in usage["per_prompt"].items()
+            ], hide_index=True)
+        
+        if usage.get("per_tool"):
+            st.write("**Per tool**")
+            st.dataframe([
+                {"tool": name, "calls": v["tool_calls"], "result chars": v["tool_result_chars"],
+                 "≈ tokens": v["tool_result_tokens"]}
+                for name, v in usage["per_tool"].items()
+            ], hide_index=True)
+
 def main():
     initialize_session_state()
     
@@ -169,6 +208,8 @@ def main():
         chat_mode()
     else:
         smart_prompts_mode()
+    
+    render_usage_panel()
 
 def chat_mode():
     """Traditional chatbot interface"""
@@ -190,23 +231,23 @@ def chat_mode():
         with st.chat_message("user"):
             st.write(prompt)
         
-        # Process with agent
+        # Process with agent, streaming tokens as they arrive
         with st.chat_message("assistant"):
-            with st.spinner("🤖 Processing..."):
-                agent = get_sync_agent()
-                assistant_response = agent.chat(prompt)
-                
-                st.write(assistant_response)
-                
-                # Add assistant message to chat
-                st.session_state.chat_messages.append({
-                    "role": "assistant", 
-                    "content": assistant_response
-                })
+            agent = get_sync_agent()
+            assistant_response = st.write_stream(
+                agent.chat_stream(prompt, session_id=st.session_state.session_id)
+            )
+            
+            # Add assistant message to chat
+            st.session_state.chat_messages.append({
+                "role": "assistant", 
+                "content": assistant_response
+            })
     
     # Clear chat button
     if st.sidebar.button("🗑️ Clear Chat"):
         st.session_state.chat_messages = []
+        get_sync_agent().reset_conversation(st.session_state.session_id)
         st.rerun()
 
 def smart_prompts_mode():
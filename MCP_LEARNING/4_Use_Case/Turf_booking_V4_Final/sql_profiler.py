@@ -0,0 +1,180 @@
+"""Slow-query log and per-statement SQL profile for the turf database.
+
+When enabled, database.InstrumentedCursor reports every statement here with
+its bind-parameter shape, the rows it returned and the time spent executing
+and fetching. Statements slower than the threshold go to the application
+log (or as JSON lines to TURF_SLOW_QUERY_LOG), optionally with their
+EXPLAIN QUERY PLAN so full table scans stand out.
+
+Configure with TURF_SQL_PROFILE=1, TURF_SLOW_QUERY_MS (default 50) and
+TURF_SQL_EXPLAIN=1, or switch at runtime with configure(); turf_server.py
+also toggles the profiler on SIGUSR1.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from turf_logging import get_logger
+
+log = get_logger(__name__)
+
+# Statement kinds that EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE"}
+
+
+def _normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def param_shape(parameters, many: bool = False):
+    """Types of the bound values, never the values themselves (they may be PII)"""
+    if many:
+        if isinstance(parameters, (list, tuple)):
+            first = param_shape(parameters[0]) if parameters else []
+            return {"rows": len(parameters), "each": first}
+        return {"rows": "iterator"}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+class StatementProfile:
+    """One statement in progress; fetch time and rows are added until it finishes"""
+
+    __slots__ = ("sql", "shape", "elapsed", "rows", "plan", "done")
+
+    def __init__(self, sql: str, shape, elapsed: float, rows: int, plan):
+        self.sql = sql
+        self.shape = shape
+        self.elapsed = elapsed
+        self.rows = rows
+        self.plan = plan
+        self.done = False
+
+    def add_fetch(self, seconds: float, rows: int):
+        self.elapsed += seconds
+        self.rows += rows
+
+
+class SQLProfiler:
+    """Aggregates statement timings and logs the slow ones"""
+
+    def __init__(self, enabled: bool = False, threshold_ms: float = 50.0,
+                 explain: bool = False, log_path: str = None, keep_slow: int = 100):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.log_path = log_path
+        self.slow = deque(maxlen=keep_slow)
+        self._stats = {}
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    # ----- called by database.InstrumentedCursor -----
+
+    def start(self, cursor: sqlite3.Cursor, sql: str, parameters, elapsed: float,
+              many: bool = False) -> StatementProfile:
+        """Begin profiling a statement that has just been executed"""
+        normalized = _normalize(sql)
+        plan = self._plan(cursor.connection, normalized, parameters) if self.explain and not many else None
+        # Result-less statements are complete now; rowcount is what they touched
+        rows = cursor.rowcount if cursor.description is None and cursor.rowcount > 0 else 0
+        return StatementProfile(normalized, param_shape(parameters, many), elapsed, rows, plan)
+
+    def finish(self, profile: StatementProfile):
+        """Record a completed statement; log it if it crossed the threshold"""
+        if profile.done:
+            return
+        profile.done = True
+        elapsed_ms = profile.elapsed * 1000
+        with self._lock:
+            stats = self._stats.setdefault(profile.sql, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0})
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["rows"] += profile.rows
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "elapsed_ms": round(elapsed_ms, 3),
+            "rows": profile.rows,
+            "statement": profile.sql[:1000],
+            "params": profile.shape,
+        }
+        if profile.plan is not None:
+            entry["plan"] = profile.plan
+            entry["full_scan"] = any(step.startswith("SCAN") for step in profile.plan)
+        self.slow.append(entry)
+        self._log(entry)
+
+    # ----- helpers -----
+
+    def _plan(self, connection: sqlite3.Connection, sql: str, parameters):
+        """EXPLAIN QUERY PLAN for a statement, computed once per statement text"""
+        if sql in self._plans:
+            return self._plans[sql]
+        words = sql.split(None, 1)
+        if not words or words[0].upper() not in _EXPLAINABLE:
+            return None
+        try:
+            # A plain cursor, so the EXPLAIN itself is not profiled or traced
+            cursor = sqlite3.Connection.cursor(connection, sqlite3.Cursor)
+            rows = sqlite3.Cursor.execute(cursor, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+            plan = [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            plan = [f"unavailable: {e}"]
+        self._plans[sql] = plan
+        return plan
+
+    def _log(self, entry: dict):
+        if self.log_path:
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        else:
+            log.warning("slow query", **{k: v for k, v in entry.items() if k != "ts"})
+
+    def report(self, limit: int = 10) -> list:
+        """Statements ordered by total time spent in them"""
+        with self._lock:
+            items = [{"statement": sql, **stats} for sql, stats in self._stats.items()]
+        for item in items:
+            item["avg_ms"] = round(item["total_ms"] / item["count"], 3)
+            item["total_ms"] = round(item["total_ms"], 3)
+            item["max_ms"] = round(item["max_ms"], 3)
+            item["plan"] = self._plans.get(item["statement"])
+        items.sort(key=lambda item: item["total_ms"], reverse=True)
+        return items[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._plans.clear()
+            self.slow.clear()
+
+
+PROFILER = SQLProfiler(
+    enabled=os.getenv("TURF_SQL_PROFILE", "0").lower() in ("1", "true", "yes", "on"),
+    threshold_ms=float(os.getenv("TURF_SLOW_QUERY_MS", "50")),
+    explain=os.getenv("TURF_SQL_EXPLAIN", "0").lower() in ("1", "true", "yes", "on"),
+    log_path=os.getenv("TURF_SLOW_QUERY_LOG") or None,
+)
+
+
+def enabled() -> bool:
+    return PROFILER.enabled
+
+
+def configure(enabled: bool = None, threshold_ms: float = None, explain: bool = None):
+    """Switch the profiler or change its settings at runtime"""
+    if enabled is not None:
+        PROFILER.enabled = enabled
+    if threshold_ms is not None:
+        PROFILER.threshold_ms = threshold_ms
+    if explain is not None:
+        PROFILER.explain = explain
+    return PROFILER
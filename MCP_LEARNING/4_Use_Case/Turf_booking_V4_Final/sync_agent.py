@@ -1,33 +1,53 @@
 import asyncio
+import concurrent.futures
 import os
+import queue
 import threading
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Iterator, Optional
 from dotenv import load_dotenv
+from agent_service import build_agent_service_from_env
+from turf_logging import get_logger
 
 # Load environment variables
 load_dotenv()
 
+log = get_logger(__name__)
+
+# Marks the end of a streamed response
+_STREAM_END = object()
+
+# Extra time the facade waits beyond the service's own deadline
+_GRACE_SECONDS = 5
+
+
 class SyncTurfAgent:
-    """Synchronous wrapper for the turf booking agent"""
+    """Synchronous facade over TurfAgentService for the Streamlit UI
+    
+    The service runs on a private event loop in a background thread; this
+    class only hands requests to it and waits for the results.
+    """
     
     def __init__(self):
-        self.agent = None
-        self.client = None
+        self.service = build_agent_service_from_env()
         self.initialized = False
         self._loop = None
         self._thread = None
         self._setup_lock = threading.Lock()
         
-    def _run_event_loop(self):
+    def _run_event_loop(self, ready: concurrent.futures.Future):
         """Run the event loop in a separate thread"""
-        self._loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self._loop)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        # Signal readiness from inside the running loop
+        loop.call_soon(ready.set_result, True)
         try:
-            self._loop.run_forever()
+            loop.run_forever()
         except Exception as e:
-            print(f"Event loop error: {e}")
+            log.exception("event loop error")
         finally:
-            self._loop.close()
+            loop.close()
     
     def setup(self):
         """Setup the agent synchronously"""
@@ -36,92 +56,126 @@ class SyncTurfAgent:
                 return True
                 
             try:
-                print("🔄 Initializing Turf Booking Agent...")
+                log.info("initializing turf booking agent")
                 
                 # Start the event loop in a separate thread if not already running
                 if self._thread is None or not self._thread.is_alive():
-                    self._thread = threading.Thread(target=self._run_event_loop, daemon=True)
+                    ready = concurrent.futures.Future()
+                    self._thread = threading.Thread(target=self._run_event_loop, args=(ready,), daemon=True)
                     self._thread.start()
-                    
-                    # Wait for the loop to be ready with timeout
-                    timeout = 10
-                    start_time = threading.get_ident()
-                    while self._loop is None and timeout > 0:
-                        threading.Event().wait(0.1)
-                        timeout -= 0.1
-                    
-                    if self._loop is None:
-                        print("❌ Failed to start event loop")
+                    try:
+                        ready.result(timeout=10)
+                    except concurrent.futures.TimeoutError:
+                        log.error("event loop did not start")
                         return False
                 
                 # Setup the agent
-                print("🤖 Setting up agent components...")
-                future = asyncio.run_coroutine_threadsafe(self._async_setup(), self._loop)
+                log.debug("setting up agent components")
+                future = asyncio.run_coroutine_threadsafe(self.service.start(), self._loop)
                 success = future.result(timeout=30)
                 
                 if success:
                     self.initialized = True
-                    print("✅ Agent setup completed successfully!")
+                    log.info("agent setup completed")
                     return True
                 else:
-                    print("❌ Agent setup failed")
+                    log.error("agent setup failed")
                     return False
                     
             except Exception as e:
-                print(f"❌ Setup error: {e}")
+                log.exception("agent setup error")
                 return False
     
-    async def _async_setup(self):
-        """Async setup method"""
+    def _call(self, coro, timeout: float):
+        """Run a service coroutine on the agent loop and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
         try:
-            from turf_agent import setup_turf_agent
-            print("📡 Connecting to MCP server...")
-            self.agent, self.client = await setup_turf_agent()
-            print("🔗 MCP client connected successfully")
-            return True
-        except Exception as e:
-            print(f"❌ Async setup error: {e}")
-            return False
+            return future.result(timeout=timeout + _GRACE_SECONDS)
+        except concurrent.futures.TimeoutError:
+            # Cancelling the future cancels the coroutine on the loop as well
+            future.cancel()
+            raise
     
-    def chat(self, message: str) -> str:
-        """Process a chat message synchronously"""
+    def chat(self, message: str, session_id: Optional[str] = None,
+             prompt_name: Optional[str] = None) -> str:
+        """Process a chat message synchronously
+        
+        Messages with the same session_id share a token-budgeted conversation memory.
+        prompt_name marks messages built from a prompt template (used for scheduling).
+        """
         if not self.initialized:
             setup_success = self.setup()
             if not setup_success:
                 return "❌ Agent not initialized. Setup failed."
         
         try:
-            print(f"💭 Processing message: {message[:100]}...")
-            future = asyncio.run_coroutine_threadsafe(
-                self._async_chat(message), 
-                self._loop
+            log.debug("chat request", session=session_id, prompt=prompt_name, message_chars=len(message))
+            log.verbose("chat request message", message=message)
+            response = self._call(
+                self.service.chat(message, session_id, prompt_name=prompt_name),
+                self.service.request_timeout
             )
-            response = future.result(timeout=120)  # Increased timeout for complex queries
-            print("✅ Message processed successfully")
+            log.debug("chat request done", session=session_id, response_chars=len(response))
             return response
             
-        except asyncio.TimeoutError:
+        except concurrent.futures.TimeoutError:
             return "❌ Request timed out. Please try again with a simpler query."
         except Exception as e:
-            print(f"❌ Chat error: {e}")
+            log.exception("chat error", session=session_id)
             return f"❌ Error: {str(e)}"
     
-    async def _async_chat(self, message: str) -> str:
-        """Async chat processing"""
+    def chat_stream(self, message: str, session_id: Optional[str] = None,
+                    timeout: Optional[float] = None) -> Iterator[str]:
+        """Process a chat message and yield the response as it is generated
+        
+        Yields text chunks (including short "calling tool X" notices) and can be
+        passed straight to st.write_stream.
+        """
+        if not self.initialized:
+            setup_success = self.setup()
+            if not setup_success:
+                yield "❌ Agent not initialized. Setup failed."
+                return
+        
+        timeout = timeout or self.service.request_timeout
+        log.debug("chat stream request", session=session_id, message_chars=len(message))
+        log.verbose("chat stream request message", message=message)
+        chunks = queue.Queue()
+        
+        async def pump():
+            stream = self.service.chat_stream(message, session_id, timeout)
+            try:
+                async for chunk in stream:
+                    chunks.put(chunk)
+            finally:
+                await stream.aclose()
+                chunks.put(_STREAM_END)
+        
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        deadline = time.monotonic() + timeout + _GRACE_SECONDS
         try:
-            print("🔄 Invoking agent...")
-            response = await self.agent.ainvoke(
-                {"messages": [{"role": "user", "content": message}]}
-            )
-            
-            # Get the last assistant message
-            last_message = response["messages"][-1]
-            print(f"📝 Response received: {len(last_message.content)} characters")
-            return last_message.content
-            
-        except Exception as e:
-            print(f"❌ Processing error: {e}")
-            return f"❌ Processing error: {str(e)}"
+            while True:
+                try:
+                    item = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    yield "\n\n❌ Request timed out. Please try again with a simpler query."
+                    return
+                if item is _STREAM_END:
+                    break
+                yield item
+            log.debug("chat stream done", session=session_id)
+        finally:
+            # Stop the agent if the caller gave up (timeout or closed generator)
+            if not future.done():
+                future.cancel()
+    
+    def reset_conversation(self, session_id: str):
+        """Forget the memory of a chat session"""
+        self.service.conversations.reset(session_id)
+    
+    def get_conversation_usage(self, session_id: str) -> dict:
+        """Token, tool-output and cost totals of one chat session"""
+        return self.service.usage.get_conversation(session_id)
     
     def process_prompt_template(self, prompt_name: str, arguments: dict = None) -> str:
         """Process a prompt template synchronously"""
@@ -131,75 +185,51 @@ class SyncTurfAgent:
                 return "❌ Agent not initialized. Setup failed."
         
         try:
-            print(f"🎯 Processing prompt template: {prompt_name}")
-            future = asyncio.run_coroutine_threadsafe(
-                self._async_process_prompt(prompt_name, arguments), 
-                self._loop
+            log.debug("prompt template request", prompt=prompt_name)
+            response = self._call(
+                self.service.process_prompt(prompt_name, arguments),
+                self.service.request_timeout
             )
-            response = future.result(timeout=120)
-            print("✅ Prompt template processed successfully")
+            log.debug("prompt template done", prompt=prompt_name, response_chars=len(response))
             return response
             
-        except asyncio.TimeoutError:
+        except concurrent.futures.TimeoutError:
             return "❌ Prompt processing timed out. Please try again."
         except Exception as e:
-            print(f"❌ Prompt processing error: {e}")
+            log.exception("prompt template error", prompt=prompt_name)
             return f"❌ Error: {str(e)}"
     
-    async def _async_process_prompt(self, prompt_name: str, arguments: dict = None) -> str:
-        """Async prompt processing"""
-        try:
-            # Import prompt processor
-            from prompt_server import get_prompt
-            
-            print(f"📋 Getting prompt template: {prompt_name}")
-            # Get the formatted prompt
-            prompt_result = await get_prompt(prompt_name, arguments)
-            
-            # Extract the prompt text
-            message = prompt_result.messages[0]
-            formatted_prompt = message.content.text
-            
-            print(f"🔄 Sending formatted prompt to agent...")
-            # Send to agent
-            response = await self.agent.ainvoke(
-                {"messages": [{"role": "user", "content": formatted_prompt}]}
-            )
-            
-            # Get the last assistant message
-            last_message = response["messages"][-1]
-            return last_message.content
-            
-        except Exception as e:
-            print(f"❌ Async prompt processing error: {e}")
-            return f"❌ Prompt processing error: {str(e)}"
-    
     def get_status(self) -> dict:
         """Get agent status"""
         return {
             "initialized": self.initialized,
             "thread_alive": self._thread.is_alive() if self._thread else False,
-            "loop_running": self._loop is not None and not self._loop.is_closed() if self._loop else False
+            "loop_running": self._loop is not None and not self._loop.is_closed() if self._loop else False,
+            **self.service.get_status()
         }
     
     def cleanup(self):
         """Cleanup resources"""
         try:
-            print("🧹 Cleaning up agent resources...")
+            log.info("cleaning up agent resources")
             
             if self._loop and not self._loop.is_closed():
-                # Schedule client cleanup if client exists
-                if self.client:
-                    asyncio.run_coroutine_threadsafe(self.client.aclose(), self._loop)
+                # Cancel workers and queued requests, then close the MCP client
+                try:
+                    self._call(self.service.aclose(), 5)
+                except Exception as e:
+                    log.exception("service shutdown error")
                 
                 # Stop the event loop
                 self._loop.call_soon_threadsafe(self._loop.stop)
+                if self._thread and self._thread is not threading.current_thread():
+                    self._thread.join(timeout=5)
             
             self.initialized = False
-            print("✅ Cleanup completed")
+            log.info("cleanup completed")
             
         except Exception as e:
-            print(f"❌ Cleanup error: {e}")
+            log.exception("cleanup error")
 
 # Global instance
 _sync_agent = None
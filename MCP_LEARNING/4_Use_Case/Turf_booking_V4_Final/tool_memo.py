@@ -0,0 +1,108 @@
+import json
+from typing import Dict, Tuple
+
+from langchain_core.messages import ToolMessage
+
+from run_budget import current_run
+from tool_policy import is_read_only_tool, is_write_tool
+
+
+def _call_key(name: str, args: dict) -> Tuple[str, str]:
+    """Stable key for a tool call: name plus canonical JSON arguments"""
+    return name, json.dumps(args or {}, sort_keys=True, default=str)
+
+
+class MemoizingToolNode:
+    """Wraps a ToolNode and reuses read-only tool results within one agent run
+
+    The memo is rebuilt from the run's own messages on every step, so it lives
+    exactly as long as the run and needs no shared state between requests. Any
+    executed write tool (e.g. make_booking) invalidates everything before it.
+    """
+
+    def __init__(self, tool_node):
+        self.tool_node = tool_node
+        self.stats = {
+            "calls_requested": 0,
+            "calls_executed": 0,
+            "calls_avoided": 0,
+            "invalidations": 0,
+        }
+
+    def _build_memo(self, messages) -> Dict[Tuple[str, str], str]:
+        """Collect successful read-only results seen so far in this run"""
+        calls = {}
+        memo = {}
+        for message in current_run(messages):
+            for tool_call in getattr(message, "tool_calls", None) or []:
+                calls[tool_call["id"]] = tool_call
+            if not isinstance(message, ToolMessage):
+                continue
+            tool_call = calls.get(message.tool_call_id)
+            if tool_call is None:
+                continue
+            if is_write_tool(tool_call["name"]):
+                memo.clear()
+            elif getattr(message, "status", "success") != "error":
+                memo[_call_key(tool_call["name"], tool_call["args"])] = message.content
+        return memo
+
+    async def run(self, state, config=None):
+        """Graph node: answer memoized calls locally and execute the rest"""
+        messages = state["messages"]
+        last_message = messages[-1]
+        tool_calls = last_message.tool_calls
+        memo = self._build_memo(messages[:-1])
+
+        results = {}
+        pending = []
+        first_pending_for_key = {}
+        write_seen = False
+        for tool_call in tool_calls:
+            self.stats["calls_requested"] += 1
+            key = _call_key(tool_call["name"], tool_call["args"])
+            if is_read_only_tool(tool_call["name"]) and not write_seen:
+                if key in memo:
+                    results[tool_call["id"]] = ("memo", memo[key])
+                    self.stats["calls_avoided"] += 1
+                    continue
+                if key in first_pending_for_key:
+                    # Same call twice in one turn: run it once, share the result
+                    results[tool_call["id"]] = ("duplicate", first_pending_for_key[key])
+                    self.stats["calls_avoided"] += 1
+                    continue
+                first_pending_for_key[key] = tool_call["id"]
+            elif is_write_tool(tool_call["name"]):
+                if memo or first_pending_for_key:
+                    self.stats["invalidations"] += 1
+                write_seen = True
+            pending.append(tool_call)
+
+        executed = {}
+        if pending:
+            self.stats["calls_executed"] += len(pending)
+            pending_message = last_message.model_copy(update={"tool_calls": pending})
+            output = await self.tool_node.ainvoke(
+                {**state, "messages": messages[:-1] + [pending_message]}, config
+            )
+            for tool_message in output["messages"]:
+                executed[tool_message.tool_call_id] = tool_message
+
+        # Assemble results in the order the model asked for them
+        tool_messages = []
+        for tool_call in tool_calls:
+            if tool_call["id"] in executed:
+                tool_messages.append(executed[tool_call["id"]])
+                continue
+            source, value = results[tool_call["id"]]
+            # Duplicates share the result of the call executed in this same turn
+            content = executed[value].content if source == "duplicate" else value
+            tool_messages.append(
+                ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"])
+            )
+
+        return {"messages": tool_messages}
+
+    def get_stats(self) -> dict:
+        """Counters for requested, executed and avoided tool calls"""
+        return dict(self.stats)
@@ -0,0 +1,47 @@
+"""Read/write classification of the turf MCP tools.
+
+Caches and schedulers use this to decide what is safe to reuse or reorder:
+read-only tools can be served from a cache, write tools must always run.
+"""
+
+# Tools that only read from the database
+READ_ONLY_TOOLS = {
+    "get_all_turfs",
+    "get_all_bookings",
+    "get_bookings_since",
+    "get_booking_stats",
+    "get_occupancy_heatmap",
+    "recommend_slots",
+    "check_turf_availability",
+}
+
+# Tools that change the database
+WRITE_TOOLS = {
+    "make_booking",
+}
+
+# Tool arguments filled in by the client, never by the model
+# (trace_parent: tracing context; output_format: set server-side by TURF_TOOL_OUTPUT_FORMAT)
+INTERNAL_ARGUMENTS = ("trace_parent", "output_format")
+
+
+def is_read_only_tool(name: str) -> bool:
+    """Return True if the tool is known to be read-only"""
+    return name in READ_ONLY_TOOLS
+
+
+def is_write_tool(name: str) -> bool:
+    """Return True if the tool changes state (unknown tools count as writes)"""
+    return name not in READ_ONLY_TOOLS
+
+
+def conversation_has_write(messages) -> bool:
+    """Check whether any message requests or carries the result of a write tool"""
+    for message in messages:
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            if is_write_tool(tool_call.get("name", "")):
+                return True
+        tool_name = getattr(message, "name", None)
+        if getattr(message, "type", None) == "tool" and tool_name and is_write_tool(tool_name):
+            return True
+    return False
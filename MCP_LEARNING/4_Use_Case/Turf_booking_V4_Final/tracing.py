@@ -0,0 +1,168 @@
+"""Lightweight request tracing for the agent, the MCP server and SQLite.
+
+Spans are grouped by request ID (used as the OTLP trace ID) and written as
+one OTLP-JSON export request per line to the file named by TURF_TRACE_FILE.
+The agent and turf_server.py processes append to the same file, so one
+request's spans can be followed across the stdio boundary.
+
+When TURF_TRACE_FILE is not set, span() returns a shared no-op context
+manager and nothing else happens.
+"""
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+_request_id = contextvars.ContextVar("turf_request_id", default=None)
+_span_id = contextvars.ContextVar("turf_span_id", default=None)
+
+_NOOP = contextlib.nullcontext()
+_exporter = None
+
+
+class _FileExporter:
+    """Writes spans from a background thread so tracing never blocks callers"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="turf-trace-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def export(self, span: dict):
+        self._queue.put(span)
+
+    def _run(self):
+        while True:
+            span = self._queue.get()
+            if span is None:
+                return
+            batch = [span]
+            # Drain whatever else is waiting into the same write
+            while not self._queue.empty() and len(batch) < 500:
+                item = self._queue.get_nowait()
+                if item is None:
+                    self._write(batch)
+                    return
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, spans):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "turf-booking"}, "spans": spans}],
+            }]
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload) + "\n")
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def configure(path: str = None, service_name: str = "turf-agent"):
+    """Enable tracing to a file (defaults to TURF_TRACE_FILE); no-op if unset"""
+    global _exporter
+    path = path or os.getenv("TURF_TRACE_FILE")
+    if path and _exporter is None:
+        _exporter = _FileExporter(path, service_name)
+    return _exporter is not None
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+@contextlib.contextmanager
+def _record(name: str, attributes: dict, request_id=None, parent_id=None):
+    trace_id = request_id or _request_id.get() or new_request_id()
+    parent_id = parent_id if parent_id is not None else _span_id.get()
+    span_id = uuid.uuid4().hex[:16]
+    request_token = _request_id.set(trace_id)
+    span_token = _span_id.set(span_id)
+    start = time.time_ns()
+    status = {"code": 1}
+    try:
+        yield attributes
+    except BaseException as e:
+        status = {"code": 2, "message": f"{type(e).__name__}: {e}"[:200]}
+        raise
+    finally:
+        end = time.time_ns()
+        _span_id.reset(span_token)
+        _request_id.reset(request_token)
+        span = {
+            "traceId": trace_id,
+            "spanId": span_id,
+            "name": name,
+            "kind": 1,
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(end),
+            "attributes": [_attribute(k, v) for k, v in attributes.items() if v is not None],
+            "status": status,
+        }
+        if parent_id:
+            span["parentSpanId"] = parent_id
+        _exporter.export(span)
+
+
+def span(name: str, **attributes):
+    """Context manager recording a span under the current request
+
+    Yields the attribute dict (or None when tracing is off) so callers can add
+    attributes known only at the end, e.g. row counts.
+    """
+    if _exporter is None:
+        return _NOOP
+    return _record(name, attributes)
+
+
+def request(request_id: str = None, name: str = "agent.request", **attributes):
+    """Root span for one agent request; its ID correlates all child spans"""
+    if _exporter is None:
+        return _NOOP
+    return _record(name, attributes, request_id=request_id or new_request_id(), parent_id="")
+
+
+def trace_parent() -> str:
+    """W3C-style traceparent for the current span, to hand to another process"""
+    if _exporter is None or _request_id.get() is None:
+        return ""
+    return f"00-{_request_id.get()}-{_span_id.get() or '0' * 16}-01"
+
+
+def remote_span(name: str, traceparent: str = "", **attributes):
+    """Span continuing a trace started in another process (see trace_parent)"""
+    if _exporter is None:
+        return _NOOP
+    parts = (traceparent or "").split("-")
+    if len(parts) == 4:
+        return _record(name, attributes, request_id=parts[1], parent_id=parts[2])
+    return _record(name, attributes)
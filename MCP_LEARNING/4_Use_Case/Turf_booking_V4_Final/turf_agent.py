@@ -4,33 +4,86 @@ from dotenv import load_dotenv
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain.chat_models import init_chat_model
 from langgraph.graph import StateGraph, MessagesState, START, END
-from langgraph.prebuilt import ToolNode
+from langchain_core.runnables import RunnableConfig
 from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_cache import CachedChatModel, build_llm_cache_from_env
+from tool_memo import MemoizingToolNode
+from tool_policy import INTERNAL_ARGUMENTS
+from parallel_tools import build_parallel_tool_node
+from run_budget import build_run_budget_from_env, partial_answer
+from fake_model import build_fake_model_from_env
+from langchain_core.utils.function_calling import convert_to_openai_tool
+import metrics
+import tracing
+from turf_logging import get_logger
 
 # Load environment variables
 load_dotenv()
 
+log = get_logger(__name__)
 
-async def setup_turf_agent():
-    """Setup the turf booking agent with MCP tools"""
-    
-    # Check for API keys - prioritize Groq
-    if not os.getenv("GROQ_API_KEY") :
-        raise ValueError(
-            "Please set one of these API keys in your .env file:\n"
-            "GROQ_API_KEY (recommended - fast and free)\n"
-            "Get Groq API key from: https://console.groq.com/keys\n"
-        )
-    
-    # Initialize the model - try Groq first, then others
-    if os.getenv("GOOGLE_API_KEY"):
-        # model = init_chat_model("groq:llama-3.3-70b-versatile")
-        # model = init_chat_model("groq:llama-3.1-8b-instant")
-        model = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",   # or "gemini-1.5-pro"
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
-        # print("🤖 Using Groq Llama 3.3 70B model")
+
+def _hide_internal_arguments(tool) -> dict:
+    """Tool schema for the model without client-side arguments (see tool_policy.INTERNAL_ARGUMENTS)"""
+    schema = convert_to_openai_tool(tool)
+    parameters = schema["function"].get("parameters", {})
+    for name in INTERNAL_ARGUMENTS:
+        parameters.get("properties", {}).pop(name, None)
+        if name in parameters.get("required", []):
+            parameters["required"].remove(name)
+    return schema
+
+
+def _cache_metrics(model_with_tools, tool_node) -> list:
+    """Metric families for the LLM response cache and the tool-result memo"""
+    families = []
+    if isinstance(model_with_tools, CachedChatModel):
+        stats = model_with_tools.get_stats()
+        families.append(("turf_llm_cache_events_total", "counter", "LLM response cache lookups by outcome",
+                         [({"outcome": k}, stats[k]) for k in ("exact_hits", "normalized_hits", "misses", "bypassed")]))
+        families.append(("turf_llm_cache_hit_ratio", "gauge", "Share of cache lookups answered from the cache",
+                         [({}, stats["hit_ratio"])]))
+    stats = tool_node.get_stats()
+    families.append(("turf_tool_memo_calls_total", "counter", "Tool calls requested by the model, executed or avoided",
+                     [({"outcome": k}, v) for k, v in sorted(stats.items())]))
+    requested = stats.get("calls_requested", 0)
+    families.append(("turf_tool_memo_hit_ratio", "gauge", "Share of requested tool calls answered from the memo",
+                     [({}, round(stats.get("calls_avoided", 0) / requested, 3) if requested else 0.0)]))
+    return families
+
+async def setup_turf_agent(llm_cache=None, model_provider=None):
+    """Setup the turf booking agent with MCP tools
+
+    Args:
+        llm_cache: Optional cache for model responses (see llm_cache.py).
+            Defaults to the cache configured by TURF_LLM_CACHE.
+        model_provider: "fake" for the offline scripted model (see fake_model.py),
+            anything else for the hosted model. Defaults to TURF_AGENT_MODEL.
+    """
+    
+    model_provider = model_provider or os.getenv("TURF_AGENT_MODEL", "")
+    if model_provider == "fake":
+        # Offline scripted model for benchmarks - no API keys or network needed
+        model = build_fake_model_from_env()
+        log.info("using offline scripted model")
+    else:
+        # Check for API keys - prioritize Groq
+        if not os.getenv("GROQ_API_KEY") :
+            raise ValueError(
+                "Please set one of these API keys in your .env file:\n"
+                "GROQ_API_KEY (recommended - fast and free)\n"
+                "Get Groq API key from: https://console.groq.com/keys\n"
+            )
+        
+        # Initialize the model - try Groq first, then others
+        if os.getenv("GOOGLE_API_KEY"):
+            # model = init_chat_model("groq:llama-3.3-70b-versatile")
+            # model = init_chat_model("groq:llama-3.1-8b-instant")
+            model = ChatGoogleGenerativeAI(
+                model="gemini-1.5-flash",   # or "gemini-1.5-pro"
+                google_api_key=os.getenv("GOOGLE_API_KEY")
+            )
+            # print("🤖 Using Groq Llama 3.3 70B model")
     
     # Set up MCP client for turf booking system
     client = MultiServerMCPClient(
@@ -39,30 +92,68 @@ async def setup_turf_agent():
                 "command": "python",
                 "args": ["turf_server.py"],  
                 "transport": "stdio",
+                # Pass our environment so TURF_* settings (e.g. TURF_DB_PATH) reach the server
+                "env": dict(os.environ),
             }
         }
     )
     
     # Get tools from MCP server
     tools = await client.get_tools()
-    print(f"🛠️ Available Tools: {[tool.name for tool in tools]}")
+    log.info("mcp tools loaded", tools=[tool.name for tool in tools])
+    
+    # Bind tools to model (trace_parent and output_format are not the model's to choose)
+    model_with_tools = model.bind_tools([_hide_internal_arguments(tool) for tool in tools])
+    
+    # Optionally answer repeated read-only questions from the response cache
+    if llm_cache is None:
+        llm_cache = build_llm_cache_from_env()
+    if llm_cache is not None:
+        model_with_tools = CachedChatModel(model_with_tools, llm_cache, tools)
+        log.info("llm response cache enabled", backend=type(llm_cache).__name__)
+    
+    # Create the tool node: concurrent fan-out, reusing read-only results within a run
+    tool_node = MemoizingToolNode(build_parallel_tool_node(tools))
+    metrics.REGISTRY.register_collector("turf_agent", lambda: _cache_metrics(model_with_tools, tool_node))
+    
+    compact_tools = os.getenv("TURF_TOOL_OUTPUT_FORMAT", "text").lower() != "text"
     
-    # Bind tools to model
-    model_with_tools = model.bind_tools(tools)
+    def get_budget(config: RunnableConfig):
+        """The per-request RunBudget passed in the run config, if any"""
+        return (config.get("configurable") or {}).get("budget")
     
-    # Create ToolNode
-    tool_node = ToolNode(tools)
+    def get_usage(config: RunnableConfig):
+        """The per-request UsageScope passed in the run config, if any"""
+        return (config.get("configurable") or {}).get("usage")
     
-    def should_continue(state: MessagesState):
-        """Determine whether to continue to tools or end"""
+    def should_continue(state: MessagesState, config: RunnableConfig):
+        """Determine whether to continue to tools, stop early or end"""
         messages = state["messages"]
         last_message = messages[-1]
         if last_message.tool_calls:
+            budget = get_budget(config)
+            if budget and budget.exhausted(messages, pending_tool_calls=True):
+                return "finalize"
             return "tools"
         return END
     
+    def after_tools(state: MessagesState, config: RunnableConfig):
+        """Go back to the model unless the budget is used up"""
+        budget = get_budget(config)
+        if budget and budget.exhausted(state["messages"]):
+            return "finalize"
+        return "call_model"
+    
+    def finalize(state: MessagesState, config: RunnableConfig):
+        """Answer with what was gathered so far once the budget is exhausted"""
+        messages = state["messages"]
+        budget = get_budget(config)
+        reason = budget.exhausted(messages, pending_tool_calls=bool(messages[-1].tool_calls)) if budget else None
+        log.warning("stopping run early", reason=reason)
+        return {"messages": [partial_answer(messages, reason or "the step budget was used up")]}
+    
     # Define call_model function
-    async def call_model(state: MessagesState):
+    async def call_model(state: MessagesState, config: RunnableConfig):
         """Call the model with tools"""
         system_message = {
             "role": "system",
@@ -72,15 +163,23 @@ async def setup_turf_agent():
 2. get_all_bookings() - Get all current bookings  
 3. check_turf_availability(turf_id, date) - Check availability for specific turf and date
 4. make_booking(turf_id, customer_name, customer_phone, booking_date, start_time, end_time) - Make a booking
+5. get_booking_stats(turf_id, start_date, end_date) - Bookings, booked hours, revenue and occupancy for a period (occupancy only when both dates are given)
+6. recommend_slots(turf_id, date) - Forecast quiet (best to book) and peak time slots
+7. get_occupancy_heatmap(turf_id, start_date, end_date, window_hours, top) - Weekday x hour occupancy heatmap, utilization percentiles and the busiest time windows
+8. get_bookings_since(cursor) - Only the bookings created, changed or cancelled after a cursor, plus the next cursor
 
 IMPORTANT INSTRUCTIONS:
 - When users ask about turfs, bookings, availability, or want to make bookings, use the appropriate tool
-- Always use the EXACT tool names: get_all_turfs, get_all_bookings, check_turf_availability, make_booking
+- Always use the EXACT tool names: get_all_turfs, get_all_bookings, check_turf_availability, make_booking, get_booking_stats, recommend_slots, get_occupancy_heatmap, get_bookings_since
 - Display the complete output from tools - don't summarize
 - For "show turfs", "list turfs", "what turfs" queries, use get_all_turfs()
 - For "show bookings", "current bookings" queries, use get_all_bookings()
 - For availability checks, use check_turf_availability(turf_id, date)
 - For making bookings, use make_booking() with all required parameters
+- For revenue, occupancy, busy hours or booking summaries, use get_booking_stats() instead of counting bookings yourself
+- For "best time to book" or "quietest/busiest slots", use recommend_slots()
+- For peak hours, busiest days or times, utilization or heatmap questions about past bookings, use get_occupancy_heatmap()
+- For "what changed", "any new or cancelled bookings since last time", use get_bookings_since() with the cursor from its previous result in this conversation (0 the first time)
 
 Examples:
 - User: "Show me all turfs" → Call get_all_turfs()
@@ -88,30 +187,66 @@ Examples:
 - User: "What are the current bookings?" → Call get_all_bookings()"""
         }
         
+        # Compact tool output (resources/render.py) is for the model, not for display
+        if compact_tools:
+            system_message["content"] += (
+                "\n\nTool results are compact JSON or pipe-separated tables (first row = column names). "
+                "Show their complete content to the user as clear, readable text rather than raw rows."
+            )
+        
+        # Earlier turns that no longer fit the memory budget arrive as a summary
+        summary = (config.get("configurable") or {}).get("conversation_summary")
+        if summary:
+            system_message["content"] += f"\n\nSummary of the earlier conversation:\n{summary}"
+        
         messages = [system_message] + state["messages"]
-        response = await model_with_tools.ainvoke(messages)
+        budget = get_budget(config)
+        try:
+            with tracing.span("model.call", messages=len(messages)):
+                response = await asyncio.wait_for(
+                    model_with_tools.ainvoke(messages, config),
+                    timeout=budget.remaining_seconds() if budget else None
+                )
+        except asyncio.TimeoutError:
+            return {"messages": [partial_answer(state["messages"], "the time limit was reached")]}
         
-        # Debug information
-        print(f"🔍 Model response type: {type(response)}")
-        print(f"📜 Model response content: {response.content}")
-        # if hasattr(response, 'tool_calls') and response.tool_calls:
-        #     print(f"🔧 Tool calls: {[tc.get('name') for tc in response.tool_calls]}")
-        # else:
-        #     print("⚠️ No tool calls in response")
-            
+        # Full content only for a sample of requests, truncated (see turf_logging.py)
+        log.debug("model response", tool_calls=[tc.get("name") for tc in response.tool_calls],
+                  content_chars=len(response.content or ""))
+        log.verbose("model response content", content=response.content)
+        
+        usage = get_usage(config)
+        if usage is not None:
+            usage.record_model_response(response)
         return {"messages": [response]}
+    
+    async def call_tools(state: MessagesState, config: RunnableConfig):
+        """Run the tool node and account for the size of each result"""
+        result = await tool_node.run(state, config)
+        usage = get_usage(config)
+        if usage is not None:
+            for message in result["messages"]:
+                usage.record_tool_result(message.name, message.content)
+        return result
 
     
     # Build the graph
     builder = StateGraph(MessagesState)
     builder.add_node("call_model", call_model)
-    builder.add_node("tools", tool_node)
+    builder.add_node("tools", call_tools)
+    builder.add_node("finalize", finalize)
     builder.add_edge(START, "call_model")
     builder.add_conditional_edges(
         "call_model",
         should_continue,
+        ["tools", "finalize", END],
+    )
+    builder.add_conditional_edges(
+        "tools",
+        after_tools,
+        ["call_model", "finalize"],
     )
-    builder.add_edge("tools", "call_model")
+    builder.add_edge("finalize", END)
     
     # Compile the graph
     graph = builder.compile()
@@ -181,7 +316,8 @@ async def test_agent():
                 
                 print("🤖 Processing...")
                 response = await graph.ainvoke(
-                    {"messages": [{"role": "user", "content": user_input}]}
+                    {"messages": [{"role": "user", "content": user_input}]},
+                    {"configurable": {"budget": build_run_budget_from_env()}}
                 )
                 
                 # Get the last assistant message
@@ -0,0 +1,163 @@
+"""Leveled, structured logging that never blocks the request path.
+
+Callers log an event name plus keyword fields:
+
+    log = get_logger(__name__)
+    log.info("tool batch finished", tools=3, elapsed_ms=41.2)
+    log.verbose("model response", content=response.content)
+
+Records are put on an in-memory queue; a listener thread formats them
+(text or JSON lines) and writes to stderr, so the MCP stdio transport on
+stdout is never touched. Long field values are truncated before they are
+queued and verbose() events are sampled.
+
+Configured by TURF_LOG_LEVEL (INFO), TURF_LOG_FORMAT (text|json),
+TURF_LOG_MAX_FIELD (characters kept per field, 300),
+TURF_LOG_VERBOSE_SAMPLE (share of verbose events kept, 0.1) and
+TURF_LOG_FILE (write to a file instead of stderr).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+_ROOT = "turf"
+_lock = threading.Lock()
+_listener = None
+_settings = {
+    "service": "turf",
+    "max_field": 300,
+    "verbose_sample": 0.1,
+}
+
+
+def truncate(value, limit: int = None):
+    """Shorten long strings (and the string form of other objects) for logging"""
+    limit = limit or _settings["max_field"]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        # Short lists and dicts keep their structure in JSON output
+        return value
+    return f"{text[:limit]}…(+{len(text) - limit} chars)"
+
+
+class _TruncatingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records after cutting them down, leaving formatting to the listener"""
+
+    def prepare(self, record):
+        record.msg = truncate(record.getMessage())
+        record.args = None
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {key: truncate(value) for key, value in fields.items()}
+        if record.exc_info:
+            # Render the traceback now; exc_info objects should not cross threads
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        text = f"{stamp} {record.levelname:<7} {record.name}: {record.msg}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        if record.exc_text:
+            text += "\n" + record.exc_text
+        return text
+
+
+class _JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "service": _settings["service"],
+            "logger": record.name,
+            "event": record.msg,
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class StructuredLogger:
+    """Thin wrapper over logging.Logger taking keyword fields instead of format args"""
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def _log(self, level: int, event: str, fields: dict, exc_info=False):
+        # Cheap exit before any record is built
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, extra={"fields": fields}, exc_info=exc_info)
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def verbose(self, event: str, **fields):
+        """DEBUG event that is also sampled (TURF_LOG_VERBOSE_SAMPLE), for per-request payloads"""
+        if self._logger.isEnabledFor(logging.DEBUG) and random.random() < _settings["verbose_sample"]:
+            self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event: str, **fields):
+        """ERROR with the current exception's traceback"""
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def configure(service_name: str = None):
+    """Install the queued handler on the 'turf' logger tree (idempotent)
+
+    Later calls only update the service name reported in JSON output.
+    """
+    global _listener
+    with _lock:
+        if service_name:
+            _settings["service"] = service_name
+        if _listener is not None:
+            return
+
+        _settings["max_field"] = int(os.getenv("TURF_LOG_MAX_FIELD", "300"))
+        _settings["verbose_sample"] = float(os.getenv("TURF_LOG_VERBOSE_SAMPLE", "0.1"))
+
+        log_file = os.getenv("TURF_LOG_FILE")
+        # stderr, never stdout: turf_server.py speaks MCP over stdout
+        target = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler(sys.stderr)
+        json_format = os.getenv("TURF_LOG_FORMAT", "text").lower() == "json"
+        target.setFormatter(_JSONFormatter() if json_format else _TextFormatter())
+
+        records = queue.SimpleQueue()
+        root = logging.getLogger(_ROOT)
+        root.setLevel(os.getenv("TURF_LOG_LEVEL", "INFO").upper())
+        root.addHandler(_TruncatingQueueHandler(records))
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(records, target)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Logger for a module, e.g. get_logger(__name__); configures logging on first use"""
+    configure()
+    return StructuredLogger(logging.getLogger(f"{_ROOT}.{name}"))
@@ -1,52 +1,366 @@
 import sqlite3
+import asyncio
+import concurrent.futures
+import contextvars
 import json
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from fastmcp import FastMCP
+from typing import Union
+from fastmcp import Context, FastMCP
 from database import TurfDatabase
-from resources.server_all import turf_all, all_booking, check_availability, book_turf
+from resources.server_all import (fetch_turfs, fetch_availability, create_booking, count_bookings, iter_bookings,
+                                  fetch_bookings_since, fetch_booking_stats)
+from resources.analytics import fetch_occupancy_heatmap
+from resources.forecast import FORECAST_CHECK_MINUTES, ForecastWorker, fetch_slot_recommendations
+from resources.render import OUTPUT_SCHEMAS, default_max_chars, render, render_chunk
+import archive
+import change_feed
+import metrics
+import sql_profiler
+import tracing
+from turf_logging import configure as configure_logging, get_logger
+
+configure_logging(service_name="turf-server")
+log = get_logger(__name__)
+
+# Spans from this process join the agent's traces (see tracing.py)
+tracing.configure(service_name="turf-server")
+
+# Optional Prometheus endpoint (see metrics.py)
+if os.getenv("TURF_METRICS_PORT"):
+    metrics.start_http_server(int(os.getenv("TURF_METRICS_PORT")))
+
+
+def toggle_sql_profiler(signum=None, frame=None):
+    """Switch the slow-query profiler on or off; print its summary when switching off"""
+    profiler = sql_profiler.configure(enabled=not sql_profiler.enabled())
+    log.info("sql profiler switched", enabled=profiler.enabled)
+    if not profiler.enabled:
+        for entry in profiler.report():
+            log.info("sql profile", **entry)
+
+# `kill -USR1 <pid>` toggles profiling of a running server (POSIX only)
+if hasattr(signal, "SIGUSR1"):
+    signal.signal(signal.SIGUSR1, toggle_sql_profiler)
+
+TOOL_CALLS = metrics.REGISTRY.counter("turf_tool_calls_total", "MCP tool calls handled")
+TOOL_ERRORS = metrics.REGISTRY.counter(
+    "turf_tool_errors_total", "MCP tool calls that raised or returned an error message")
+TOOL_SECONDS = metrics.REGISTRY.histogram("turf_tool_duration_seconds", "MCP tool execution time")
 
 # Initialize MCP server and database
 mcp = FastMCP("turf-booking-system")
 db = TurfDatabase()
 
+# Data kind (see resources/render.py) returned by each tool
+TOOL_KINDS = {
+    "get_all_turfs": "turfs",
+    "get_all_bookings": "bookings",
+    "get_bookings_since": "changes",
+    "get_booking_stats": "stats",
+    "get_occupancy_heatmap": "heatmap",
+    "recommend_slots": "forecast",
+    "check_turf_availability": "availability",
+    "make_booking": "booking",
+}
+
+# Rows per fetchmany() batch, and per partial result, of streamed listings
+STREAM_BATCH_ROWS = int(os.getenv("TURF_STREAM_BATCH_ROWS", "500"))
+
+@contextmanager
+def tool_call(tool: str, trace_parent: str, output_format: str):
+    """Tracing span plus call/error/latency metrics around one tool call"""
+    TOOL_CALLS.inc(tool=tool)
+    start = time.perf_counter()
+    try:
+        with tracing.remote_span("tool.server", trace_parent, tool=tool, output_format=output_format or None):
+            yield
+    except Exception:
+        TOOL_ERRORS.inc(tool=tool)
+        log.exception("tool failed", tool=tool)
+        raise
+    finally:
+        TOOL_SECONDS.observe(time.perf_counter() - start, tool=tool)
+
+def run_tool(tool: str, trace_parent: str, output_format: str, fetch, *args) -> str:
+    """Run a tool body inside its tracing span, render its data, and record call/error/latency metrics"""
+    with tool_call(tool, trace_parent, output_format):
+        data = fetch(*args)
+        result = render(TOOL_KINDS[tool], data, output_format)
+    if "error" in data:
+        TOOL_ERRORS.inc(tool=tool)
+        log.info("tool returned an error", tool=tool, error=data["error"])
+    return result
+
+@mcp.resource("turf://schema/{tool_name}")
+def get_output_schema(tool_name: str) -> str:
+    """JSON Schema of a tool's output_format="json" result"""
+    if tool_name not in TOOL_KINDS:
+        return json.dumps({"error": f"Unknown tool '{tool_name}'"})
+    return json.dumps(OUTPUT_SCHEMAS[TOOL_KINDS[tool_name]])
+
+# ----- availability resource with update notifications (see change_feed.py) -----
+
+AVAILABILITY_URI = "turf://availability/{turf_id}/{date}"
+
+# Subscribed URI -> sessions, and the event loop that serves them
+_subscribers = {}
+_subscribers_lock = threading.Lock()
+_loop = None
+
+@mcp.resource(AVAILABILITY_URI)
+def get_availability_resource(turf_id: str, date: str) -> str:
+    """Availability of a turf on a date; subscribers get resources/updated when a booking changes it"""
+    return render("availability", fetch_availability(turf_id, date))
+
+def _lowlevel_server():
+    """The MCP low-level server inside FastMCP, for the subscribe handlers FastMCP does not expose
+
+    The only place relying on fastmcp 2.x internals: FastMCP._mcp_server is an
+    mcp.server.lowlevel.Server with subscribe_resource/unsubscribe_resource
+    decorators and a request_context property. Fails at startup if that changes.
+    """
+    server = getattr(mcp, "_mcp_server", None)
+    if server is None or not all(hasattr(type(server), name) for name in
+                                 ("subscribe_resource", "unsubscribe_resource", "request_context")):
+        raise RuntimeError("FastMCP._mcp_server is gone or changed (written against fastmcp 2.x); "
+                           "update turf_server._lowlevel_server")
+    return server
+
+_LOWLEVEL_SERVER = _lowlevel_server()
+
+def _request_session():
+    """Session of the request being handled"""
+    return _LOWLEVEL_SERVER.request_context.session
+
+@_LOWLEVEL_SERVER.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    global _loop
+    _loop = asyncio.get_running_loop()
+    session = _request_session()
+    with _subscribers_lock:
+        _subscribers.setdefault(str(uri), set()).add(session)
+
+@_LOWLEVEL_SERVER.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    session = _request_session()
+    with _subscribers_lock:
+        sessions = _subscribers.get(str(uri))
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del _subscribers[str(uri)]
+
+async def notify_subscribers(uris):
+    for uri in uris:
+        with _subscribers_lock:
+            sessions = list(_subscribers.get(uri, ()))
+        for session in sessions:
+            try:
+                await session.send_resource_updated(uri)
+            except Exception:
+                # The client went away without unsubscribing
+                log.info("dropping subscriber", uri=uri)
+                with _subscribers_lock:
+                    _subscribers.get(uri, set()).discard(session)
+
+def on_booking_change(change: change_feed.Change):
+    """Send resources/updated for the availability URIs a booking change affects"""
+    if _loop is None:
+        return
+    with _subscribers_lock:
+        if change.turf_id is None:
+            uris = [uri for uri in _subscribers if uri.startswith("turf://availability/")]
+        else:
+            uri = AVAILABILITY_URI.format(turf_id=change.turf_id, date=change.date)
+            uris = [uri] if uri in _subscribers else []
+    if uris:
+        asyncio.run_coroutine_threadsafe(notify_subscribers(uris), _loop)
+
+change_feed.CHANGES.add_listener(on_booking_change)
+
 # Convert all resources to tools
 @mcp.tool()
-def get_all_turfs() -> str:
+def get_all_turfs(trace_parent: str = "", output_format: str = "") -> str:
     """
     Get all available turfs with their details including ID, name, location, rate, capacity, and facilities
     
+    Args:
+        trace_parent: Internal tracing context set by the agent; leave empty
+        output_format: "text" (readable), "json" (see turf://schema/{tool}) or "table"; empty uses TURF_TOOL_OUTPUT_FORMAT
+    
     Returns:
-        str: Formatted string containing all turf information
+        str: All turf information in the requested format
+    """
+    return run_tool("get_all_turfs", trace_parent, output_format, fetch_turfs)
+
+def wants_progress(ctx: Context) -> bool:
+    """True when the client sent a progress token with the request"""
+    meta = ctx.request_context.meta if ctx is not None else None
+    return getattr(meta, "progressToken", None) is not None
+
+async def stream_bookings(ctx: Context, output_format: str) -> str:
+    """Read the bookings listing batch by batch from the cursor
+
+    With a ctx, each batch goes to the client as a log notification with its
+    rendered rows (partial content) followed by a progress notification.
+    Only the rows that fit under the output cap are kept for the final
+    result, so server memory stays bounded whatever the number of bookings.
+    The SQLite reads run off the event loop on one reader thread: sqlite3
+    connections may only be used by the thread that opened them.
     """
-    return turf_all()
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    reader = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="turf-stream")
+
+    def read(function, *args):
+        # The request's tracing context follows the SQL into the reader thread
+        return loop.run_in_executor(reader, context.run, function, *args)
+
+    batches = iter_bookings(STREAM_BATCH_ROWS)
+    try:
+        total = await read(count_bookings) if ctx is not None else 0
+        max_chars = default_max_chars()
+        kept, kept_chars, rows_read = [], 0, 0
+        while True:
+            batch = await read(next, batches, None)
+            if batch is None:
+                break
+            rows_read += len(batch)
+            keep = not max_chars or kept_chars <= max_chars
+            if ctx is None and not keep:
+                continue
+            chunk = render_chunk("bookings", batch, output_format)
+            if ctx is not None:
+                await ctx.info(chunk)
+                await ctx.report_progress(rows_read, max(total, rows_read))
+            if keep:
+                kept.extend(batch)
+                kept_chars += len(chunk)
+    finally:
+        await read(batches.close)
+        reader.shutdown(wait=False)
+    return render("bookings", {"bookings": kept, "total": rows_read}, output_format, max_chars)
 
 @mcp.tool()
-def get_all_bookings() -> str:
+async def get_all_bookings(trace_parent: str = "", output_format: str = "", ctx: Context = None) -> str:
     """
     Get all bookings with turf details (without customer PII for privacy)
     
+    Args:
+        trace_parent: Internal tracing context set by the agent; leave empty
+        output_format: "text" (readable), "json" (see turf://schema/{tool}) or "table"; empty uses TURF_TOOL_OUTPUT_FORMAT
+    
+    Returns:
+        str: All bookings (turf names, dates, times, costs, and status) in the requested format.
+        Bookings moved to the archive (see archive.py) are not listed; get_booking_stats still counts them.
+        Clients that send a progress token also receive the rows in batches as they are read.
+    """
+    with tool_call("get_all_bookings", trace_parent, output_format):
+        return await stream_bookings(ctx if wants_progress(ctx) else None, output_format)
+
+@mcp.tool()
+def get_bookings_since(cursor: Union[int, str] = 0, limit: int = 500, trace_parent: str = "", output_format: str = "") -> str:
+    """
+    Get only the bookings that changed (inserted, updated, cancelled or deleted) after a cursor
+    
+    Args:
+        cursor: Cursor returned by the previous call (a number, or "n.n..." with several database shards); 0 returns every booking
+        limit: Maximum number of changed bookings to return (up to 5000)
+        trace_parent: Internal tracing context set by the agent; leave empty
+        output_format: "text" (readable), "json" (see turf://schema/{tool}) or "table"; empty uses TURF_TOOL_OUTPUT_FORMAT
+    
+    Returns:
+        str: The changed bookings in their current state (without customer PII), the next cursor
+        and whether more changes are waiting, in the requested format
+    """
+    return run_tool("get_bookings_since", trace_parent, output_format, fetch_bookings_since, cursor, limit)
+
+@mcp.tool()
+def get_booking_stats(turf_id: int = 0, start_date: str = "", end_date: str = "",
+                      trace_parent: str = "", output_format: str = "") -> str:
+    """
+    Get booking totals for a period: bookings, booked hours, revenue and occupancy,
+    overall and per turf, per hour of day and per day. Occupancy needs both start_date and end_date
+    
+    Args:
+        turf_id: ID of the turf to summarize; 0 for all turfs
+        start_date: First day of the period (YYYY-MM-DD); empty for no lower bound
+        end_date: Last day of the period (YYYY-MM-DD); empty for no upper bound
+        trace_parent: Internal tracing context set by the agent; leave empty
+        output_format: "text" (readable), "json" (see turf://schema/{tool}) or "table"; empty uses TURF_TOOL_OUTPUT_FORMAT
+    
+    Returns:
+        str: Confirmed-booking figures for the period in the requested format
+    """
+    return run_tool("get_booking_stats", trace_parent, output_format, fetch_booking_stats,
+                    turf_id, start_date, end_date)
+
+@mcp.tool()
+def get_occupancy_heatmap(turf_id: int = 0, start_date: str = "", end_date: str = "", window_hours: int = 2,
+                          top: int = 5, trace_parent: str = "", output_format: str = "") -> str:
+    """
+    Get turf x weekday x hour-of-day occupancy, daily utilization percentiles and the busiest time windows
+    
+    Args:
+        turf_id: ID of the turf to analyse; 0 for all turfs
+        start_date: First day of the period (YYYY-MM-DD); empty starts at the first booking
+        end_date: Last day of the period (YYYY-MM-DD); empty ends at the last booking
+        window_hours: Length in hours of the peak windows to look for
+        top: Number of peak windows to return
+        trace_parent: Internal tracing context set by the agent; leave empty
+        output_format: "text" (readable), "json" (see turf://schema/{tool}) or "table"; empty uses TURF_TOOL_OUTPUT_FORMAT
+    
+    Returns:
+        str: Occupancy matrices (share of each hour booked), utilization percentiles and peak windows
+    """
+    return run_tool("get_occupancy_heatmap", trace_parent, output_format, fetch_occupancy_heatmap,
+                    turf_id, start_date, end_date, window_hours, top)
+
+@mcp.tool()
+def recommend_slots(turf_id: int = 0, date: str = "", top: int = 5,
+                    trace_parent: str = "", output_format: str = "") -> str:
+    """
+    Recommend booking times from the demand forecast: the quietest slots (best to book) and the peak slots
+    
+    Args:
+        turf_id: ID of the turf; 0 for all turfs
+        date: Date to recommend slots for (YYYY-MM-DD); slots already booked that day are left out.
+            Empty covers every weekday
+        top: Number of slots in each list
+        trace_parent: Internal tracing context set by the agent; leave empty
+        output_format: "text" (readable), "json" (see turf://schema/{tool}) or "table"; empty uses TURF_TOOL_OUTPUT_FORMAT
+    
     Returns:
-        str: Formatted string containing all booking information with turf names, dates, times, costs, and status
+        str: Quiet and peak slots with their expected occupancy and when the forecast was computed,
+        in the requested format
     """
-    return all_booking()
+    return run_tool("recommend_slots", trace_parent, output_format, fetch_slot_recommendations, turf_id, date, top)
 
 @mcp.tool()
-def check_turf_availability(turf_id: int, date: str) -> str:
+def check_turf_availability(turf_id: int, date: str, trace_parent: str = "", output_format: str = "") -> str:
     """
     Check availability for a specific turf on a specific date
     
     Args:
         turf_id: ID of the turf to check availability for
         date: Date to check availability (YYYY-MM-DD format)
+        trace_parent: Internal tracing context set by the agent; leave empty
+        output_format: "text" (readable), "json" (see turf://schema/{tool}) or "table"; empty uses TURF_TOOL_OUTPUT_FORMAT
         
     Returns:
-        str: Formatted availability information showing booked and available time slots
+        str: Booked and available time slots in the requested format
     """
-    return check_availability(str(turf_id), date)
+    return run_tool("check_turf_availability", trace_parent, output_format, fetch_availability, str(turf_id), date)
 
 @mcp.tool()
 def make_booking(turf_id: int, customer_name: str, customer_phone: str, 
-                booking_date: str, start_time: str, end_time: str) -> str:
+                booking_date: str, start_time: str, end_time: str,
+                trace_parent: str = "", output_format: str = "") -> str:
     """
     Make a new turf booking
     
@@ -57,12 +371,24 @@ def make_booking(turf_id: int, customer_name: str, customer_phone: str,
         booking_date: Date of booking (YYYY-MM-DD format)
         start_time: Start time (HH:MM format)
         end_time: End time (HH:MM format)
+        trace_parent: Internal tracing context set by the agent; leave empty
+        output_format: "text" (readable), "json" (see turf://schema/{tool}) or "table"; empty uses TURF_TOOL_OUTPUT_FORMAT
         
     Returns:
         str: Booking confirmation with details or error message
     """
-    return book_turf(turf_id, customer_name, customer_phone, 
-                     booking_date, start_time, end_time)
+    return run_tool("make_booking", trace_parent, output_format, create_booking, turf_id, customer_name,
+                    customer_phone, booking_date, start_time, end_time)
 
 if __name__ == "__main__":
+    # Bookings written by other processes also reach subscribers; 0 disables the poll
+    for path in db.shard_paths:
+        change_feed.start_watcher(path, float(os.getenv("TURF_CHANGE_POLL_SECONDS", "1")))
+    # Old bookings move to bookings_archive in the background when TURF_ARCHIVE_AFTER_DAYS is set
+    if os.getenv("TURF_ARCHIVE_AFTER_DAYS"):
+        archive.ArchiveWorker(db, archive.ARCHIVE_AFTER_DAYS,
+                              float(os.getenv("TURF_ARCHIVE_INTERVAL_HOURS", "24"))).start()
+    # recommend_slots only reads slot_forecast; it is recomputed here when stale (0 leaves it to cron)
+    if FORECAST_CHECK_MINUTES > 0:
+        ForecastWorker(FORECAST_CHECK_MINUTES).start()
     mcp.run()
\ No newline at end of file
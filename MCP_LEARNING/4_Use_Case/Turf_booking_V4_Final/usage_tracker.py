@@ -0,0 +1,164 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Optional
+
+from conversation_memory import estimate_tokens
+
+# Label for requests that did not come from a prompt template
+CHAT_LABEL = "(chat)"
+
+
+def _empty_totals() -> dict:
+    return {
+        "requests": 0,
+        "model_calls": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cached_model_calls": 0,
+        "tool_calls": 0,
+        "tool_result_chars": 0,
+        "tool_result_tokens": 0,
+        "cost_usd": 0.0,
+    }
+
+
+def _response_usage(response) -> dict:
+    """Token counts reported by the provider (LangChain usage_metadata), if any"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return {
+        "input_tokens": int(usage.get("input_tokens", 0) or 0),
+        "output_tokens": int(usage.get("output_tokens", 0) or 0),
+    }
+
+
+class UsageScope:
+    """Usage of one agent request, tagged with its conversation and prompt template
+
+    The graph finds the scope in config["configurable"]["usage"] and reports
+    every model response and tool result to it.
+    """
+
+    def __init__(self, tracker: "UsageTracker", kind: str, session_id: Optional[str],
+                 prompt_name: Optional[str]):
+        self.tracker = tracker
+        self.kind = kind
+        self.session_id = session_id
+        self.prompt = prompt_name or CHAT_LABEL
+        self.totals = _empty_totals()
+        self.totals["requests"] = 1
+
+    def record_model_response(self, response):
+        amounts = {"model_calls": 1}
+        if (getattr(response, "response_metadata", None) or {}).get("turf_cache") == "hit":
+            # Answered by llm_cache.py: no tokens were spent on this call
+            amounts["cached_model_calls"] = 1
+        else:
+            usage = _response_usage(response)
+            amounts.update(usage)
+            amounts["cost_usd"] = self.tracker.cost(usage["input_tokens"], usage["output_tokens"])
+        self.tracker.add(self, amounts)
+
+    def record_tool_result(self, tool_name: str, content):
+        text = content if isinstance(content, str) else str(content)
+        self.tracker.add(self, {
+            "tool_calls": 1,
+            "tool_result_chars": len(text),
+            "tool_result_tokens": estimate_tokens(text),
+        }, tool=tool_name or "unknown")
+
+    def finish(self):
+        """Close the request and keep it in the recent-requests list"""
+        self.tracker.finish(self)
+
+
+class UsageTracker:
+    """Token, tool-output and cost totals per conversation, prompt template and tool
+
+    Costs use TURF_COST_PER_1K_INPUT / TURF_COST_PER_1K_OUTPUT (USD, default 0).
+    Tool result sizes are the characters (and estimated tokens) each tool put
+    into the model context.
+    """
+
+    def __init__(self, input_cost_per_1k: float = 0.0, output_cost_per_1k: float = 0.0,
+                 max_conversations: int = 500, keep_recent: int = 20):
+        self.input_cost_per_1k = input_cost_per_1k
+        self.output_cost_per_1k = output_cost_per_1k
+        self.max_conversations = max_conversations
+        self.totals = _empty_totals()
+        self.per_prompt = {}
+        self.per_tool = {}
+        self.per_conversation = OrderedDict()
+        self.recent = deque(maxlen=keep_recent)
+        self._lock = threading.Lock()
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_cost_per_1k + output_tokens * self.output_cost_per_1k) / 1000
+
+    def scope(self, kind: str, session_id: Optional[str] = None,
+              prompt_name: Optional[str] = None) -> UsageScope:
+        """Start accounting for one request"""
+        scope = UsageScope(self, kind, session_id, prompt_name)
+        self.add(scope, {"requests": 1}, own=False)
+        return scope
+
+    def _buckets(self, scope: UsageScope):
+        yield self.totals
+        yield self.per_prompt.setdefault(scope.prompt, _empty_totals())
+        if scope.session_id is not None:
+            conversation = self.per_conversation.get(scope.session_id)
+            if conversation is None:
+                conversation = self.per_conversation[scope.session_id] = _empty_totals()
+                while len(self.per_conversation) > self.max_conversations:
+                    self.per_conversation.popitem(last=False)
+            self.per_conversation.move_to_end(scope.session_id)
+            yield conversation
+
+    def add(self, scope: UsageScope, amounts: dict, tool: Optional[str] = None, own: bool = True):
+        with self._lock:
+            buckets = list(self._buckets(scope))
+            if own:
+                buckets.append(scope.totals)
+            if tool is not None:
+                buckets.append(self.per_tool.setdefault(
+                    tool, {"tool_calls": 0, "tool_result_chars": 0, "tool_result_tokens": 0}))
+            for bucket in buckets:
+                for key, amount in amounts.items():
+                    bucket[key] += amount
+
+    def finish(self, scope: UsageScope):
+        with self._lock:
+            self.recent.append({
+                "kind": scope.kind,
+                "session": scope.session_id,
+                "prompt": scope.prompt,
+                **{k: round(v, 6) if isinstance(v, float) else v for k, v in scope.totals.items()},
+            })
+
+    def get_conversation(self, session_id: str) -> dict:
+        with self._lock:
+            return dict(self.per_conversation.get(session_id) or _empty_totals())
+
+    def get_metrics(self, top_conversations: int = 10) -> dict:
+        """Totals plus breakdowns; conversations are limited to the most expensive ones"""
+        def tokens(totals):
+            return totals["input_tokens"] + totals["output_tokens"]
+
+        with self._lock:
+            conversations = sorted(self.per_conversation.items(), key=lambda item: tokens(item[1]), reverse=True)
+            return {
+                "totals": dict(self.totals),
+                "per_prompt": {name: dict(v) for name, v in self.per_prompt.items()},
+                "per_tool": {name: dict(v) for name, v in self.per_tool.items()},
+                "conversations_tracked": len(self.per_conversation),
+                "top_conversations": {sid: dict(v) for sid, v in conversations[:top_conversations]},
+                "recent_requests": list(self.recent),
+            }
+
+
+def build_usage_tracker_from_env() -> UsageTracker:
+    """Create a tracker priced by the TURF_COST_PER_1K_* environment variables"""
+    return UsageTracker(
+        input_cost_per_1k=float(os.getenv("TURF_COST_PER_1K_INPUT", "0")),
+        output_cost_per_1k=float(os.getenv("TURF_COST_PER_1K_OUTPUT", "0")),
+    )